@@ -13,6 +13,9 @@ class APIConfig(AppConfig):
     verbose_name = "API"
 
     def ready(self):
+        # Connect signal handlers
+        from . import signal_handlers  # noqa
+
         # Configure Elasticsearch connections for connection pooling.
         connections.configure(
             default={"hosts": settings.ES_URLS},
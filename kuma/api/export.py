@@ -0,0 +1,217 @@
+"""
+Export documents as newline-delimited JSON, for offline and static consumers.
+
+Every line is one document, shaped like the data of the document API (see
+``kuma.wiki.views.document.document_api_data``) plus its ``url``. Documents
+are read in chunks, in primary key order, so memory use stays bounded no
+matter how many documents are exported. An export to a file can be split
+into primary key ranges written in parallel, and resumed from its last
+checkpoint after a crash.
+"""
+import gzip
+import json
+import os
+import zlib
+
+from kuma.wiki.models import Document
+from kuma.wiki.views.document import document_api_data
+
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+def get_documents(locale=None, slug_prefix=None, min_pk=None, max_pk=None):
+    """Return the documents to export, in primary key order."""
+    docs = Document.objects.all()
+    if locale:
+        docs = docs.filter(locale=locale)
+    if slug_prefix:
+        docs = docs.filter(slug__startswith=slug_prefix)
+    if min_pk is not None:
+        docs = docs.filter(pk__gte=min_pk)
+    if max_pk is not None:
+        docs = docs.filter(pk__lte=max_pk)
+    return docs.select_related("parent", "parent_topic", "current_revision").order_by(
+        "pk"
+    )
+
+
+def get_pk_ranges(docs, count):
+    """
+    Split the documents into at most ``count`` inclusive ``(min_pk, max_pk)``
+    ranges, each with about the same number of documents.
+    """
+    pks = docs.order_by("pk").values_list("pk", flat=True)
+    total = pks.count()
+    if not total:
+        return []
+    count = max(1, min(count, total))
+    starts = [pks[total * i // count] for i in range(count)]
+    ends = [start - 1 for start in starts[1:]] + [pks.reverse()[0]]
+    return list(zip(starts, ends))
+
+
+def get_record(doc):
+    """Return the export record of a document."""
+    url = doc.get_absolute_url()
+    redirect_url = doc.get_redirect_url()
+    if redirect_url and redirect_url != url:
+        data = document_api_data(redirect_url=redirect_url)
+    else:
+        data = document_api_data(doc)
+    return dict(data, url=url)
+
+
+def iter_records(docs, chunk_size=100):
+    """
+    Yield ``(pk, record)`` for every document, reading them ``chunk_size``
+    at a time. The MySQL driver buffers whole result sets, even with
+    ``iterator()``, so the chunks are paginated by primary key instead.
+    """
+    docs = docs.order_by("pk")
+    last_pk = None
+    while True:
+        chunk = docs if last_pk is None else docs.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        for doc in chunk:
+            yield doc.pk, get_record(doc)
+        last_pk = chunk[-1].pk
+
+
+def iter_ndjson(docs, chunk_size=100):
+    """Yield the export of the documents, one encoded line at a time."""
+    for _, record in iter_records(docs, chunk_size):
+        yield (json.dumps(record) + "\n").encode("utf-8")
+
+
+def iter_gzip(chunks):
+    """Gzip-compress a stream of bytes, without holding it all in memory."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def get_checkpoint_path(path):
+    return path + CHECKPOINT_SUFFIX
+
+
+def read_checkpoint(path):
+    """Return the checkpoint of the export to ``path``, or ``None``."""
+    try:
+        with open(get_checkpoint_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    # Write then rename, so that a crash never leaves a partial checkpoint.
+    checkpoint_path = get_checkpoint_path(path)
+    with open(checkpoint_path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+
+def start_export(
+    path, locale=None, slug_prefix=None, min_pk=None, max_pk=None, compress=False
+):
+    """
+    Write the initial checkpoint of an export to ``path`` and return it,
+    replacing any previous one.
+    """
+    checkpoint = {
+        "export": {
+            "locale": locale,
+            "slug_prefix": slug_prefix,
+            "min_pk": min_pk,
+            "max_pk": max_pk,
+            "compress": compress,
+        },
+        "last_pk": None,
+        "offset": 0,
+        "count": 0,
+        "done": False,
+    }
+    write_checkpoint(path, checkpoint)
+    return checkpoint
+
+
+def export_to_file(
+    path,
+    locale=None,
+    slug_prefix=None,
+    min_pk=None,
+    max_pk=None,
+    compress=False,
+    checkpoint_every=1000,
+    chunk_size=100,
+):
+    """
+    Export the documents to the file at ``path``, and return the number of
+    documents in it.
+
+    A checkpoint is saved next to the file every ``checkpoint_every``
+    documents. If the checkpoint of an unfinished export with the same
+    arguments exists, the export resumes from it, so anything written after
+    the checkpoint is thrown away and written again. When compressing, every
+    checkpoint closes a gzip member, and the file is a valid multi-member
+    gzip file.
+    """
+    checkpoint = read_checkpoint(path)
+    if checkpoint is None:
+        checkpoint = start_export(
+            path, locale, slug_prefix, min_pk, max_pk, compress=compress
+        )
+    elif checkpoint["export"] != {
+        "locale": locale,
+        "slug_prefix": slug_prefix,
+        "min_pk": min_pk,
+        "max_pk": max_pk,
+        "compress": compress,
+    }:
+        raise ValueError(
+            "The checkpoint of {} is for a different export; remove it to "
+            "start over".format(path)
+        )
+    if checkpoint["done"]:
+        return checkpoint["count"]
+
+    if checkpoint["last_pk"] is not None:
+        min_pk = checkpoint["last_pk"] + 1
+    docs = get_documents(locale, slug_prefix, min_pk, max_pk)
+
+    with open(path, "ab" if checkpoint["offset"] else "wb") as output:
+        output.truncate(checkpoint["offset"])
+
+        def save(lines, last_pk, done=False):
+            data = "".join(lines).encode("utf-8")
+            if compress and data:
+                data = gzip.compress(data)
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.update(
+                last_pk=last_pk,
+                offset=output.tell(),
+                count=checkpoint["count"] + len(lines),
+                done=done,
+            )
+            write_checkpoint(path, checkpoint)
+
+        lines = []
+        last_pk = checkpoint["last_pk"]
+        for last_pk, record in iter_records(docs, chunk_size):
+            lines.append(json.dumps(record) + "\n")
+            if len(lines) >= checkpoint_every:
+                save(lines, last_pk)
+                lines = []
+        save(lines, last_pk, done=True)
+
+    return checkpoint["count"]
@@ -0,0 +1,171 @@
+"""
+Measure the latency of the search API's Elasticsearch queries, comparing
+different ways of running the same searches.
+"""
+
+
+import statistics
+import time
+from collections import namedtuple
+from itertools import product
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kuma.api.v1.search import _find
+from kuma.api.v1.search.forms import SearchForm
+from kuma.api.v1.search.profiling import get_query_shape, SearchProfile
+
+
+HIGHLIGHTERS = ("default", "plain", "unified", "fvh", "none")
+# "none" is a single unpartitioned index, see kuma.search.routing.
+ROUTINGS = ("default", "none", "routing", "index")
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of values fall."""
+    values = sorted(values)
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(values):
+    return {
+        "median": statistics.median(values),
+        "p95": percentile(values, 0.95),
+        "mean": statistics.mean(values),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark search queries against Elasticsearch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "queries", help="The search terms to benchmark", nargs="+", metavar="q"
+        )
+        parser.add_argument(
+            "--locale",
+            action="append",
+            help="Search in this locale (default={}); can be repeated".format(
+                settings.LANGUAGE_CODE
+            ),
+        )
+        parser.add_argument(
+            "--highlighter",
+            action="append",
+            choices=HIGHLIGHTERS,
+            help=(
+                "Highlighter to benchmark; can be repeated to compare them. "
+                '"default" uses settings.SEARCH_HIGHLIGHTER and "none" skips '
+                "highlights and summaries altogether (default=default)"
+            ),
+        )
+        parser.add_argument(
+            "--routing",
+            action="append",
+            choices=ROUTINGS,
+            help=(
+                "How the index is partitioned by locale; can be repeated to "
+                'compare them. "default" uses settings.SEARCH_ROUTING '
+                "(default=default)"
+            ),
+        )
+        parser.add_argument(
+            "--per-locale",
+            action="store_true",
+            help="Search each --locale on its own, and report them separately",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="Run each query this many times per variant (default=10)",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=10,
+            help="The number of results per search (default=10)",
+        )
+        parser.add_argument(
+            "--suggest",
+            action="store_true",
+            help="Also make (and time) spelling suggestions",
+        )
+
+    def get_variants(self, options):
+        """
+        Return a list of ``(name, params, find_kwargs)`` tuples, one for each
+        way of running the searches that should be compared.
+        """
+        locales = [x.lower() for x in options["locale"] or [settings.LANGUAGE_CODE]]
+        base_params = {
+            "locales": locales,
+            "archive": "exclude",
+            "size": max(options["size"], 1),
+            "page": 1,
+            "sort": "",
+            "slug_prefixes": [],
+            "fields": list(SearchForm.FIELD_CHOICES),
+        }
+        if options["per_locale"]:
+            locale_groups = [[locale] for locale in locales]
+        else:
+            locale_groups = [locales]
+        variants = []
+        for highlighter, routing, group in product(
+            options["highlighter"] or ["default"],
+            options["routing"] or ["default"],
+            locale_groups,
+        ):
+            params = dict(base_params, locales=group)
+            find_kwargs = {"make_suggestions": options["suggest"]}
+            if highlighter == "none":
+                params["fields"] = [
+                    x for x in params["fields"] if x not in ("highlight", "summary")
+                ]
+            elif highlighter != "default":
+                find_kwargs["highlighter"] = highlighter
+            if routing == "none":
+                find_kwargs["routing"] = ""
+            elif routing != "default":
+                find_kwargs["routing"] = routing
+            name = "{} highlighter, {} routing, {}".format(
+                highlighter, routing, "+".join(group)
+            )
+            variants.append((name, params, find_kwargs))
+        return variants
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        repeat = options["repeat"]
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        for name, params, find_kwargs in self.get_variants(options):
+            wall_ms = []
+            took_ms = []
+            for _ in range(repeat):
+                for query in options["queries"]:
+                    query_params = dict(params, query=query)
+                    # Profile without finishing, so the benchmark doesn't end
+                    # up in the search stats.
+                    profile = SearchProfile(
+                        get_query_shape(query_params, find_kwargs["make_suggestions"])
+                    )
+                    start = time.monotonic()
+                    _find(query_params, profile=profile, **find_kwargs)
+                    wall_ms.append((time.monotonic() - start) * 1000)
+                    took_ms.append(profile.took_ms)
+            wall = summarize(wall_ms)
+            took = summarize(took_ms)
+            log.info(
+                "{name}: {count} searches, wall-clock median {wall[median]:.1f}ms "
+                "p95 {wall[p95]:.1f}ms mean {wall[mean]:.1f}ms, Elasticsearch "
+                "median {took[median]:.1f}ms p95 {took[p95]:.1f}ms "
+                "mean {took[mean]:.1f}ms".format(
+                    name=name, count=len(wall_ms), wall=wall, took=took
+                )
+            )
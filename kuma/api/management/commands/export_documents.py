@@ -0,0 +1,129 @@
+"""
+Export documents, in the shape of the document API, as newline-delimited JSON.
+"""
+
+
+import os
+from collections import namedtuple
+
+from celery.canvas import group
+from django.core.management.base import BaseCommand, CommandError
+
+from kuma.api.export import (
+    export_to_file,
+    get_checkpoint_path,
+    get_documents,
+    get_pk_ranges,
+    read_checkpoint,
+    start_export,
+)
+from kuma.api.tasks import export_documents
+
+
+def get_part_path(path, index):
+    return "{}.part{:03d}".format(path, index + 1)
+
+
+class Command(BaseCommand):
+    help = "Export documents as newline-delimited JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The file to export to")
+        parser.add_argument("--locale", help="Only export documents in this locale")
+        parser.add_argument(
+            "--slug-prefix", help="Only export documents whose slug starts with this"
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Gzip-compress the export"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Split the export into this many primary key ranges, each "
+                "exported to its own part file by a parallel task (default=1, "
+                "which exports in this process)"
+            ),
+        )
+        parser.add_argument(
+            "--checkpoint-every",
+            type=int,
+            default=1000,
+            help="Save a checkpoint every this many documents (default=1000)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore any checkpoints and start the export over",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        path = options["path"]
+        workers = max(options["workers"], 1)
+        checkpoint_every = max(options["checkpoint_every"], 1)
+        export = {
+            "locale": options["locale"],
+            "slug_prefix": options["slug_prefix"],
+            "compress": options["gzip"],
+        }
+
+        if workers == 1:
+            if options["restart"] and os.path.exists(get_checkpoint_path(path)):
+                os.remove(get_checkpoint_path(path))
+            try:
+                count = export_to_file(
+                    path, checkpoint_every=checkpoint_every, **export
+                )
+            except ValueError as err:
+                raise CommandError(str(err))
+            log.info("Exported {} documents to {}".format(count, path))
+            return
+
+        # The checkpoints of all the parts are written before any of them is
+        # scheduled, so they either all exist, or none do. There can be
+        # fewer parts than workers when there are very few documents.
+        checkpoints = []
+        for i in range(workers):
+            checkpoint = read_checkpoint(get_part_path(path, i))
+            if checkpoint is None:
+                break
+            checkpoints.append(checkpoint)
+        if checkpoints and not options["restart"]:
+            for checkpoint in checkpoints:
+                if any(checkpoint["export"][k] != v for k, v in export.items()):
+                    raise CommandError(
+                        "The checkpoints of {} are for a different export; use "
+                        "--restart to start over".format(path)
+                    )
+            log.info("Resuming the export from its checkpoints")
+        else:
+            docs = get_documents(options["locale"], options["slug_prefix"])
+            checkpoints = [
+                start_export(
+                    get_part_path(path, i), min_pk=min_pk, max_pk=max_pk, **export
+                )
+                for i, (min_pk, max_pk) in enumerate(get_pk_ranges(docs, workers))
+            ]
+            if not checkpoints:
+                log.info("No documents to export")
+                return
+
+        # The parts are exported in a group of tasks that can run in
+        # parallel. Each part resumes from its own checkpoint.
+        tasks = [
+            export_documents.si(
+                get_part_path(path, i),
+                checkpoint_every=checkpoint_every,
+                **checkpoint["export"],
+            )
+            for i, checkpoint in enumerate(checkpoints)
+            if not checkpoint["done"]
+        ]
+        group(tasks).apply_async()
+        log.info(
+            "Scheduled the export of {} parts; once done, concatenate "
+            "{} in order".format(len(tasks), get_part_path(path, 0)[:-3] + "*")
+        )
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from waffle.models import Flag, Switch
+
+from kuma.core.utils import bump_version_token
+
+from .v1.waffle_snapshot import WAFFLE_VERSION_CACHE_KEY
+
+
+@receiver(post_save, sender=Flag, dispatch_uid="api.waffle_flag.post_save")
+@receiver(post_delete, sender=Flag, dispatch_uid="api.waffle_flag.post_delete")
+@receiver(post_save, sender=Switch, dispatch_uid="api.waffle_switch.post_save")
+@receiver(post_delete, sender=Switch, dispatch_uid="api.waffle_switch.post_delete")
+def on_waffle_change(sender, instance, **kwargs):
+    """
+    Rebuild the waffle snapshots of whoami, with their version bumped.
+    Waffle only flushes its own cache of the flags and switches on commit,
+    after the version is bumped again, so it's flushed here first, now and
+    on commit, for no snapshot to be built from the old ones.
+    """
+    instance.flush()
+    transaction.on_commit(instance.flush)
+    bump_version_token(WAFFLE_VERSION_CACHE_KEY)
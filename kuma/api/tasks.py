@@ -0,0 +1,37 @@
+import logging
+
+from celery import task
+
+from kuma.core.decorators import skip_in_maintenance_mode
+
+from .export import export_to_file
+
+
+log = logging.getLogger("kuma.api.tasks")
+
+
+@task
+@skip_in_maintenance_mode
+def export_documents(
+    path,
+    locale=None,
+    slug_prefix=None,
+    min_pk=None,
+    max_pk=None,
+    compress=False,
+    checkpoint_every=1000,
+):
+    """
+    Export the documents in a primary key range to a file, resuming from its
+    checkpoint if there is one.
+    """
+    count = export_to_file(
+        path,
+        locale=locale,
+        slug_prefix=slug_prefix,
+        min_pk=min_pk,
+        max_pk=max_pk,
+        compress=compress,
+        checkpoint_every=checkpoint_every,
+    )
+    log.info("Exported {} documents to {}".format(count, path))
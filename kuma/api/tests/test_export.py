@@ -0,0 +1,120 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+from mock import patch
+
+from kuma.wiki.models import Document
+
+from ..export import (
+    export_to_file,
+    get_documents,
+    get_pk_ranges,
+    read_checkpoint,
+    write_checkpoint,
+)
+
+
+def read_export(path, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "rt") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def docs(root_doc, trans_doc, redirect_doc):
+    return [root_doc, trans_doc, redirect_doc]
+
+
+def test_get_documents(docs):
+    assert list(get_documents()) == sorted(docs, key=lambda doc: doc.pk)
+    assert list(get_documents(locale="fr")) == [docs[1]]
+    assert list(get_documents(slug_prefix="Ro")) == [docs[0]]
+
+
+def test_get_pk_ranges(docs):
+    pks = sorted(doc.pk for doc in docs)
+    assert get_pk_ranges(get_documents(), 1) == [(pks[0], pks[2])]
+    assert get_pk_ranges(get_documents(), 2) == [
+        (pks[0], pks[1] - 1),
+        (pks[1], pks[2]),
+    ]
+    assert len(get_pk_ranges(get_documents(), 10)) == 3
+    assert get_pk_ranges(get_documents(locale="de"), 4) == []
+
+
+@pytest.mark.parametrize("compress", (False, True))
+def test_export_to_file(docs, tmp_path, compress):
+    path = str(tmp_path / "export.ndjson")
+    assert export_to_file(path, compress=compress, checkpoint_every=2) == 3
+    records = read_export(path, compress)
+    assert [record["url"] for record in records] == [
+        doc.get_absolute_url() for doc in docs
+    ]
+    assert records[0]["documentData"]["title"] == docs[0].title
+    assert records[0]["redirectURL"] is None
+    assert records[2]["documentData"] is None
+    assert records[2]["redirectURL"] == docs[0].get_absolute_url()
+    assert read_checkpoint(path)["done"]
+
+
+def test_export_to_file_resume(docs, tmp_path):
+    path = str(tmp_path / "export.ndjson.gz")
+    export_to_file(path, compress=True, checkpoint_every=1)
+    complete = read_export(path, compress=True)
+
+    # Simulate a crash after the first checkpoint, with a partially written
+    # record after it.
+    checkpoints = []
+    with patch("kuma.api.export.write_checkpoint") as mock_write:
+        mock_write.side_effect = lambda p, c: checkpoints.append(dict(c))
+        export_to_file(path + ".2", compress=True, checkpoint_every=1)
+    write_checkpoint(path, checkpoints[1])
+    with open(path, "ab") as f:
+        f.write(b"garbage")
+
+    # Documents past the checkpoint are only read when resuming.
+    Document.objects.filter(pk=docs[2].pk).update(title="Changed")
+    with patch("kuma.api.export.get_record", wraps=lambda doc: {"pk": doc.pk}):
+        assert export_to_file(path, compress=True, checkpoint_every=1) == 3
+    assert read_export(path, compress=True) == complete[:1] + [
+        {"pk": docs[1].pk},
+        {"pk": docs[2].pk},
+    ]
+
+    # A finished export isn't redone.
+    assert export_to_file(path, compress=True) == 3
+    with pytest.raises(ValueError):
+        export_to_file(path, locale="fr", compress=True)
+
+
+def test_export_documents_command(docs, tmp_path):
+    path = str(tmp_path / "export.ndjson")
+    call_command("export_documents", path, "--locale=fr")
+    assert [r["url"] for r in read_export(path)] == [docs[1].get_absolute_url()]
+
+
+def test_export_documents_command_workers(docs, tmp_path, settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    path = str(tmp_path / "export.ndjson")
+    call_command("export_documents", path, "--workers=2", "--gzip")
+    records = read_export(path + ".part001", True) + read_export(
+        path + ".part002", True
+    )
+    assert [r["url"] for r in records] == [doc.get_absolute_url() for doc in docs]
+
+    # Running it again resumes from the (finished) checkpoints.
+    with patch("kuma.api.export.get_record") as get_record:
+        call_command("export_documents", path, "--workers=2", "--gzip")
+    assert not get_record.called
+
+
+def test_export_documents_command_workers_checkpoint_every(docs, tmp_path, settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    path = str(tmp_path / "export.ndjson")
+    with patch("kuma.api.tasks.export_to_file", return_value=1) as export_to_file:
+        call_command("export_documents", path, "--workers=2", "--checkpoint-every=10")
+    assert export_to_file.call_count == 2
+    for call in export_to_file.call_args_list:
+        assert call[1]["checkpoint_every"] == 10
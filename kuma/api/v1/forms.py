@@ -13,3 +13,11 @@ class AccountSettingsForm(forms.Form):
         # have a complete list of all possible languages
         choices=[(code, name) for code, name in settings.LANGUAGES],
     )
+
+
+class ExportForm(forms.Form):
+    locale = forms.ChoiceField(
+        required=False,
+        choices=[(code, name) for code, name in settings.LANGUAGES],
+    )
+    slug_prefix = forms.CharField(required=False)
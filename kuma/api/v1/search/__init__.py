@@ -1,13 +1,18 @@
 from django import http
 from django.conf import settings
 from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
 from elasticsearch import exceptions
 from elasticsearch_dsl import Q, query, Search
 from redo import retrying
 
 from kuma.api.v1.decorators import allow_CORS_GET
+from kuma.core.decorators import superuser_required
+from kuma.search.routing import get_search_target
 
 from .forms import SearchForm
+from .profiling import get_query_shape, get_stats, SearchProfile
 
 # This is the number of seconds to be put into the Cache-Control max-age header
 # if the search is successful.
@@ -15,6 +20,10 @@ from .forms import SearchForm
 # the `/api/v1/search` works.
 SEARCH_CACHE_CONTROL_MAX_AGE = 60 * 60 * 12
 
+# The fields of a search result that come from the document's `_source`.
+# Everything else (notably the big `body`) is left out of the response.
+SOURCE_FIELDS = ("title", "locale", "slug", "popularity", "archived", "summary")
+
 
 class JsonResponse(http.JsonResponse):
     """The only reason this exists is so that other Django views can call
@@ -59,6 +68,7 @@ def search(request, locale=None):
         "sort": form.cleaned_data["sort"],
         # The `slug` is always stored, as a Keyword index, in lowercase.
         "slug_prefixes": [x.lower() for x in form.cleaned_data["slug_prefix"]],
+        "fields": form.cleaned_data["fields"] or list(SearchForm.FIELD_CHOICES),
     }
 
     # By default, assume that we will try to make suggestions.
@@ -70,10 +80,13 @@ def search(request, locale=None):
         # errors which are hard to prevent against.
         make_suggestions = False
 
+    profile = SearchProfile(get_query_shape(params, make_suggestions))
     results = _find(
         params,
         make_suggestions=make_suggestions,
+        profile=profile,
     )
+    profile.finish()
     response = JsonResponse(results)
 
     # The reason for caching is that most of the time, the searches people make
@@ -95,10 +108,43 @@ def search(request, locale=None):
     return response
 
 
-def _find(params, total_only=False, make_suggestions=False, min_suggestion_score=0.8):
+@never_cache
+@require_safe
+@superuser_required
+def search_stats(request):
+    """
+    Return the recent timings of search requests, aggregated per query shape.
+    """
+    return http.JsonResponse(
+        {
+            "window_seconds": settings.SEARCH_STATS_WINDOW_SECONDS,
+            "windows": settings.SEARCH_STATS_WINDOWS,
+            "slow_query_ms": settings.SEARCH_SLOW_QUERY_MS,
+            "shapes": get_stats(),
+        }
+    )
+
+
+def _find(
+    params,
+    total_only=False,
+    make_suggestions=False,
+    min_suggestion_score=0.8,
+    profile=None,
+    highlighter=None,
+    routing=None,
+):
+    if highlighter is None:
+        highlighter = settings.SEARCH_HIGHLIGHTER
+    fields = params.get("fields", SearchForm.FIELD_CHOICES)
+
+    # Only search the partitions of the index that hold the locales.
+    indexes, routing_key = get_search_target(params["locales"], routing)
     search_query = Search(
-        index=settings.SEARCH_INDEX_NAME,
+        index=indexes,
     )
+    if routing_key:
+        search_query = search_query.params(routing=routing_key)
     if make_suggestions:
         # XXX research if it it's better to use phrase suggesters and if
         # that works
@@ -134,14 +180,22 @@ def _find(params, total_only=False, make_suggestions=False, min_suggestion_score
         sub_queries = [Q("prefix", slug=x) for x in params["slug_prefixes"]]
         search_query = search_query.query(query.Bool(should=sub_queries))
 
-    search_query = search_query.highlight_options(
-        pre_tags=["<mark>"],
-        post_tags=["</mark>"],
-        number_of_fragments=3,
-        fragment_size=120,
-        encoder="html",
-    )
-    search_query = search_query.highlight("title", "body")
+    # Highlighting is one of the most expensive parts of a search, so only
+    # do it when the highlights are going to be returned.
+    if "highlight" in fields and not total_only:
+        highlight_options = {
+            "pre_tags": ["<mark>"],
+            "post_tags": ["</mark>"],
+            "number_of_fragments": 3,
+            "fragment_size": 120,
+            "encoder": "html",
+        }
+        if highlighter:
+            # Note that the "fvh" highlighter requires the title and body to
+            # be indexed with `"term_vector": "with_positions_offsets"`.
+            highlight_options["type"] = highlighter
+        search_query = search_query.highlight_options(**highlight_options)
+        search_query = search_query.highlight("title", "body")
 
     if params["sort"] == "relevance":
         search_query = search_query.sort("_score", "-popularity")
@@ -168,11 +222,15 @@ def _find(params, total_only=False, make_suggestions=False, min_suggestion_score
             score_mode=score_mode,
         )
 
-    search_query = search_query.source(excludes=["body"])
-
-    search_query = search_query[
-        params["size"] * (params["page"] - 1) : params["size"] * params["page"]
-    ]
+    if total_only:
+        # Only the number of matches is needed, not the matches themselves.
+        search_query = search_query.source(False)[:0]
+    else:
+        includes = [field for field in SOURCE_FIELDS if field in fields]
+        search_query = search_query.source(includes or False)
+        search_query = search_query[
+            params["size"] * (params["page"] - 1) : params["size"] * params["page"]
+        ]
 
     retry_options = {
         "retry_exceptions": (
@@ -192,6 +250,9 @@ def _find(params, total_only=False, make_suggestions=False, min_suggestion_score
     with retrying(search_query.execute, **retry_options) as retrying_function:
         response = retrying_function()
 
+    if profile:
+        profile.add_query(search_query, response.took, is_suggestion=total_only)
+
     if total_only:
         return response.hits.total
 
@@ -208,29 +269,27 @@ def _find(params, total_only=False, make_suggestions=False, min_suggestion_score
     }
     documents = []
     for hit in response:
-        try:
-            body_highlight = list(hit.meta.highlight.body)
-        except AttributeError:
-            body_highlight = []
-        try:
-            title_highlight = list(hit.meta.highlight.title)
-        except AttributeError:
-            title_highlight = []
-
-        d = {
-            "mdn_url": hit.meta.id,
-            "score": hit.meta.score,
-            "title": hit.title,
-            "locale": hit.locale,
-            "slug": hit.slug,
-            "popularity": hit.popularity,
-            "archived": hit.archived,
-            "summary": hit.summary,
-            "highlight": {
+        d = {}
+        if "mdn_url" in fields:
+            d["mdn_url"] = hit.meta.id
+        if "score" in fields:
+            d["score"] = hit.meta.score
+        for field in SOURCE_FIELDS:
+            if field in fields:
+                d[field] = getattr(hit, field)
+        if "highlight" in fields:
+            try:
+                body_highlight = list(hit.meta.highlight.body)
+            except AttributeError:
+                body_highlight = []
+            try:
+                title_highlight = list(hit.meta.highlight.title)
+            except AttributeError:
+                title_highlight = []
+            d["highlight"] = {
                 "body": body_highlight,
                 "title": title_highlight,
-            },
-        }
+            }
         documents.append(d)
 
     try:
@@ -250,7 +309,12 @@ def _find(params, total_only=False, make_suggestions=False, min_suggestion_score
             if score > min_suggestion_score or 1:
                 # Sure, this is different way to spell, but what will it yield
                 # if you actually search it?
-                total = _find(dict(params, query=string), total_only=True)
+                total = _find(
+                    dict(params, query=string),
+                    total_only=True,
+                    profile=profile,
+                    routing=routing,
+                )
                 if total["value"] > 0:
                     suggestions.append(
                         {
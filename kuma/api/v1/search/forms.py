@@ -47,6 +47,24 @@ class SearchForm(forms.Form):
 
     slug_prefix = TypedMultipleValueField(required=False)
 
+    # The fields to return for each matching document. The default is all of
+    # them, but clients that don't show highlights or summaries can make
+    # searches cheaper by leaving them out.
+    FIELD_CHOICES = (
+        "mdn_url",
+        "score",
+        "title",
+        "locale",
+        "slug",
+        "popularity",
+        "archived",
+        "summary",
+        "highlight",
+    )
+    fields = forms.MultipleChoiceField(
+        required=False, choices=[(x, x) for x in FIELD_CHOICES]
+    )
+
     def __init__(self, data, **kwargs):
         initial = kwargs.get("initial", {})
         # This makes it possible to supply `initial={some dict}` to the form
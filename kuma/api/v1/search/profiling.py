@@ -0,0 +1,181 @@
+"""
+Lightweight profiling of the search API.
+
+Every search request is classified by its "shape" (the kinds of Elasticsearch
+sub-queries it compiles to) and its timings are added to a rolling histogram
+stored in the shared cache, so that all web workers contribute to the same
+numbers. Searches that are slower than a threshold are also logged together
+with the compiled query DSL.
+"""
+import json
+import logging
+import time
+from itertools import product
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .forms import SearchForm
+
+log = logging.getLogger("kuma.api.v1.search")
+
+# Upper bounds, in milliseconds, of the wall-clock time histogram buckets.
+# Anything slower ends up in the last, open-ended, bucket.
+HISTOGRAM_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+FEATURES = ("phrase", "slug_prefix", "highlight", "suggest")
+
+CACHE_KEY_PREFIX = "search-stats"
+
+
+def get_query_shape(params, make_suggestions=False):
+    """
+    Return a short name for the kind of Elasticsearch query that the given
+    search parameters compile to, like "best+phrase+highlight+suggest".
+    """
+    # An empty sort means "best", see _find().
+    parts = [params["sort"] or "best"]
+    if " " in params["query"]:
+        parts.append("phrase")
+    if params["slug_prefixes"]:
+        parts.append("slug_prefix")
+    if "highlight" in params.get("fields", SearchForm.FIELD_CHOICES):
+        parts.append("highlight")
+    if make_suggestions:
+        parts.append("suggest")
+    return "+".join(parts)
+
+
+def all_query_shapes():
+    """Every shape that get_query_shape() can return."""
+    for sort in SearchForm.SORT_CHOICES:
+        for flags in product((False, True), repeat=len(FEATURES)):
+            yield "+".join(
+                [sort] + [feature for feature, on in zip(FEATURES, flags) if on]
+            )
+
+
+def get_bucket(duration_ms):
+    """Return the upper bound of the histogram bucket for a duration."""
+    for bound in HISTOGRAM_BUCKETS_MS:
+        if duration_ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+class SearchProfile:
+    """
+    Collects the timings of all the Elasticsearch queries made while
+    serving a single search request.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.took_ms = 0
+        self.suggestion_queries = 0
+        self.wall_ms = None
+        self.query_dsl = None
+        self._start = time.monotonic()
+
+    def add_query(self, search_query, took_ms, is_suggestion=False):
+        self.took_ms += took_ms
+        if is_suggestion:
+            self.suggestion_queries += 1
+        else:
+            self.query_dsl = search_query.to_dict()
+
+    def finish(self):
+        self.wall_ms = int((time.monotonic() - self._start) * 1000)
+        if self.wall_ms >= settings.SEARCH_SLOW_QUERY_MS:
+            log.warning(
+                "Slow search (%s): %dms wall-clock, %dms in Elasticsearch, "
+                "%d suggestion queries. Query: %s",
+                self.shape,
+                self.wall_ms,
+                self.took_ms,
+                self.suggestion_queries,
+                json.dumps(self.query_dsl),
+            )
+        record(self)
+
+
+def _get_window(now=None):
+    return int((now or time.time()) // settings.SEARCH_STATS_WINDOW_SECONDS)
+
+
+def _make_key(window, shape, name):
+    return "{}:{}:{}:{}".format(CACHE_KEY_PREFIX, window, shape, name)
+
+
+def _incr(key, delta):
+    timeout = settings.SEARCH_STATS_WINDOW_SECONDS * settings.SEARCH_STATS_WINDOWS
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # The key doesn't exist yet, or expired. If another process happens
+        # to add it in the meantime, the add is a no-op and we still incr.
+        if not cache.add(key, delta, timeout):
+            cache.incr(key, delta)
+
+
+def record(profile):
+    """Add the profile of a finished search to the current window."""
+    window = _get_window()
+    _incr(_make_key(window, profile.shape, "count"), 1)
+    _incr(_make_key(window, profile.shape, "took_ms"), profile.took_ms)
+    _incr(_make_key(window, profile.shape, "wall_ms"), profile.wall_ms)
+    _incr(
+        _make_key(window, profile.shape, "suggestion_queries"),
+        profile.suggestion_queries,
+    )
+    _incr(_make_key(window, profile.shape, get_bucket(profile.wall_ms)), 1)
+
+
+def _percentile(histogram, count, fraction):
+    """Estimate a percentile as the upper bound of the bucket it falls in."""
+    seen = 0
+    for bucket, value in histogram.items():
+        seen += value
+        if seen >= count * fraction:
+            return bucket
+    return None
+
+
+def get_stats(now=None):
+    """
+    Aggregate the recorded profiles of the last SEARCH_STATS_WINDOWS
+    windows, per query shape. Shapes without any searches are omitted.
+    """
+    current = _get_window(now)
+    windows = range(current - settings.SEARCH_STATS_WINDOWS + 1, current + 1)
+    buckets = [str(bound) for bound in HISTOGRAM_BUCKETS_MS] + ["inf"]
+    names = ["count", "took_ms", "wall_ms", "suggestion_queries"] + buckets
+    shapes = list(all_query_shapes())
+    keys = [
+        _make_key(window, shape, name)
+        for window in windows
+        for shape in shapes
+        for name in names
+    ]
+    values = cache.get_many(keys)
+
+    stats = {}
+    for shape in shapes:
+        totals = dict.fromkeys(names, 0)
+        for window in windows:
+            for name in names:
+                totals[name] += values.get(_make_key(window, shape, name), 0)
+        count = totals["count"]
+        if not count:
+            continue
+        histogram = {bucket: totals[bucket] for bucket in buckets}
+        stats[shape] = {
+            "count": count,
+            "mean_took_ms": totals["took_ms"] / count,
+            "mean_wall_ms": totals["wall_ms"] / count,
+            "mean_suggestion_queries": totals["suggestion_queries"] / count,
+            "p50_wall_ms": _percentile(histogram, count, 0.5),
+            "p95_wall_ms": _percentile(histogram, count, 0.95),
+            "histogram": histogram,
+        }
+    return stats
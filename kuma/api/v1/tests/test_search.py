@@ -1,7 +1,15 @@
 import pytest
+from django.core.management import call_command
 from elasticmock import FakeElasticsearch
+from elasticsearch_dsl import Search
 from mock import patch
 
+from kuma.api.v1.search.profiling import (
+    all_query_shapes,
+    get_query_shape,
+    get_stats,
+    SearchProfile,
+)
 from kuma.core.urlresolvers import reverse
 
 
@@ -47,6 +55,11 @@ def test_search_validation_problems(user_client, settings):
     assert response.status_code == 400
     assert response.json()["errors"]["slug_prefix"][0]["code"] == "invalid_choice"
 
+    # 'fields' not a valid value
+    response = user_client.get(url, {"q": "x", "fields": "body"})
+    assert response.status_code == 400
+    assert response.json()["errors"]["fields"][0]["code"] == "invalid_choice"
+
 
 class FindEverythingFakeElasticsearch(FakeElasticsearch):
     def search(self, *args, **kwargs):
@@ -115,3 +128,203 @@ def test_search_basic_match(user_client, settings, mock_elasticsearch):
             "summary": "Foo summary",
         }
     ]
+
+
+def test_search_fields(user_client, settings, mock_elasticsearch):
+    mock_elasticsearch.index(
+        settings.SEARCH_INDEX_NAME,
+        {
+            "id": "/en-us/docs/Foo",
+            "title": "Foo Title",
+            "summary": "Foo summary",
+            "locale": "en-us",
+            "archived": False,
+            "slug": "Foo",
+            "popularity": 0,
+        },
+        id="/en-us/docs/Foo",
+    )
+    with patch.object(
+        mock_elasticsearch, "search", wraps=mock_elasticsearch.search
+    ) as search:
+        response = user_client.get(
+            reverse("api.v1.search"), {"q": "x", "fields": ["mdn_url", "title"]}
+        )
+    assert response.status_code == 200
+    assert response.json()["documents"] == [
+        {"mdn_url": "/en-us/docs/Foo", "title": "Foo Title"}
+    ]
+    body = search.call_args_list[0][1]["body"]
+    assert "highlight" not in body
+    assert body["_source"] == ["title"]
+
+
+@pytest.mark.parametrize(
+    "routing,locales,expected_indexes,expected_routing",
+    (
+        ("", ["de"], ["mdn_docs"], None),
+        ("routing", ["fr", "de"], ["mdn_docs"], "de,fr"),
+        ("index", ["fr", "de"], ["mdn_docs_de", "mdn_docs_fr"], None),
+    ),
+)
+def test_search_routing(
+    client,
+    settings,
+    mock_elasticsearch,
+    routing,
+    locales,
+    expected_indexes,
+    expected_routing,
+):
+    settings.SEARCH_INDEX_NAME = "mdn_docs"
+    settings.SEARCH_ROUTING = routing
+    with patch.object(mock_elasticsearch, "search") as search:
+        search.return_value = {
+            "took": 1,
+            "hits": {"total": {"value": 0, "relation": "eq"}, "hits": []},
+        }
+        response = client.get(reverse("api.v1.search"), {"q": "x", "locale": locales})
+    assert response.status_code == 200
+    kwargs = search.call_args[1]
+    assert kwargs["index"] == expected_indexes
+    assert kwargs.get("routing") == expected_routing
+
+
+@pytest.mark.parametrize(
+    "query,sort,slug_prefixes,fields,make_suggestions,expected",
+    (
+        ("foo", "", [], ["title"], False, "best"),
+        ("foo bar", "relevance", [], ["title"], True, "relevance+phrase+suggest"),
+        ("foo", "popularity", ["web/css"], ["title"], False, "popularity+slug_prefix"),
+        ("foo", "best", [], ["highlight"], False, "best+highlight"),
+    ),
+)
+def test_get_query_shape(
+    query, sort, slug_prefixes, fields, make_suggestions, expected
+):
+    params = {
+        "query": query,
+        "sort": sort,
+        "slug_prefixes": slug_prefixes,
+        "fields": fields,
+    }
+    shape = get_query_shape(params, make_suggestions)
+    assert shape == expected
+    assert shape in all_query_shapes()
+
+
+def test_search_profiling(client, settings, mock_elasticsearch, caplog):
+    settings.SEARCH_SLOW_QUERY_MS = 0
+    mock_elasticsearch.index(
+        settings.SEARCH_INDEX_NAME,
+        {
+            "id": "/en-us/docs/Foo",
+            "title": "Foo Title",
+            "summary": "Foo summary",
+            "locale": "en-us",
+            "archived": False,
+            "slug": "Foo",
+            "popularity": 0,
+        },
+        id="/en-us/docs/Foo",
+    )
+    response = client.get(reverse("api.v1.search"), {"q": "foo bar"})
+    assert response.status_code == 200
+
+    slow_logs = [r for r in caplog.records if r.name == "kuma.api.v1.search"]
+    assert len(slow_logs) == 1
+    assert "best+phrase+highlight+suggest" in slow_logs[0].getMessage()
+    assert '"function_score"' in slow_logs[0].getMessage()
+
+    stats = get_stats()
+    shape = "best+phrase+highlight+suggest"
+    assert list(stats) == [shape]
+    assert stats[shape]["count"] == 1
+    assert sum(stats[shape]["histogram"].values()) == 1
+
+
+@pytest.mark.django_db
+def test_search_stats(client, admin_client, settings):
+    url = reverse("api.v1.search_stats")
+    response = client.get(url)
+    assert response.status_code == 302
+
+    profile = SearchProfile("best")
+    profile.add_query(Search(), 40)
+    profile.finish()
+    response = admin_client.get(url)
+    assert response.status_code == 200
+    assert "no-cache" in response["Cache-Control"]
+    data = response.json()
+    assert data["slow_query_ms"] == settings.SEARCH_SLOW_QUERY_MS
+    assert data["shapes"]["best"]["count"] == 1
+    assert data["shapes"]["best"]["mean_took_ms"] == 40
+
+
+def test_benchmark_search(settings, mock_elasticsearch, capsys):
+    mock_elasticsearch.index(
+        settings.SEARCH_INDEX_NAME,
+        {
+            "title": "Foo Title",
+            "summary": "Foo summary",
+            "locale": "en-us",
+            "archived": False,
+            "slug": "Foo",
+            "popularity": 0,
+        },
+        id="/en-us/docs/Foo",
+    )
+    call_command(
+        "benchmark_search",
+        "foo",
+        "--repeat=2",
+        "--highlighter=unified",
+        "--highlighter=none",
+    )
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 2
+    assert out[0].startswith("unified highlighter, default routing, en-us: 2 ")
+    assert out[1].startswith("none highlighter, default routing, en-us: 2 ")
+    # Benchmarks don't count towards the search stats.
+    assert get_stats() == {}
+
+
+def test_benchmark_search_per_locale(settings, mock_elasticsearch, capsys):
+    mock_elasticsearch.index(
+        settings.SEARCH_INDEX_NAME,
+        {
+            "title": "Foo Title",
+            "summary": "Foo summary",
+            "locale": "en-us",
+            "archived": False,
+            "slug": "Foo",
+            "popularity": 0,
+        },
+        id="/en-us/docs/Foo",
+    )
+    with patch.object(
+        mock_elasticsearch, "search", wraps=mock_elasticsearch.search
+    ) as search:
+        call_command(
+            "benchmark_search",
+            "foo",
+            "--repeat=1",
+            "--locale=en-US",
+            "--locale=de",
+            "--per-locale",
+            "--routing=none",
+            "--routing=routing",
+        )
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in out] == [
+        "default highlighter, none routing, en-us",
+        "default highlighter, none routing, de",
+        "default highlighter, routing routing, en-us",
+        "default highlighter, routing routing, de",
+    ]
+    assert [call[1].get("routing") for call in search.call_args_list] == [
+        None,
+        None,
+        "en-us",
+        "de",
+    ]
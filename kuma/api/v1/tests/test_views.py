@@ -1,3 +1,5 @@
+import gzip
+import json
 import time
 from types import SimpleNamespace
 from unittest import mock
@@ -59,6 +61,44 @@ def test_whoami_anonymous(client, settings):
     assert_no_cache_header(response)
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "accept_language,expected",
+    (("fr", {"flag_fr": True, "flag_half": True}), ("de", {"flag_half": True})),
+)
+def test_whoami_anonymous_flags(client, accept_language, expected):
+    """Anonymous users get the flags of their language, and percent flags."""
+    Flag.objects.all().delete()
+    Flag.objects.create(name="flag_fr", languages="fr, ja", superusers=False)
+    Flag.objects.create(name="flag_half", percent=50, superusers=False)
+    Flag.objects.create(name="flag_off", everyone=False, percent=50)
+    Flag.objects.create(name="flag_staff", staff=True, percent=50)
+
+    url = reverse("api.v1.whoami")
+    with mock.patch("waffle.models.random.uniform", return_value=10):
+        response = client.get(url, HTTP_ACCEPT_LANGUAGE=accept_language)
+    assert response.status_code == 200
+    assert response.json()["waffle"]["flags"] == expected
+
+
+@pytest.mark.django_db
+def test_whoami_waffle_changes(client):
+    """The waffle snapshot is rebuilt when flags and switches change."""
+    url = reverse("api.v1.whoami")
+    response = client.get(url)
+    assert "switch_on" not in response.json()["waffle"]["switches"]
+
+    Switch.objects.create(name="switch_on", active=True)
+    flag = Flag.objects.create(name="flag_all", everyone=True)
+    response = client.get(url)
+    assert response.json()["waffle"]["switches"]["switch_on"] is True
+    assert response.json()["waffle"]["flags"]["flag_all"] is True
+
+    flag.delete()
+    response = client.get(url)
+    assert "flag_all" not in response.json()["waffle"]["flags"]
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     "is_staff,is_superuser,is_beta_tester",
@@ -821,3 +861,36 @@ def test_set_settings_validation_errors(user_client, wiki_user):
     assert response.status_code == 400
     assert response.json()["errors"]["locale"][0]["code"] == "invalid_choice"
     assert response.json()["errors"]["locale"][0]["message"]
+
+
+def test_export_documents(client, admin_client, root_doc, trans_doc):
+    url = reverse("api.v1.export")
+    response = client.get(url)
+    assert response.status_code == 302
+
+    response = admin_client.get(url, {"locale": "fr"})
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert "Accept-Encoding" in response["Vary"]
+    assert_no_cache_header(response)
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 1
+    data = json.loads(lines[0])
+    assert data["url"] == trans_doc.get_absolute_url()
+    assert data["documentData"]["title"] == trans_doc.title
+
+
+def test_export_documents_gzip(admin_client, root_doc, trans_doc):
+    response = admin_client.get(
+        reverse("api.v1.export"), HTTP_ACCEPT_ENCODING="gzip, deflate"
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    content = gzip.decompress(b"".join(response.streaming_content))
+    assert len(content.decode().splitlines()) == 2
+
+
+def test_export_documents_validation(admin_client):
+    response = admin_client.get(reverse("api.v1.export"), {"locale": "xxx"})
+    assert response.status_code == 400
+    assert response.json()["errors"]["locale"][0]["code"] == "invalid_choice"
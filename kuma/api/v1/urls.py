@@ -5,6 +5,8 @@ from . import search, views
 urlpatterns = [
     re_path(r"^whoami/?$", views.whoami, name="api.v1.whoami"),
     path("settings", views.account_settings, name="api.v1.settings"),
+    path("export", views.export_documents, name="api.v1.export"),
+    path("search/stats", search.search_stats, name="api.v1.search_stats"),
     path("search/<locale>", search.search, name="api.v1.search_legacy"),
     path("search", search.search, name="api.v1.search"),
     path(
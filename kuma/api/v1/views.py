@@ -11,8 +11,10 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.utils import translation
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
@@ -25,10 +27,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from waffle import flag_is_active
 from waffle.decorators import waffle_flag
-from waffle.models import Flag, Switch
 
-from kuma.api.v1.forms import AccountSettingsForm
+from kuma.api.export import get_documents, iter_gzip, iter_ndjson
+from kuma.api.v1.forms import AccountSettingsForm, ExportForm
 from kuma.api.v1.serializers import UserDetailsSerializer
+from kuma.api.v1.waffle_snapshot import get_waffle_snapshot
+from kuma.core.decorators import superuser_required
 from kuma.core.email_utils import render_email
 from kuma.core.ga_tracking import (
     ACTION_SUBSCRIPTION_CANCELED,
@@ -71,7 +75,14 @@ def whoami(request):
             "email": user.email,
             "subscriber_number": user.subscriber_number,
         }
-        if UserSubscription.objects.filter(user=user, canceled__isnull=True).exists():
+        # Users get a subscriber number with their first subscription, so
+        # there's no need to look for the subscriptions of the others.
+        if (
+            user.subscriber_number
+            and UserSubscription.objects.filter(
+                user=user, canceled__isnull=True
+            ).exists()
+        ):
             data["is_subscriber"] = True
         if user.is_staff:
             data["is_staff"] = True
@@ -82,34 +93,14 @@ def whoami(request):
     else:
         data = {}
 
+    # The flags and switches come from a compiled snapshot, that decides
+    # most flags for anonymous users, the majority, without checking them
+    # against the request.
+    snapshot = get_waffle_snapshot()
     data["waffle"] = {
-        "flags": {},
-        "switches": {s.name: True for s in Switch.get_all() if s.is_active()},
+        "flags": {name: True for name in sorted(snapshot.get_flags(request))},
+        "switches": {name: True for name in snapshot.switches},
     }
-    # Specifically and more smartly loop over the waffle Flag objects
-    # to avoid unnecessary `cache.get(...)` calls within the `flag.is_active(request)`.
-    for flag in Flag.get_all():
-        if not request.user.is_authenticated:
-            # Majority of users are anonymous, so let's focus on that.
-            # Let's see if there's a quick reason to bail the
-            # expensive `flag.is_active(request)` call.
-            if (
-                flag.authenticated or flag.staff or flag.superusers
-            ) and not flag.everyone:
-                continue
-            if not (flag.languages or flag.percent or flag.everyone):
-                continue
-            if flag.languages:
-                languages = [ln.strip() for ln in flag.languages.split(",")]
-                if (
-                    not hasattr(request, "LANGUAGE_CODE")
-                    or request.LANGUAGE_CODE not in languages
-                ):
-                    continue
-
-        if flag.is_active(request):
-            data["waffle"]["flags"][flag.name] = True
-
     return JsonResponse(data)
 
 
@@ -162,6 +153,35 @@ def account_settings(request):
     return JsonResponse(context)
 
 
+@never_cache
+@require_GET
+@superuser_required
+def export_documents(request):
+    """
+    Stream the documents of a locale and/or slug prefix, in the shape of the
+    document API, as newline-delimited JSON. The response is gzip-compressed
+    if the client accepts it.
+    """
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors.get_json_data()}, status=400)
+
+    content = iter_ndjson(
+        get_documents(
+            locale=form.cleaned_data["locale"],
+            slug_prefix=form.cleaned_data["slug_prefix"],
+        )
+    )
+    compress = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if compress:
+        content = iter_gzip(content)
+    response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
 @waffle_flag("subscription")
 @never_cache
 @require_POST
@@ -0,0 +1,105 @@
+"""
+A compiled snapshot of the waffle flags and switches, for whoami.
+
+Every page load calls whoami, which used to go through all the flags and
+switches and check each flag against the request. The snapshot has the
+names of the active switches, and the flags sorted by what it takes to
+know if they are active for anonymous users, so that most of them are
+decided with set and dict lookups.
+
+Each process keeps its snapshot until the waffle version in the cache
+changes, which happens when a flag or a switch is saved or deleted (see
+kuma.api.signal_handlers), or when the cache loses it.
+"""
+from waffle.models import Flag, Switch
+from waffle.utils import get_setting
+
+from kuma.core.utils import get_version_token
+
+
+WAFFLE_VERSION_CACHE_KEY = "kuma:api:waffle-version"
+
+_snapshot = None
+
+
+def parse_languages(languages):
+    return frozenset(ln.strip() for ln in languages.split(",") if ln.strip())
+
+
+class WaffleSnapshot:
+    """
+    The waffle state whoami needs:
+
+    * ``switches``: the names of the active switches
+    * ``flags``: the flags, by name
+    * ``everyone``: the names of the flags active for everyone
+    * ``by_language``: the names of the flags active for the anonymous users
+      of each language
+    * ``dynamic``: the names and languages of the flags that must be checked
+      against the request of anonymous users, since they are on for some
+      percent of them, or in testing mode
+    * ``undecided``: the names of the flags that must be checked against the
+      request of authenticated users
+    """
+
+    def __init__(self, flags, switches):
+        self.switches = tuple(
+            sorted(switch.name for switch in switches if switch.is_active())
+        )
+        self.flags = {flag.name: flag for flag in flags}
+        self.everyone = set()
+        self.by_language = {}
+        self.dynamic = []
+        self.undecided = []
+        override = get_setting("OVERRIDE")
+        for flag in flags:
+            if flag.everyone is False:
+                continue
+            if flag.everyone and not override:
+                self.everyone.add(flag.name)
+                continue
+            self.undecided.append(flag.name)
+            # The shortcuts for anonymous users of whoami, that skip the
+            # flags they can't have.
+            if (
+                flag.authenticated or flag.staff or flag.superusers
+            ) and not flag.everyone:
+                continue
+            if not (flag.languages or flag.percent or flag.everyone):
+                continue
+            languages = parse_languages(flag.languages) if flag.languages else None
+            if flag.testing or override:
+                self.dynamic.append((flag.name, languages))
+            elif languages:
+                # Active for these languages, whatever the percent.
+                for language in languages:
+                    self.by_language.setdefault(language, set()).add(flag.name)
+            else:
+                self.dynamic.append((flag.name, None))
+
+    def get_flags(self, request):
+        """Return the names of the flags that are active for the request."""
+        if request.user.is_authenticated:
+            names = set(self.everyone)
+            candidates = self.undecided
+        else:
+            language = getattr(request, "LANGUAGE_CODE", None)
+            names = self.everyone | self.by_language.get(language, set())
+            candidates = [
+                name
+                for name, languages in self.dynamic
+                if languages is None or language in languages
+            ]
+        for name in candidates:
+            if self.flags[name].is_active(request):
+                names.add(name)
+        return names
+
+
+def get_waffle_snapshot():
+    """Return the snapshot of the current waffle version."""
+    global _snapshot
+    version = get_version_token(WAFFLE_VERSION_CACHE_KEY)
+    if _snapshot is None or _snapshot[0] != version:
+        _snapshot = (version, WaffleSnapshot(Flag.get_all(), Switch.get_all()))
+    return _snapshot[1]
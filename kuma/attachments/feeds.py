@@ -8,6 +8,8 @@ from .models import AttachmentRevision
 class AttachmentsFeed(DocumentsFeed):
     title = _("MDN recent file changes")
     subtitle = _("Recent revisions to MDN file attachments")
+    # Not invalidated by the revisions of attachments
+    cache_timeout = None
 
     def items(self):
         return AttachmentRevision.objects.prefetch_related(
@@ -0,0 +1,41 @@
+from django.db import models
+from django.db.models.fields.files import FieldFile
+
+from .utils import get_content_hash
+
+
+class BlobFieldFile(FieldFile):
+    """
+    A file stored once per content and name, under the SHA-256 of its
+    content, whatever the attachment or revision it's uploaded for.
+    """
+
+    def save(self, name, content, save=True):
+        # The upload_to of the field puts the file under this hash.
+        self.instance.content_hash = get_content_hash(content)
+        name = self.field.generate_filename(self.instance, name)
+        if self.storage.exists(name):
+            # The same file was uploaded before, for this or another
+            # attachment, so it's shared.
+            self.name = name
+        else:
+            self.name = self.storage.save(
+                name, content, max_length=self.field.max_length
+            )
+        setattr(self.instance, self.field.name, self.name)
+        self._committed = True
+
+        # Save the object because it has changed, unless save is False
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class BlobFileField(models.FileField):
+    """
+    A FileField for content-addressed files. The model needs a
+    ``content_hash`` field, set when a file is saved.
+    """
+
+    attr_class = BlobFieldFile
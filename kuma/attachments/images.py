@@ -0,0 +1,39 @@
+"""
+Resized variants of the image attachments, for raw_file's ``?w=``.
+
+They are made by the celery workers (see kuma.attachments.tasks), since
+resizing a large image would tie up a web worker.
+"""
+from io import BytesIO
+
+
+IMAGE_MIMETYPES = ["image/png", "image/jpeg", "image/jpg", "image/gif"]
+
+# Pillow is imported when needed, since only the celery workers resize
+# images.
+
+
+def make_variant(data, width):
+    """
+    Return the content of a copy of an image, resized to the given width
+    and optimized, or None if the image isn't wider, or is animated.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        if image.width <= width or getattr(image, "is_animated", False):
+            return None
+        image_format = image.format
+        height = max(round(image.height * width / image.width), 1)
+        if image.mode in ("1", "P"):
+            # Resized as a palette, the image would only get the nearest
+            # pixels.
+            image = image.convert("RGBA")
+        resized = image.resize((width, height), Image.LANCZOS)
+
+    options = {"optimize": True}
+    if image_format == "JPEG":
+        options.update(quality=85, progressive=True)
+    output = BytesIO()
+    resized.save(output, format=image_format, **options)
+    return output.getvalue()
@@ -0,0 +1,86 @@
+"""
+Hash the files of the attachment revisions uploaded before they were
+hashed on upload, so that they get strong ETags, and resized variants for
+the images.
+
+The files are read in parallel, by a pool of threads, since it's mostly
+waiting for the storage.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...images import IMAGE_MIMETYPES
+from ...models import AttachmentRevision
+from ...serving import invalidate_raw_file_info
+from ...tasks import create_attachment_variants
+from ...utils import get_content_hash
+
+
+def hash_file(storage, name):
+    """Return the hash of the content of a file, or None if it's missing."""
+    try:
+        with storage.open(name, "rb") as file:
+            return get_content_hash(file)
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = "Hash the files of the attachment revisions that weren't hashed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Read this many files at a time (default=8)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Hash this many revisions between updates (default=500)",
+        )
+        parser.add_argument(
+            "--no-variants",
+            action="store_true",
+            help="Don't queue the creation of the variants of images",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1")
+        storage = AttachmentRevision._meta.get_field("file").storage
+        revisions = (
+            AttachmentRevision.objects.filter(content_hash="")
+            .exclude(file="")
+            .order_by("pk")
+            .values_list("pk", "attachment_id", "file", "mime_type")
+        )
+        hashed = missing = 0
+        last_pk = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                batch = list(revisions.filter(pk__gt=last_pk)[: options["batch_size"]])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                content_hashes = executor.map(
+                    lambda row: hash_file(storage, row[2]), batch
+                )
+                for (pk, attachment_id, name, mime_type), content_hash in zip(
+                    batch, content_hashes
+                ):
+                    if content_hash is None:
+                        self.stderr.write(f"Missing file for revision {pk}: {name}")
+                        missing += 1
+                        continue
+                    AttachmentRevision.objects.filter(pk=pk).update(
+                        content_hash=content_hash
+                    )
+                    invalidate_raw_file_info(attachment_id)
+                    if mime_type in IMAGE_MIMETYPES and not options["no_variants"]:
+                        create_attachment_variants.delay(pk)
+                    hashed += 1
+        self.stdout.write(f"Hashed {hashed} files, {missing} missing")
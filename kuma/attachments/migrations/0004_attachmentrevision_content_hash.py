@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("attachments", "0003_auto_20191016_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachmentrevision",
+            name="content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
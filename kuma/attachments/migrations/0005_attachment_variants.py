@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import kuma.attachments.fields
+import kuma.attachments.models
+import kuma.attachments.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("attachments", "0004_attachmentrevision_content_hash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="attachmentrevision",
+            name="file",
+            field=kuma.attachments.fields.BlobFileField(
+                max_length=500,
+                storage=kuma.attachments.models.AttachmentStorage(),
+                upload_to=kuma.attachments.utils.attachment_upload_to,
+            ),
+        ),
+        migrations.CreateModel(
+            name="AttachmentVariant",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("width", models.PositiveIntegerField()),
+                (
+                    "file",
+                    models.FileField(
+                        max_length=500,
+                        storage=kuma.attachments.models.AttachmentStorage(),
+                        upload_to="",
+                    ),
+                ),
+                ("size", models.PositiveIntegerField()),
+                (
+                    "revision",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="attachments.AttachmentRevision",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("revision", "width")},
+            },
+        ),
+    ]
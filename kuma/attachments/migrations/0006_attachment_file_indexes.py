@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+import kuma.attachments.fields
+import kuma.attachments.models
+import kuma.attachments.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("attachments", "0005_attachment_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="attachmentrevision",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=64
+            ),
+        ),
+        migrations.AlterField(
+            model_name="attachmentrevision",
+            name="file",
+            field=kuma.attachments.fields.BlobFileField(
+                db_index=True,
+                max_length=500,
+                storage=kuma.attachments.models.AttachmentStorage(),
+                upload_to=kuma.attachments.utils.attachment_upload_to,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="trashedattachment",
+            name="file",
+            field=models.FileField(
+                db_index=True,
+                help_text="The attachment file that was trashed",
+                max_length=500,
+                storage=kuma.attachments.models.AttachmentStorage(),
+                upload_to=kuma.attachments.utils.attachment_upload_to,
+            ),
+        ),
+    ]
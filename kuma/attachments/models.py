@@ -9,6 +9,7 @@ from django.utils.translation import gettext_lazy as _
 from django_mysql.models import Model as MySQLModel
 from storages.backends.s3boto3 import S3Boto3Storage
 
+from .fields import BlobFileField
 from .utils import attachment_upload_to, full_attachment_url
 
 
@@ -128,14 +129,21 @@ class AttachmentRevision(models.Model):
         Attachment, related_name="revisions", on_delete=models.CASCADE
     )
 
-    file = models.FileField(
+    file = BlobFileField(
         storage=storage,
         upload_to=attachment_upload_to,
         max_length=500,
+        db_index=True,
     )
 
     title = models.CharField(max_length=255, null=True, db_index=True)
 
+    # The SHA-256 of the file, that it's stored under, and the ETag when
+    # it's served
+    content_hash = models.CharField(
+        max_length=64, blank=True, editable=False, db_index=True
+    )
+
     mime_type = models.CharField(
         max_length=255,
         db_index=True,
@@ -251,12 +259,35 @@ class AttachmentRevision(models.Model):
         return self.attachment.revisions.exclude(pk=self.pk)
 
 
+class AttachmentVariant(models.Model):
+    """
+    A resized copy of the image of an attachment revision, that raw_file
+    serves for ``?w=``.
+    """
+
+    revision = models.ForeignKey(
+        AttachmentRevision, related_name="variants", on_delete=models.CASCADE
+    )
+    width = models.PositiveIntegerField()
+    # Variants are stored under the hash of the original, and shared
+    # with the revisions that have the same file.
+    file = models.FileField(storage=storage, max_length=500)
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("revision", "width")
+
+    def __str__(self):
+        return "%s (width: %s)" % (self.revision, self.width)
+
+
 class TrashedAttachment(MySQLModel):
 
     file = models.FileField(
         storage=storage,
         upload_to=attachment_upload_to,
         max_length=500,
+        db_index=True,
         help_text=_("The attachment file that was trashed"),
     )
 
@@ -0,0 +1,222 @@
+"""
+Serving the files of attachments from the filesystem.
+
+raw_file used to load the attachment and its current revision for every
+request, and streamed the whole file through Django, chunk by chunk, which
+tied up a worker for the whole download of a large sample or video. Now:
+
+* What's needed to serve the current file of an attachment is cached, by
+  attachment ID, so that hot files skip the database.
+* Whole files are served with a FileResponse, that the WSGI server can send
+  with sendfile through its wsgi.file_wrapper.
+* Single byte ranges are supported, with If-Range, for video players and
+  resumed downloads.
+* With settings.ATTACHMENTS_X_ACCEL_REDIRECT_PREFIX, the file is left to
+  nginx, with an X-Accel-Redirect header.
+* The resized variants of images are served for ``?w=``.
+"""
+import re
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+
+from .images import IMAGE_MIMETYPES
+from .models import Attachment, AttachmentRevision
+from .utils import convert_to_http_date
+
+
+RAW_FILE_INFO_CACHE_KEY = "kuma:attachments:raw-file:{attachment_id}"
+RAW_FILE_INFO_TIMEOUT = 60 * 60 * 24
+
+BYTE_RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+def get_file_storage():
+    return AttachmentRevision._meta.get_field("file").storage
+
+
+def get_raw_file_info(attachment_id):
+    """
+    Return a dict with what's needed to serve the current file of an
+    attachment, or None if it doesn't have one.
+    """
+    cache_key = RAW_FILE_INFO_CACHE_KEY.format(attachment_id=attachment_id)
+    info = cache.get(cache_key)
+    if info is not None:
+        return info
+
+    attachment = (
+        Attachment.objects.filter(pk=attachment_id)
+        .select_related("current_revision")
+        .first()
+    )
+    if attachment is None or attachment.current_revision is None:
+        return None
+    rev = attachment.current_revision
+    if rev.content_hash:
+        etag = f'"{rev.content_hash}"'
+    else:
+        # Revisions never change their file, but without the hash of its
+        # content, this is only a weak validator.
+        etag = f'W/"{rev.pk}"'
+    info = {
+        "attachment_id": attachment.pk,
+        "revision_id": rev.pk,
+        "name": rev.file.name,
+        "filename": rev.filename,
+        "mime_type": rev.mime_type,
+        "size": rev.file.size,
+        "created": rev.created,
+        "etag": etag,
+        "content_hash": rev.content_hash,
+        "variants": {},
+    }
+    if rev.mime_type in IMAGE_MIMETYPES:
+        info["variants"] = {
+            variant.width: {"name": variant.file.name, "size": variant.size}
+            for variant in rev.variants.all()
+        }
+    cache.set(cache_key, info, RAW_FILE_INFO_TIMEOUT)
+    return info
+
+
+def invalidate_raw_file_info(attachment_id):
+    cache.delete(RAW_FILE_INFO_CACHE_KEY.format(attachment_id=attachment_id))
+
+
+def get_variant_info(info, width):
+    """
+    Return the info of the smallest variant of an image that is at least
+    as wide as asked, or of the original if there's none.
+    """
+    try:
+        width = int(width)
+    except ValueError:
+        return info
+    variants = info.get("variants") or {}
+    for variant_width in sorted(variants):
+        if variant_width >= width:
+            variant = variants[variant_width]
+            return dict(
+                info,
+                name=variant["name"],
+                size=variant["size"],
+                etag=f'"{info["content_hash"]}-{variant_width}"',
+                variants={},
+            )
+    return info
+
+
+def etag_matches(etag, header):
+    """Return whether an If-None-Match header matches, by weak comparison."""
+    etags = parse_etags(header)
+    if "*" in etags:
+        return True
+    stripped = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == stripped for tag in etags)
+
+
+def parse_byte_range(header, size):
+    """
+    Return the (first, last) positions of the bytes of a single range in a
+    Range header, None if the whole file should be served instead, or False
+    if the range can't be satisfied.
+
+    Multiple ranges are served as the whole file, which the RFC allows.
+    """
+    match = BYTE_RANGE_RE.match(header or "")
+    if not match or not size:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # A suffix, the last bytes of the file
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        # Invalid, so ignored
+        return None
+    if first >= size:
+        return False
+    last = min(int(last), size - 1) if last else size - 1
+    return first, last
+
+
+class RangeFile:
+    """
+    A file-like object for part of a file, that reads up to ``length``
+    bytes from ``first``.
+
+    It doesn't have a fileno, since the sendfile of some WSGI servers
+    would send the rest of the file.
+    """
+
+    def __init__(self, file, first, length):
+        self.file = file
+        self.file.seek(first)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, info, x_accel_redirect_prefix=""):
+    """Return the response with the file, or part of it, for the request."""
+    size = info["size"]
+    last_modified = convert_to_http_date(info["created"])
+    if x_accel_redirect_prefix:
+        # nginx handles the ranges
+        response = HttpResponse(content_type=info["mime_type"])
+        response["X-Accel-Redirect"] = x_accel_redirect_prefix + quote(info["name"])
+    else:
+        storage = get_file_storage()
+        byte_range = None
+        if_range = request.META.get("HTTP_IF_RANGE")
+        strong_etag = not info["etag"].startswith("W/")
+        if (
+            not if_range
+            or if_range == last_modified
+            or (strong_etag and if_range == info["etag"])
+        ):
+            byte_range = parse_byte_range(request.META.get("HTTP_RANGE"), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        try:
+            file = open(storage.path(info["name"]), "rb")
+        except NotImplementedError:
+            # A storage without local paths, streamed from the storage.
+            response = StreamingHttpResponse(
+                storage.open(info["name"]), content_type=info["mime_type"]
+            )
+            response["Content-Length"] = size
+            return response
+        if byte_range:
+            first, last = byte_range
+            length = last - first + 1
+            response = FileResponse(RangeFile(file, first, length), status=206)
+            response["Content-Range"] = f"bytes {first}-{last}/{size}"
+            response["Content-Length"] = length
+        else:
+            response = FileResponse(file)
+            response["Content-Length"] = size
+        # Not as an argument, since FileResponse guesses the type of some.
+        response["Content-Type"] = info["mime_type"]
+        response["Accept-Ranges"] = "bytes"
+    response["ETag"] = info["etag"]
+    response["Last-Modified"] = last_modified
+    return response
@@ -1,7 +1,34 @@
-from django.db.models.signals import post_delete, pre_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import AttachmentRevision, TrashedAttachment
+from .images import IMAGE_MIMETYPES
+from .models import Attachment, AttachmentRevision, TrashedAttachment
+from .serving import invalidate_raw_file_info
+from .tasks import create_attachment_variants
+from .utils import delete_variants, get_blob_hash
+
+
+@receiver(post_save, sender=Attachment, dispatch_uid="attachments.attachment.save")
+@receiver(post_delete, sender=Attachment, dispatch_uid="attachments.attachment.delete")
+def on_attachment_change(instance, **kwargs):
+    """
+    Signal handler to be called when an attachment is saved, for example
+    with a new current revision, or deleted.
+    """
+    invalidate_raw_file_info(instance.pk)
+
+
+@receiver(
+    post_save, sender=AttachmentRevision, dispatch_uid="attachments.revision.save"
+)
+def on_revision_save(instance, created, **kwargs):
+    """
+    Signal handler to be called when an attachment revision is saved, that
+    has the resized variants of new images made in the background.
+    """
+    if created and instance.mime_type in IMAGE_MIMETYPES:
+        transaction.on_commit(lambda: create_attachment_variants.delay(instance.pk))
 
 
 @receiver(
@@ -11,6 +38,7 @@ def after_revision_delete(instance, **kwargs):
     """
     Signal handler to be called when an attachment revision is deleted
     """
+    invalidate_raw_file_info(instance.attachment_id)
     # see if there is a previous revision
     previous = instance.get_previous()
     # if yes, make it the current revision of the attachment
@@ -24,6 +52,23 @@ def on_trash_delete(instance, **kwargs):
     Signal handler to be called when a trash item is deleted.
     """
     # if a file entry is present, delete the file with the storage
-    # without saving the model instance
-    if instance.file:
+    # without saving the model instance, unless the content-addressed file
+    # is shared with a revision, or another trash item
+    if instance.file and not (
+        AttachmentRevision.objects.filter(file=instance.file.name).exists()
+        or TrashedAttachment.objects.filter(file=instance.file.name)
+        .exclude(pk=instance.pk)
+        .exists()
+    ):
+        storage = instance.file.storage
+        content_hash = get_blob_hash(instance.file.name)
         instance.file.delete(save=False)
+        # and the resized copies of an image along with it, unless a
+        # revision with the same content, under another name, uses them
+        if (
+            content_hash
+            and not AttachmentRevision.objects.filter(
+                content_hash=content_hash
+            ).exists()
+        ):
+            delete_variants(storage, content_hash)
@@ -0,0 +1,55 @@
+import logging
+
+from celery import task
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from kuma.core.decorators import skip_in_maintenance_mode
+
+from .images import make_variant
+from .models import AttachmentRevision, AttachmentVariant
+from .serving import invalidate_raw_file_info
+from .utils import get_variant_name
+
+
+log = logging.getLogger("kuma.attachments.tasks")
+
+
+@task
+@skip_in_maintenance_mode
+def create_attachment_variants(revision_pk):
+    """
+    Create the resized variants of the image of an attachment revision,
+    for the widths in settings.ATTACHMENTS_IMAGE_WIDTHS that are smaller
+    than the image.
+    """
+    revision = AttachmentRevision.objects.filter(pk=revision_pk).first()
+    if revision is None or not revision.content_hash:
+        return
+    existing = set(revision.variants.values_list("width", flat=True))
+    storage = revision.file.storage
+    data = None
+    for width in sorted(settings.ATTACHMENTS_IMAGE_WIDTHS):
+        if width in existing:
+            continue
+        name = get_variant_name(revision.content_hash, width, revision.filename)
+        if storage.exists(name):
+            # Made for another revision with the same file
+            size = storage.size(name)
+        else:
+            if data is None:
+                with revision.file.open("rb") as file:
+                    data = file.read()
+            content = make_variant(data, width)
+            if content is None:
+                break
+            if len(content) >= len(data):
+                # Not worth serving instead of the original
+                continue
+            name = storage.save(name, ContentFile(content))
+            size = len(content)
+        AttachmentVariant.objects.get_or_create(
+            revision=revision, width=width, defaults={"file": name, "size": size}
+        )
+        log.info("Created the %spx variant of %s", width, revision)
+    invalidate_raw_file_info(revision.attachment_id)
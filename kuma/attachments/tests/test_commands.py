@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.core.management import call_command
+
+from ..models import AttachmentRevision
+
+
+@mock.patch(
+    "kuma.attachments.management.commands.rehash_attachments.create_attachment_variants"
+)
+def test_rehash_attachments(mock_task, file_attachment):
+    revision = file_attachment["attachment"].current_revision
+    content_hash = revision.content_hash
+    AttachmentRevision.objects.filter(pk=revision.pk).update(content_hash="")
+    missing = AttachmentRevision.objects.create(
+        attachment=revision.attachment,
+        file="attachments/missing.png",
+        mime_type="image/png",
+        creator=revision.creator,
+        is_approved=False,
+    )
+
+    call_command("rehash_attachments", workers=2, batch_size=1)
+    revision.refresh_from_db()
+    assert revision.content_hash == content_hash
+    missing.refresh_from_db()
+    assert missing.content_hash == ""
+    # Only images get variants.
+    mock_task.delay.assert_not_called()
@@ -114,6 +114,32 @@ class AttachmentModelTests(UserTestCase):
         trashed_attachment.delete()
         self.assertFalse(self.storage.exists(path))
 
+    def test_same_file_stored_once(self):
+        attachment = Attachment.objects.create(title="another title")
+        revision = AttachmentRevision(
+            attachment=attachment,
+            mime_type="text/plain",
+            title=attachment.title,
+            creator=self.test_user,
+        )
+        revision.file.save("filename.txt", ContentFile(b"Meh meh I am a test file."))
+        self.assertEqual(revision.content_hash, self.revision.content_hash)
+        self.assertEqual(revision.file.name, self.revision.file.name)
+        self.assertTrue(
+            revision.file.name.startswith(
+                "attachments/blobs/%s/" % revision.content_hash[:2]
+            )
+        )
+        # Same content, but another name
+        self.assertEqual(self.revision2.content_hash, self.revision.content_hash)
+        self.assertNotEqual(self.revision2.file.name, self.revision.file.name)
+
+        # The file is kept while a revision uses it.
+        path = revision.file.name
+        trashed_attachment = revision.delete(individual=False, username="trasher")
+        trashed_attachment.delete()
+        self.assertTrue(self.storage.exists(path))
+
     def test_delete_revision(self):
         # adding a new revision sets the current revision automatically
         self.assertTrue(self.attachment.current_revision, self.revision2)
@@ -0,0 +1,133 @@
+import os
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+
+from ..models import Attachment, AttachmentRevision
+from ..tasks import create_attachment_variants
+
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_image(width, height, image_format="PNG"):
+    # Noise, for a file that's larger than its variants
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    output = BytesIO()
+    image.save(output, format=image_format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def image_revision(db, wiki_user, settings):
+    settings.ATTACHMENTS_IMAGE_WIDTHS = [320, 640, 1280]
+    attachment = Attachment.objects.create(title="An image")
+    revision = AttachmentRevision(
+        attachment=attachment,
+        title=attachment.title,
+        mime_type="image/png",
+        creator=wiki_user,
+    )
+    revision.file.save("image.png", ContentFile(make_image(800, 400)))
+    return revision
+
+
+def test_create_attachment_variants(image_revision):
+    create_attachment_variants(image_revision.pk)
+    variants = {variant.width: variant for variant in image_revision.variants.all()}
+    # The image is narrower than 1280px.
+    assert sorted(variants) == [320, 640]
+    for width, variant in variants.items():
+        assert variant.file.name.endswith(f"/{width}.png")
+        assert variant.size == variant.file.size
+        with Image.open(variant.file) as image:
+            assert image.size == (width, width // 2)
+
+    # Again, with nothing left to do
+    create_attachment_variants(image_revision.pk)
+    assert image_revision.variants.count() == 2
+
+
+def test_create_attachment_variants_shared(image_revision, wiki_user):
+    create_attachment_variants(image_revision.pk)
+    attachment = Attachment.objects.create(title="The same image")
+    revision = AttachmentRevision(
+        attachment=attachment,
+        title=attachment.title,
+        mime_type="image/png",
+        creator=wiki_user,
+    )
+    with image_revision.file.open("rb") as file:
+        revision.file.save("copy.png", ContentFile(file.read()))
+
+    create_attachment_variants(revision.pk)
+    assert sorted(revision.variants.values_list("width", "file", "size")) == sorted(
+        image_revision.variants.values_list("width", "file", "size")
+    )
+
+
+@pytest.mark.parametrize("shared", (False, True))
+def test_variants_deleted_with_blob(image_revision, wiki_user, shared):
+    create_attachment_variants(image_revision.pk)
+    storage = image_revision.file.storage
+    names = [image_revision.file.name] + list(
+        image_revision.variants.values_list("file", flat=True)
+    )
+    assert len(names) == 3
+    revision = AttachmentRevision(
+        attachment=image_revision.attachment,
+        title="Another image",
+        mime_type="image/png",
+        creator=wiki_user,
+    )
+    if shared:
+        # The same image, under another name
+        with image_revision.file.open("rb") as file:
+            revision.file.save("copy.png", ContentFile(file.read()))
+    else:
+        revision.file.save("other.png", ContentFile(make_image(100, 100)))
+
+    trashed_attachment = image_revision.delete(username="trasher")
+    assert all(storage.exists(name) for name in names)
+    trashed_attachment.delete()
+    assert not storage.exists(names[0])
+    # The variants are shared by the revisions with the same content.
+    assert [storage.exists(name) for name in names[1:]] == [shared, shared]
+
+
+def test_create_attachment_variants_animated(wiki_user, image_revision):
+    frames = [Image.new("RGB", (800, 400), color) for color in ("red", "blue")]
+    output = BytesIO()
+    frames[0].save(output, format="GIF", save_all=True, append_images=frames[1:])
+    revision = AttachmentRevision(
+        attachment=image_revision.attachment,
+        title="An animation",
+        mime_type="image/gif",
+        creator=wiki_user,
+    )
+    revision.file.save("animation.gif", ContentFile(output.getvalue()))
+
+    create_attachment_variants(revision.pk)
+    assert not revision.variants.exists()
+
+
+@pytest.mark.parametrize(
+    "width,expected_width", [("300", 320), ("320", 320), ("500", 640), ("700", None)]
+)
+def test_raw_file_variant(client, settings, image_revision, width, expected_width):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    create_attachment_variants(image_revision.pk)
+    url = image_revision.attachment.get_file_url()
+
+    response = client.get(url, {"w": width}, HTTP_HOST="demos")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+        assert image.width == (expected_width or 800)
+    if expected_width:
+        assert response["ETag"] == f'"{image_revision.content_hash}-{expected_width}"'
+    else:
+        assert response["ETag"] == f'"{image_revision.content_hash}"'
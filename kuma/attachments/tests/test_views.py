@@ -363,6 +363,146 @@ def test_raw_file_if_modified_since(client, settings, file_attachment):
     )
 
 
+@pytest.mark.parametrize(
+    "range_header,expected_content,expected_range",
+    [
+        ("bytes=0-3", b"This", "bytes 0-3/20"),
+        ("bytes=15-", b"test.", "bytes 15-19/20"),
+        ("bytes=-5", b"test.", "bytes 15-19/20"),
+        ("bytes=8-100", b"only a test.", "bytes 8-19/20"),
+    ],
+    ids=("first-last", "first", "suffix", "past-end"),
+)
+def test_raw_file_range(
+    client, settings, file_attachment, range_header, expected_content, expected_range
+):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    url = file_attachment["attachment"].get_file_url()
+
+    response = client.get(url, HTTP_HOST="demos", HTTP_RANGE=range_header)
+    assert response.status_code == 206
+    assert response["Content-Range"] == expected_range
+    assert response["Content-Length"] == str(len(expected_content))
+    assert response["Content-Type"] == "text/plain"
+    assert b"".join(response.streaming_content) == expected_content
+
+
+@pytest.mark.parametrize("range_header", ["bytes=20-", "bytes=-0"])
+def test_raw_file_range_not_satisfiable(
+    client, settings, file_attachment, range_header
+):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    url = file_attachment["attachment"].get_file_url()
+
+    response = client.get(url, HTTP_HOST="demos", HTTP_RANGE=range_header)
+    assert response.status_code == 416
+    assert response["Content-Range"] == "bytes */20"
+
+
+@pytest.mark.parametrize("range_header", ["bytes=0-1,5-6", "bytes=5-1", "items=0-1"])
+def test_raw_file_range_ignored(client, settings, file_attachment, range_header):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    url = file_attachment["attachment"].get_file_url()
+
+    response = client.get(url, HTTP_HOST="demos", HTTP_RANGE=range_header)
+    assert response.status_code == 200
+    assert response["Accept-Ranges"] == "bytes"
+    assert b"".join(response.streaming_content) == b"This is only a test."
+
+
+def test_raw_file_if_range(client, settings, file_attachment):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    url = file_attachment["attachment"].get_file_url()
+    etag = client.get(url, HTTP_HOST="demos")["ETag"]
+
+    response = client.get(
+        url, HTTP_HOST="demos", HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=etag
+    )
+    assert response.status_code == 206
+    assert b"".join(response.streaming_content) == b"This"
+
+    # The file changed since the client got its start
+    response = client.get(
+        url, HTTP_HOST="demos", HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"'
+    )
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == b"This is only a test."
+
+
+def test_raw_file_if_none_match(client, settings, file_attachment):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    attachment = file_attachment["attachment"]
+    url = attachment.get_file_url()
+    content_hash = attachment.current_revision.content_hash
+    assert len(content_hash) == 64
+
+    response = client.get(
+        url, HTTP_HOST="demos", HTTP_IF_NONE_MATCH=f'W/"{content_hash}"'
+    )
+    assert response.status_code == 304
+    assert response["ETag"] == f'"{content_hash}"'
+
+    # If-None-Match wins over If-Modified-Since
+    response = client.get(
+        url,
+        HTTP_HOST="demos",
+        HTTP_IF_NONE_MATCH='"other"',
+        HTTP_IF_MODIFIED_SINCE=convert_to_http_date(
+            attachment.current_revision.created
+        ),
+    )
+    assert response.status_code in (200, 302)
+
+
+def test_raw_file_x_accel_redirect(client, settings, file_attachment):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    settings.ATTACHMENTS_X_ACCEL_REDIRECT_PREFIX = "/protected/"
+    rev = file_attachment["attachment"].current_revision
+
+    response = client.get(rev.attachment.get_file_url(), HTTP_HOST="demos")
+    assert response.status_code == 200
+    assert response["X-Accel-Redirect"] == "/protected/" + rev.file.name
+    assert response["Content-Type"] == "text/plain"
+    assert response.content == b""
+
+
+def test_raw_file_new_revision(client, settings, file_attachment, wiki_user):
+    settings.ATTACHMENT_HOST = "demos"
+    settings.ALLOWED_HOSTS.append("demos")
+    settings.ATTACHMENTS_USE_S3 = False
+    attachment = file_attachment["attachment"]
+    url = attachment.get_file_url()
+    response = client.get(url, HTTP_HOST="demos")
+    assert b"".join(response.streaming_content) == b"This is only a test."
+
+    revision = AttachmentRevision(
+        title=attachment.title,
+        is_approved=True,
+        attachment=attachment,
+        mime_type="text/plain",
+        description="Second upload",
+        created=datetime.datetime.now(),
+        creator=wiki_user,
+    )
+    revision.file.save("test.txt", ContentFile(b"This is another test."))
+    revision.make_current()
+
+    response = client.get(url, HTTP_HOST="demos")
+    assert response["ETag"] == f'"{revision.content_hash}"'
+    assert b"".join(response.streaming_content) == b"This is another test."
+
+
 def test_edit_attachment_redirect(client, root_doc):
     url = reverse(
         "attachments.edit_attachment", kwargs={"document_path": root_doc.slug}
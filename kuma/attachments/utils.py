@@ -1,5 +1,6 @@
 import calendar
 import hashlib
+import os
 from datetime import datetime
 
 from constance import config
@@ -67,11 +68,80 @@ def convert_to_http_date(dt):
     return http_date(epoch_dt)
 
 
+def get_content_hash(file):
+    """Return the SHA-256 hex digest of the content of a file."""
+    content_hash = hashlib.sha256()
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def get_blob_name(content_hash, filename):
+    """
+    Return the path of the file with this content and name in the
+    content-addressed storage of attachments.
+    """
+    return "attachments/blobs/%(prefix)s/%(hash)s/%(filename)s" % {
+        "prefix": content_hash[:2],
+        "hash": content_hash,
+        "filename": filename,
+    }
+
+
+def get_blob_hash(name):
+    """
+    Return the content hash of a file in the content-addressed storage of
+    attachments, or None if the file isn't stored there.
+    """
+    parts = name.split("/")
+    if len(parts) == 5 and parts[:2] == ["attachments", "blobs"]:
+        return parts[3]
+    return None
+
+
+def get_variant_dir(content_hash):
+    """
+    Return the directory of the resized copies of the image with this
+    content, whatever its name.
+    """
+    return "attachments/variants/%(prefix)s/%(hash)s" % {
+        "prefix": content_hash[:2],
+        "hash": content_hash,
+    }
+
+
+def get_variant_name(content_hash, width, filename):
+    """
+    Return the path of the copy of an image, resized to the given width.
+    """
+    return "%(dir)s/%(width)s%(ext)s" % {
+        "dir": get_variant_dir(content_hash),
+        "width": width,
+        "ext": os.path.splitext(filename)[1].lower(),
+    }
+
+
+def delete_variants(storage, content_hash):
+    """Delete the resized copies of the image with this content."""
+    directory = get_variant_dir(content_hash)
+    try:
+        _, filenames = storage.listdir(directory)
+    except FileNotFoundError:
+        # None were made
+        return
+    for filename in filenames:
+        storage.delete("%s/%s" % (directory, filename))
+
+
 def attachment_upload_to(instance, filename):
     """
     Generate a path to store a file attachment.
     """
-    # For now, the filesystem storage path will look like this:
+    content_hash = getattr(instance, "content_hash", None)
+    if content_hash:
+        return get_blob_name(content_hash, os.path.basename(filename))
+    # Files uploaded before the content-addressed storage, and trashed
+    # files, have paths that look like this:
     #
     # attachments/<year>/<month>/<day>/<attachment_id>/<md5>/<filename>
     #
@@ -1,9 +1,10 @@
 import calendar
 import mimetypes
+from urllib.parse import urlencode
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.http import Http404, HttpResponseNotModified
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.http import parse_http_date_safe
 from django.views.decorators.cache import cache_control, never_cache
@@ -20,7 +21,14 @@ from kuma.wiki.models import Document
 
 from .forms import AttachmentRevisionForm
 from .models import Attachment
-from .utils import allow_add_attachment_by, convert_to_http_date
+from .serving import (
+    etag_matches,
+    get_file_storage,
+    get_raw_file_info,
+    get_variant_info,
+    serve_file,
+)
+from .utils import allow_add_attachment_by, convert_to_http_date, full_attachment_url
 
 
 # Mime types used on MDN
@@ -29,8 +37,6 @@ OVERRIDE_MIMETYPES = {
     "image/vnd.adobe.photoshop": ".psd",
 }
 
-IMAGE_MIMETYPES = ["image/png", "image/jpeg", "image/jpg", "image/gif"]
-
 
 def guess_extension(_type):
     return OVERRIDE_MIMETYPES.get(_type, mimetypes.guess_extension(_type))
@@ -41,35 +47,46 @@ def raw_file(request, attachment_id, filename):
     """
     Serve up an attachment's file.
     """
-    qs = Attachment.objects.select_related("current_revision")
-    attachment = get_object_or_404(qs, pk=attachment_id)
-    rev = attachment.current_revision
-    if rev is None:
+    info = get_raw_file_info(attachment_id)
+    if info is None:
         raise Http404
 
     # Attachments must be served from safe (untrusted) domains
     if not is_untrusted(request):
-        return redirect(attachment.get_file_url(), permanent=True)
+        url = full_attachment_url(info["attachment_id"], info["filename"])
+        if request.GET.get("w"):
+            url += "?" + urlencode({"w": request.GET["w"]})
+        return redirect(url, permanent=True)
+
+    # The smallest resized variant of an image that is at least this wide
+    if request.GET.get("w"):
+        info = get_variant_info(info, request.GET["w"])
 
     # NOTE: All of this, just to support conditional requests (last-modified / if-modified-since)
     # Very important while we're potentially serving attachments from disk.
     # Far less important when we're just redirecting to S3.
     # Consider removing?
+    last_modified = convert_to_http_date(info["created"])
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
     if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE"))
-    if if_modified_since and if_modified_since >= calendar.timegm(
-        rev.created.utctimetuple()
+    if (if_none_match and etag_matches(info["etag"], if_none_match)) or (
+        not if_none_match
+        and if_modified_since
+        and if_modified_since >= calendar.timegm(info["created"].utctimetuple())
     ):
         response = HttpResponseNotModified()
-        response["Last-Modified"] = convert_to_http_date(rev.created)
+        response["ETag"] = info["etag"]
+        response["Last-Modified"] = last_modified
         return response
 
     if settings.ATTACHMENTS_USE_S3:
-        response = redirect(rev.file.url)
+        response = redirect(get_file_storage().url(info["name"]))
+        response["Last-Modified"] = last_modified
     else:
-        response = StreamingHttpResponse(rev.file, content_type=rev.mime_type)
-        response["Content-Length"] = rev.file.size
+        response = serve_file(
+            request, info, settings.ATTACHMENTS_X_ACCEL_REDIRECT_PREFIX
+        )
 
-    response["Last-Modified"] = convert_to_http_date(rev.created)
     response["X-Frame-Options"] = f"ALLOW-FROM {settings.DOMAIN}"
     return response
 
@@ -23,6 +23,11 @@ class CoreConfig(AppConfig):
 
         register(react_i18n_check)
 
+        # Compute the language negotiation table before the first request
+        from kuma.core.i18n import get_language_table
+
+        get_language_table()
+
         # Clean up expired sessions every 60 minutes
         from kuma.core.tasks import clean_sessions
 
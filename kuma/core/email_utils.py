@@ -127,3 +127,48 @@ def emails_with_users_and_watches(
             locale = default_locale
 
         yield _make_mail(locale, user, watch)
+
+
+def emails_with_shared_body(
+    subject,
+    body_template,
+    footer_template,
+    context_vars,
+    users_and_watches,
+    from_email=settings.TIDINGS_FROM_ADDRESS,
+    default_locale=settings.WIKI_DEFAULT_LANGUAGE,
+    **extra_kwargs,
+):
+    """Return iterable of EmailMessages sharing a body rendered once per locale.
+
+    Like :func:`emails_with_users_and_watches`, but the subject and the
+    ``body_template`` are only rendered once for each locale, from the
+    ``context_vars`` alone. Only the ``footer_template``, which gets the
+    ``user``, ``watch`` and ``watches`` keys, is rendered for each pair in
+    ``users_and_watches``, and is appended to the body.
+
+    :returns: generator of EmailMessage objects
+
+    """
+    bodies = {}
+
+    @safe_translation
+    def _render_body(locale):
+        return subject % context_vars, render_email(body_template, context_vars)
+
+    @safe_translation
+    def _make_mail(locale, user, watch):
+        if locale not in bodies:
+            bodies[locale] = _render_body(locale)
+        rendered_subject, body = bodies[locale]
+        footer_vars = dict(context_vars, user=user, watch=watch[0], watches=watch)
+        return EmailMultiAlternatives(
+            rendered_subject,
+            body + render_email(footer_template, footer_vars),
+            from_email,
+            [user.email],
+            **extra_kwargs,
+        )
+
+    for user, watch in users_and_watches:
+        yield _make_mail(getattr(user, "locale", default_locale), user, watch)
@@ -6,6 +6,7 @@ Kuma language code is mixed case, like 'en-US'.
 """
 
 from functools import lru_cache
+from types import MappingProxyType
 
 from django.apps import apps
 from django.conf import settings
@@ -71,12 +72,54 @@ def get_kuma_languages():
     return _django_get_languages()
 
 
-@lru_cache(maxsize=1000)
+@lru_cache()
+def get_language_table():
+    """
+    Return a read-only table of lower case language codes and the Kuma
+    language code each one gets, computed once from settings.LANGUAGES,
+    settings.LOCALE_ALIASES and Django's LANG_INFO.
+
+    It has the supported languages, their generic languages (pt gets pt-PT),
+    the aliases, and the languages and fallbacks Django knows about, which
+    covers nearly all of the codes in paths, cookies and Accept-Language
+    headers, so that get_supported_language_variant is a dict lookup.
+    """
+    lang_codes = set(get_django_languages())
+    lang_codes.update(lang_code.split("-")[0] for lang_code in list(lang_codes))
+    lang_codes.update(settings.LOCALE_ALIASES)
+    lang_codes.update(LANG_INFO)
+    table = {}
+    for lang_code in lang_codes:
+        try:
+            table[lang_code] = _get_supported_language_variant(lang_code)
+        except LookupError:
+            pass
+    return MappingProxyType(table)
+
+
 def get_supported_language_variant(raw_lang_code):
     """
     Returns the language-code that's listed in supported languages, possibly
     selecting a more generic variant. Raises LookupError if nothing found.
 
+    The common language codes are looked up in get_language_table, and the
+    others are worked out by _get_supported_language_variant.
+    """
+    if raw_lang_code:
+        lang_code = kuma_language_code_to_django(raw_lang_code)
+        try:
+            return get_language_table()[lang_code]
+        except KeyError:
+            pass
+    return _get_supported_language_variant(raw_lang_code)
+
+
+@lru_cache(maxsize=1000)
+def _get_supported_language_variant(raw_lang_code):
+    """
+    Returns the language-code that's listed in supported languages, possibly
+    selecting a more generic variant. Raises LookupError if nothing found.
+
     The function will look for an alternative country-specific variant when the
     currently checked language code is not found. In Django, this behaviour can
     be avoided with the strict=True parameter, removed in this code.
@@ -181,6 +224,27 @@ def get_language_from_request(request):
 
     # Pick the closest langauge based on the Accept Language header
     accept = request.META.get("HTTP_ACCEPT_LANGUAGE", "")
+    lang_code = get_language_from_accept_language(accept)
+    if lang_code is not None:
+        return lang_code
+
+    # Kuma: Fallback to default settings.LANGUAGE_CODE.
+    # Django supports a case when LANGUAGE_CODE is not in LANGUAGES
+    # (see https://github.com/django/django/pull/824). but our LANGUAGE_CODE is
+    # always the first entry in LANGUAGES.
+    return settings.LANGUAGE_CODE
+
+
+@lru_cache(maxsize=1000)
+def get_language_from_accept_language(accept):
+    """
+    Return the Kuma language code picked by the value of an Accept-Language
+    header, or None if none of its languages are supported.
+
+    Most requests without a locale in their path send one of a few common
+    headers, so the answers are cached, with a maxsize since they come from
+    the requests.
+    """
     for accept_lang, unused in parse_accept_lang_header(accept):
         if accept_lang == "*":
             break
@@ -200,11 +264,7 @@ def get_language_from_request(request):
         except LookupError:
             continue
 
-    # Kuma: Fallback to default settings.LANGUAGE_CODE.
-    # Django supports a case when LANGUAGE_CODE is not in LANGUAGES
-    # (see https://github.com/django/django/pull/824). but our LANGUAGE_CODE is
-    # always the first entry in LANGUAGES.
-    return settings.LANGUAGE_CODE
+    return None
 
 
 def get_language_mapping():
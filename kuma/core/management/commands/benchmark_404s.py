@@ -0,0 +1,122 @@
+"""
+Measure how many 404s a worker can decide per second, in the middleware that
+turns some of them into locale and trailing slash redirects.
+"""
+
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponseNotFound
+from django.test import RequestFactory
+from django.utils import translation
+
+from kuma.core.middleware import (
+    _resolves,
+    get_standard_locale_prefix,
+    LocaleMiddleware,
+    LocaleStandardizerMiddleware,
+    SlashMiddleware,
+)
+
+
+# A sample of the junk that bots request.
+DEFAULT_PATHS = (
+    "/wp-login.php",
+    "/wp-admin/admin-ajax.php",
+    "/.env",
+    "/phpmyadmin/index.php",
+    "/en-US/xmlrpc.php",
+    "/en-us/docs/No/Such/Page/",
+    "/fr-FR/.git/config",
+    "/zz/cgi-bin/test.cgi",
+    "/docs/Web/HTML",
+)
+
+
+def not_found(request):
+    return HttpResponseNotFound()
+
+
+def summarize(values):
+    return {
+        "median": statistics.median(values),
+        "p95": statistics.quantiles(values, n=20)[-1] if values[1:] else values[0],
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the handling of 404s by the locale and slash middleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="The paths to request (default=a sample of junk bot paths)",
+            metavar="path",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1000,
+            help="Request each path this many times (default=1000)",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Also measure the 404s without the cached answers",
+        )
+
+    def clear_caches(self):
+        _resolves.cache_clear()
+        get_standard_locale_prefix.cache_clear()
+
+    def run(self, middleware, requests, cold):
+        """Return the times, in microseconds, to handle each of the requests."""
+        times_us = []
+        for request in requests:
+            if cold:
+                self.clear_caches()
+            start = time.perf_counter()
+            middleware(request)
+            times_us.append((time.perf_counter() - start) * 1e6)
+        return times_us
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        paths = options["paths"] or DEFAULT_PATHS
+        factory = RequestFactory()
+        requests = [factory.get(path) for path in paths] * repeat
+        # The same middleware, in the same order, as settings.MIDDLEWARE, in
+        # front of a view that 404s every time.
+        middleware = LocaleStandardizerMiddleware(
+            LocaleMiddleware(SlashMiddleware(not_found))
+        )
+
+        # Import and compile the URL patterns before timing anything.
+        for request in requests[: len(paths)]:
+            middleware(request)
+
+        variants = [("warm", False)]
+        if options["cold"]:
+            variants.insert(0, ("cold", True))
+        with translation.override(None):
+            for name, cold in variants:
+                self.clear_caches()
+                start = time.perf_counter()
+                times_us = self.run(middleware, requests, cold)
+                elapsed = time.perf_counter() - start
+                stats = summarize(times_us)
+                self.stdout.write(
+                    "{name}: {count} requests, {rate:.0f} 404s/s, "
+                    "median {stats[median]:.1f}us p95 {stats[p95]:.1f}us".format(
+                        name=name,
+                        count=len(times_us),
+                        rate=len(times_us) / elapsed,
+                        stats=stats,
+                    )
+                )
@@ -2,6 +2,7 @@
 
 Includes:
 - Handle tag namespaces (eg. tech:javascript, profile:interest:homebrewing)
+- Set or add the tags of an object in bulk (set_tags, add_tags)
 
 TODO:
 - Permissions for tag namespaces (eg. system:* is superuser-only)
@@ -10,9 +11,13 @@ TODO:
 
 
 from datetime import date, timedelta
+from functools import reduce
+from operator import or_
 
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
 from django.db.models.fields import BLANK_CHOICE_DASH
+from django.db.models.signals import m2m_changed
 from taggit.managers import _TaggableManager, TaggableManager
 from taggit.models import Tag
 from taggit.utils import edit_string_for_tags, require_instance_manager
@@ -112,6 +117,118 @@ class _NamespacedTaggableManager(_TaggableManager):
         return ns_tags
 
 
+def get_or_create_tags(tag_model, names):
+    """
+    Return the tags with the given names, creating the missing ones, in a
+    few queries whatever the number of tags: one to find the existing tags,
+    and for the missing ones, one for their slugs, one to create them and
+    one to look them up again.
+    """
+    case_insensitive = getattr(settings, "TAGGIT_CASE_INSENSITIVE", False)
+    normalize = str.lower if case_insensitive else str
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize(name), name)
+    if not wanted:
+        return []
+
+    manager = tag_model._default_manager
+    if case_insensitive:
+        lookup = reduce(or_, (models.Q(name__iexact=name) for name in wanted.values()))
+    else:
+        lookup = models.Q(name__in=list(wanted.values()))
+    tags = {normalize(tag.name): tag for tag in manager.filter(lookup)}
+    missing = [name for key, name in wanted.items() if key not in tags]
+    if missing:
+        # Like TagBase.save, give the new tags unique slugs.
+        new_tags = [tag_model(name=name) for name in missing]
+        slugs = [tag.slugify(tag.name) for tag in new_tags]
+        taken = set(
+            manager.filter(
+                reduce(or_, (models.Q(slug__startswith=slug) for slug in slugs))
+            ).values_list("slug", flat=True)
+        )
+        for tag, slug in zip(new_tags, slugs):
+            i = 1
+            while slug in taken:
+                slug = tag.slugify(tag.name, i)
+                i += 1
+            tag.slug = slug
+            taken.add(slug)
+        try:
+            with transaction.atomic():
+                manager.bulk_create(new_tags)
+        except IntegrityError:
+            # Some were created in the meantime, so create the rest one by
+            # one, like taggit does.
+            for name in missing:
+                existing = manager.filter(
+                    **{"name__iexact" if case_insensitive else "name": name}
+                ).first()
+                tag = existing or manager.create(name=name)
+                tags[normalize(tag.name)] = tag
+        else:
+            # The primary keys of rows inserted in bulk aren't always returned.
+            for tag in manager.filter(slug__in=[tag.slug for tag in new_tags]):
+                tags[normalize(tag.name)] = tag
+    return [tags[key] for key in wanted if key in tags]
+
+
+def _update_tags(manager, tags, remove):
+    through = manager.through
+    tag_model = through.tag_model()
+    names = [tag for tag in tags if isinstance(tag, str)]
+    tag_objs = {tag.pk: tag for tag in tags if isinstance(tag, tag_model)}
+    if len(names) + len(tag_objs) < len(tags):
+        raise ValueError("Expected {} or str tags".format(tag_model.__name__))
+    for tag in get_or_create_tags(tag_model, names):
+        tag_objs.setdefault(tag.pk, tag)
+
+    lookup_kwargs = manager._lookup_kwargs()
+    existing = dict(
+        through._default_manager.filter(**lookup_kwargs).values_list("tag_id", "pk")
+    )
+    new_ids = set(tag_objs) - set(existing)
+    old_ids = set(existing) - set(tag_objs) if remove else set()
+    signal_kwargs = {
+        "sender": through,
+        "instance": manager.instance,
+        "reverse": False,
+        "model": tag_model,
+        "using": through._default_manager.db,
+    }
+    if old_ids:
+        m2m_changed.send(action="pre_remove", pk_set=old_ids, **signal_kwargs)
+        through._default_manager.filter(
+            pk__in=[existing[tag_id] for tag_id in old_ids]
+        ).delete()
+        m2m_changed.send(action="post_remove", pk_set=old_ids, **signal_kwargs)
+    if new_ids:
+        m2m_changed.send(action="pre_add", pk_set=new_ids, **signal_kwargs)
+        through._default_manager.bulk_create(
+            [through(tag=tag_objs[tag_id], **lookup_kwargs) for tag_id in new_ids]
+        )
+        m2m_changed.send(action="post_add", pk_set=new_ids, **signal_kwargs)
+
+
+def set_tags(manager, *tags):
+    """
+    Set the tags of an object to the given tag names or objects, like
+    ``manager.set(*tags)`` for the object's taggable manager, but with one
+    query to find the tags (plus a few to create the missing ones), one for
+    the object's current tags, one delete and one insert.
+    """
+    _update_tags(manager, tags, remove=True)
+
+
+def add_tags(manager, *tags):
+    """
+    Add the given tag names or objects to the tags of an object, like
+    ``manager.add(*tags)``, in bulk like ``set_tags``.
+    """
+    _update_tags(manager, tags, remove=False)
+
+
 class IPBanManager(models.Manager):
     def active(self, ip):
         return self.filter(ip=ip, deleted__isnull=True)
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from urllib.parse import urlsplit
 
 from django.conf import settings
@@ -8,8 +9,9 @@ from django.http import (
     HttpResponsePermanentRedirect,
     HttpResponseRedirect,
 )
-from django.urls import get_script_prefix, resolve, Resolver404
+from django.urls import get_script_prefix, get_urlconf, resolve, Resolver404
 from django.utils.encoding import smart_str
+from django.utils.translation.trans_real import language_code_prefix_re
 from waffle.middleware import WaffleMiddleware
 
 from kuma.wiki.views.legacy import mindtouch_to_kuma_redirect, mindtouch_to_kuma_url
@@ -83,34 +85,13 @@ class LocaleStandardizerMiddleware(MiddlewareBase):
         if response.status_code != 404:
             return response
 
-        # Get the language code picked based on the path
-        language_from_path = get_language_from_path(request.path_info)
-        if not language_from_path:
+        regex_match = language_code_prefix_re.match(request.path_info)
+        if not regex_match:
             # 404 URLs without locale prefixes should remain 404s
             return response
 
-        literal_from_path = request.path_info.split("/")[1]
-        fixed_locale = None
-        lower_literal = literal_from_path.lower()
-        lower_language = language_from_path.lower()
-        match = literal_from_path == language_from_path
-        lower_match = lower_literal == lower_language
-
-        if not match and lower_match:
-            # Convert locale prefix to the preferred case (en-us -> en-US)
-            fixed_locale = language_from_path
-        elif lower_literal in settings.LOCALE_ALIASES:
-            # Fix special cases (cn -> zh-CN, zh-Hans -> zh-CN)
-            fixed_locale = settings.LOCALE_ALIASES[lower_literal]
-        elif not match and lower_literal.startswith(lower_language):
-            # Convert regional to generic locale prefix (fr-FR -> fr)
-            # Case-insensitive so FR-Fr also goes to fr
-            fixed_locale = language_from_path
-        elif not match and lower_language.startswith(lower_literal):
-            # Convert generic to regional locale prefix (pt -> pt-PT)
-            # Case-insensitive so PT -> pt-PT and En -> en-US
-            fixed_locale = language_from_path
-
+        literal_from_path = regex_match.group(1)
+        fixed_locale = get_standard_locale_prefix(literal_from_path)
         if fixed_locale:
             # Replace the 404 with a redirect to the fixed locale
             full_path = request.get_full_path()
@@ -123,6 +104,48 @@ class LocaleStandardizerMiddleware(MiddlewareBase):
         return response
 
 
+@lru_cache(maxsize=1000)
+def get_standard_locale_prefix(literal_from_path):
+    """
+    Return the locale prefix that a 404 with the given locale prefix should
+    be redirected to, or None if it should remain a 404.
+
+    LocaleStandardizerMiddleware used to work this out on each 404. Most of
+    them are junk URLs requested again and again, so the answers are kept in
+    a table, keyed by the prefix. It should have a maxsize, since the
+    prefixes come from the requests, like get_supported_language_variant.
+    """
+    if literal_from_path in get_kuma_languages():
+        # The most common case, a locale that is already standard.
+        return None
+
+    # Get the language code picked based on the path
+    language_from_path = get_language_from_path(f"/{literal_from_path}/")
+    if not language_from_path:
+        return None
+
+    lower_literal = literal_from_path.lower()
+    lower_language = language_from_path.lower()
+    match = literal_from_path == language_from_path
+    lower_match = lower_literal == lower_language
+
+    if not match and lower_match:
+        # Convert locale prefix to the preferred case (en-us -> en-US)
+        return language_from_path
+    elif lower_literal in settings.LOCALE_ALIASES:
+        # Fix special cases (cn -> zh-CN, zh-Hans -> zh-CN)
+        return settings.LOCALE_ALIASES[lower_literal]
+    elif not match and lower_literal.startswith(lower_language):
+        # Convert regional to generic locale prefix (fr-FR -> fr)
+        # Case-insensitive so FR-Fr also goes to fr
+        return language_from_path
+    elif not match and lower_language.startswith(lower_literal):
+        # Convert generic to regional locale prefix (pt -> pt-PT)
+        # Case-insensitive so PT -> pt-PT and En -> en-US
+        return language_from_path
+    return None
+
+
 class LocaleMiddleware(MiddlewareBase):
     """
     This is a very simple middleware that parses a request
@@ -234,6 +257,23 @@ def is_valid_path(path, language_code, urlconf=None):
     * If the catch-all mindtouch_to_kuma_redirect was the match, check if it
       would return a 404.
     * Adds a required language_code parameter, for mindtouch_to_kuma_url
+    * The answers are cached by path, see _resolves.
+    """
+    if urlconf is None:
+        urlconf = get_urlconf() or settings.ROOT_URLCONF
+    return _resolves(path, language_code, urlconf)
+
+
+@lru_cache(maxsize=10000)
+def _resolves(path, language_code, urlconf):
+    """
+    Return whether the path is valid, for is_valid_path.
+
+    A 404 tries to resolve a few variations of its path, with and without a
+    locale and a trailing slash, and each time goes through all the URL
+    patterns, including the long list of redirects, before failing. The URL
+    patterns don't change while the process runs, so the answers can be
+    kept, with a maxsize since the paths come from the requests.
     """
     try:
         match = resolve(path, urlconf)
@@ -25,3 +25,18 @@ def test_user_exists(wiki_user):
     wiki_user.refresh_from_db()
     assert wiki_user.is_staff is True
     assert wiki_user.is_superuser is True
+
+
+def test_benchmark_404s():
+    out = StringIO()
+    call_command(
+        "benchmark_404s", "/wp-login.php", "/en-us/xmlrpc.php", "--repeat=2", stdout=out
+    )
+    assert out.getvalue().startswith("warm: 4 requests, ")
+
+
+def test_benchmark_404s_cold():
+    out = StringIO()
+    call_command("benchmark_404s", "/wp-login.php", "--repeat=1", "--cold", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert [line.split(":")[0] for line in lines] == ["cold", "warm"]
@@ -0,0 +1,65 @@
+import pytest
+from django.conf.locale import LANG_INFO
+
+from ..i18n import (
+    _get_supported_language_variant,
+    get_language_from_accept_language,
+    get_language_table,
+    get_supported_language_variant,
+)
+
+
+@pytest.mark.parametrize(
+    "lang_code,expected",
+    (
+        ("en-US", "en-US"),
+        ("en-us", "en-US"),
+        ("en", "en-US"),
+        ("en-GB", "en-US"),
+        ("pt", "pt-PT"),
+        ("pt-br", "pt-BR"),
+        ("fr-FR", "fr"),
+        ("zh-Hans", "zh-CN"),
+        ("zh_tw", "zh-TW"),
+        ("cn", "zh-CN"),
+        ("fr-zz", "fr"),
+    ),
+)
+def test_get_supported_language_variant(lang_code, expected):
+    assert get_supported_language_variant(lang_code) == expected
+
+
+@pytest.mark.parametrize("lang_code", ("", None, "qaz", "qaz-ZZ"))
+def test_get_supported_language_variant_unsupported(lang_code):
+    with pytest.raises(LookupError):
+        get_supported_language_variant(lang_code)
+
+
+def test_language_table():
+    """The table has the same answers as the full negotiation."""
+    table = get_language_table()
+    assert table["en-us"] == "en-US"
+    assert table["zh-hans"] == "zh-CN"
+    for lang_code in LANG_INFO:
+        try:
+            expected = _get_supported_language_variant(lang_code)
+        except LookupError:
+            assert lang_code not in table
+        else:
+            assert table[lang_code] == expected
+    with pytest.raises(TypeError):
+        table["xx"] = "en-US"
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    (
+        ("", None),
+        ("fr-FR, de;q=0.5", "fr"),
+        ("qaz-ZZ, pt;q=0.5", "pt-PT"),
+        ("qaz-ZZ, qaz;q=0.5", None),
+        ("*", None),
+    ),
+)
+def test_get_language_from_accept_language(accept, expected):
+    assert get_language_from_accept_language(accept) == expected
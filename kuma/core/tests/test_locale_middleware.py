@@ -3,6 +3,7 @@ from django.conf import settings
 from django.urls import reverse
 
 from . import assert_shared_cache_header
+from ..middleware import get_standard_locale_prefix
 
 
 # Simple Accept-Language headers, one term
@@ -81,6 +82,15 @@ def test_locale_middleware_fixer(original, fixed, client, db):
     assert_shared_cache_header(response)
 
 
+@pytest.mark.parametrize(
+    "original,fixed",
+    [(orig, new) for (orig, new) in REDIRECT_CASES if orig]
+    + [("en-US", None), ("fr", None), ("pt-BR", None), ("xx", None), ("docs", None)],
+)
+def test_get_standard_locale_prefix(original, fixed):
+    assert get_standard_locale_prefix(original) == fixed
+
+
 def test_locale_middleware_fixer_confusion(client, db):
     """The LocaleStandardizerMiddleware treats unknown locales as 404s."""
     response = client.get("/xx/")
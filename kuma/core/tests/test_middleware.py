@@ -1,12 +1,15 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from django.core.exceptions import MiddlewareNotUsed
 from django.http import HttpResponse
 from django.test import RequestFactory
+from django.urls import Resolver404
 
 from ..middleware import (
+    _resolves,
     ForceAnonymousSessionMiddleware,
+    is_valid_path,
     RestrictedEndpointsMiddleware,
     SetRemoteAddrFromForwardedFor,
     WaffleWithCookieDomainMiddleware,
@@ -84,3 +87,29 @@ def test_waffle_cookie_domain_middleware(rf, settings):
     assert response.cookies["another_key"]["domain"] == "another.domain"
     assert response.cookies["dwf_contrib_beta"]["domain"] == "mdn.dev"
     assert response.cookies["dwf_developer_needs"]["domain"] == "mdn.dev"
+
+
+@pytest.mark.parametrize(
+    "path,expected",
+    (
+        ("/en-US/docs/Web/HTML", True),
+        ("/en-US/User:Someone", True),
+        ("/wp-login.php", False),
+        ("/en-US/Template:MindTouch/Foo", False),
+    ),
+)
+def test_is_valid_path(db, path, expected):
+    _resolves.cache_clear()
+    assert is_valid_path(path, "en-US") is expected
+
+
+def test_is_valid_path_is_cached():
+    """A path is only resolved once, while the URL patterns stay the same."""
+    _resolves.cache_clear()
+    with patch("kuma.core.middleware.resolve", side_effect=Resolver404) as resolve:
+        assert not is_valid_path("/wp-login.php", "en-US")
+        assert not is_valid_path("/wp-login.php", "en-US")
+        assert resolve.call_count == 1
+        assert not is_valid_path("/wp-login.php", "en-US", "kuma.urls_untrusted")
+        assert resolve.call_count == 2
+    _resolves.cache_clear()
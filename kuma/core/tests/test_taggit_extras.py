@@ -2,6 +2,7 @@ from django.test import TestCase
 from taggit.models import Tag
 
 from .taggit_extras.models import Food
+from ..managers import add_tags, set_tags
 
 
 class NamespacedTaggableManagerTest(TestCase):
@@ -86,3 +87,29 @@ class NamespacedTaggableManagerTest(TestCase):
         tags = ["tasty", "Tasty", "Red", "red"]
         apple.tags.add_ns("a:", *tags)
         self.assert_tags_equal(apple.tags.all(), ["a:Tasty", "a:Red"])
+
+    def test_set_tags(self):
+        apple = self.food_model.objects.create(name="apple")
+        apple.tags.add("red", "sweet")
+        Tag.objects.create(name="Tasty")
+        # A query to find the tags, a query each for the slugs of the missing
+        # tags, to create them (in a savepoint) and to look them up, one for
+        # the current tags, one delete and one insert.
+        with self.assertNumQueries(9):
+            set_tags(apple.tags, "red", "tasty", "crunchy", "juicy", "Juicy")
+        self.assert_tags_equal(apple.tags.all(), ["red", "Tasty", "crunchy", "juicy"])
+        # Setting the same tags again only reads them.
+        with self.assertNumQueries(2):
+            set_tags(apple.tags, "red", "tasty", "crunchy", "juicy")
+
+    def test_set_tags_unique_slugs(self):
+        apple = self.food_model.objects.create(name="apple")
+        Tag.objects.create(name="C++", slug="c")
+        set_tags(apple.tags, "C", "c#")
+        self.assert_tags_equal(apple.tags.all(), ["c_1", "c_2"], attr="slug")
+
+    def test_add_tags(self):
+        apple = self.food_model.objects.create(name="apple")
+        apple.tags.add("red")
+        add_tags(apple.tags, "sweet", Tag.objects.create(name="juicy"))
+        self.assert_tags_equal(apple.tags.all(), ["red", "sweet", "juicy"])
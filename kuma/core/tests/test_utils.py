@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 from django.core import mail
 from django.core.mail.backends.locmem import EmailBackend
@@ -5,7 +7,9 @@ from django.utils.encoding import force_bytes
 from requests.exceptions import ConnectionError
 
 from kuma.core.utils import (
+    bump_version_token,
     EmailMultiAlternativesRetrying,
+    get_version_token,
     order_params,
     requests_retry_session,
     safer_pyquery,
@@ -157,3 +161,18 @@ def test_EmailMultiAlternativesRetrying(settings):
     sent = mail.outbox[-1]
     # sanity check
     assert sent.subject == "Multi Subject"
+
+
+@mock.patch("kuma.core.utils.transaction.on_commit")
+def test_version_token(mock_on_commit):
+    version = get_version_token("test:version")
+    assert version
+    assert get_version_token("test:version") == version
+    assert get_version_token("test:other-version") != version
+
+    bump_version_token("test:version")
+    bumped = get_version_token("test:version")
+    assert bumped != version
+    # Bumped again on commit
+    mock_on_commit.call_args[0][0]()
+    assert get_version_token("test:version") not in (version, bumped)
@@ -5,17 +5,21 @@ import os
 from itertools import islice
 from smtplib import SMTPConnectError, SMTPServerDisconnected
 from urllib.parse import parse_qsl, ParseResult, urlparse, urlsplit, urlunsplit
+from uuid import uuid4
 
 import requests
 from babel import dates, localedata
 from celery import chain, chord
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.core.paginator import EmptyPage, InvalidPage, Paginator
+from django.db import transaction
 from django.http import QueryDict
 from django.shortcuts import _get_queryset, redirect
 from django.utils.cache import patch_cache_control
 from django.utils.encoding import force_text, smart_bytes
+from django.utils.functional import cached_property
 from django.utils.http import urlencode
 from django.utils.translation import gettext_lazy as _
 from polib import pofile
@@ -61,9 +65,47 @@ def is_untrusted(request):
     )
 
 
-def paginate(request, queryset, per_page=20):
-    """Get a Paginator, abstracting some common paging actions."""
-    paginator = Paginator(queryset, per_page)
+PAGINATOR_COUNT_CACHE_KEY = "kuma:paginator-count:{}"
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60 * 10
+
+
+class CachedCountPaginator(Paginator):
+    """
+    A Paginator that caches the count of a queryset, by its query, when
+    there are at least ``min_cached_count`` objects. Counting them all for
+    every page is slow for the large lists, for which a total that's a few
+    minutes old is close enough.
+    """
+
+    def __init__(self, object_list, per_page, min_cached_count, **kwargs):
+        super(CachedCountPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.min_cached_count = min_cached_count
+
+    @cached_property
+    def count(self):
+        sql, params = self.object_list.query.sql_with_params()
+        cache_key = PAGINATOR_COUNT_CACHE_KEY.format(
+            hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        )
+        count = cache.get(cache_key)
+        if count is None:
+            count = super(CachedCountPaginator, self).count
+            if count >= self.min_cached_count:
+                cache.set(cache_key, count, PAGINATOR_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+def paginate(request, queryset, per_page=20, min_cached_count=None):
+    """
+    Get a Paginator, abstracting some common paging actions.
+
+    With ``min_cached_count``, counts of at least that many objects are
+    cached, see CachedCountPaginator.
+    """
+    if min_cached_count is None:
+        paginator = Paginator(queryset, per_page)
+    else:
+        paginator = CachedCountPaginator(queryset, per_page, min_cached_count)
 
     # Get the page from the request, make sure it's an int.
     try:
@@ -89,6 +131,33 @@ def paginate(request, queryset, per_page=20):
     return paginated
 
 
+def get_version_token(cache_key):
+    """
+    Return the version token in the cache under the given key, starting one
+    if there's none, to be part of the keys of what's cached until it's
+    bumped.
+    """
+    version = cache.get(cache_key)
+    if version is None:
+        cache.add(cache_key, uuid4().hex, None)
+        version = cache.get(cache_key)
+    return version
+
+
+def bump_version_token(cache_key):
+    """
+    Change the version token under the given key, right away, and once the
+    current transaction is committed, in case something was cached with the
+    new token but without the changes in the meantime.
+    """
+
+    def bump():
+        cache.set(cache_key, uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
 def smart_int(string, fallback=0):
     """Convert a string to int, with fallback for invalid strings or types."""
     try:
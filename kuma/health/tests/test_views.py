@@ -139,6 +139,7 @@ def test_status(client, settings, mock_status_externals):
     assert sorted(data["services"].keys()) == [
         "database",
         "kumascript",
+        "rendering",
         "search",
         "test_accounts",
     ]
@@ -151,6 +152,10 @@ def test_status(client, settings, mock_status_externals):
         "available": True,
         "revision": "8da6b8f41",
     }
+    assert data["services"]["rendering"] == {
+        "interactive": {"depth": 0, "age": 0},
+        "bulk": {"depth": 0, "age": 0},
+    }
     assert data["services"]["search"] == {
         "available": True,
         "populated": True,
@@ -18,6 +18,7 @@ from requests.exceptions import ReadTimeout
 from kuma.users.models import User
 from kuma.wiki.kumascript import request_revision_hash
 from kuma.wiki.models import Document
+from kuma.wiki.scheduling import get_queue_stats
 
 
 @never_cache
@@ -75,6 +76,7 @@ def status(request):
         "services": {
             "database": {},
             "kumascript": {},
+            "rendering": {},
             "search": {},
             "test_accounts": {},
         },
@@ -121,6 +123,9 @@ def status(request):
         ks_data["revision"] = ks_response.text
     data["services"]["kumascript"] = ks_data
 
+    # Report the depth and age of the queues of deferred renders
+    data["services"]["rendering"] = get_queue_stats()
+
     # Check that Elasticsearch is reachable and somewhat healthy
     search_data = {"available": None, "populated": None, "health": None, "count": None}
     try:
@@ -6,9 +6,10 @@ import logging
 from django.db import IntegrityError
 from taggit.models import Tag
 
+from kuma.core.managers import add_tags, get_or_create_tags
 from kuma.users.models import User, UserBan
 from kuma.wiki.constants import REDIRECT_CONTENT
-from kuma.wiki.models import Document, DocumentTag, LocalizationTag, ReviewTag, Revision
+from kuma.wiki.models import Document, DocumentTag, Revision
 
 logger = logging.getLogger("kuma.scraper")
 
@@ -46,15 +47,7 @@ class Storage(object):
 
     def safe_add_tags(self, tags, tag_type, tag_relation):
         """Add tags to object, working around duplicate tag issues."""
-        for tag in self.deduped_tags(tags):
-            existing_tags = tag_type.objects.filter(name=tag)
-            tag_count = existing_tags.count()
-            assert tag_count <= 1
-            if tag_count == 1:
-                dt = existing_tags.get()
-            else:
-                dt = tag_type.objects.create(name=tag)
-            tag_relation.add(dt)
+        add_tags(tag_relation, *self.deduped_tags(tags))
 
     def get_document(self, locale, slug):
         try:
@@ -167,13 +160,9 @@ class Storage(object):
         # Manually add tags, to avoid issues with adding two 'duplicate'
         #  tags, like 'Firefox' and 'firefox'
         deduped_tags = self.deduped_tags(tags)
-        new_tags = []
-        for tag in deduped_tags:
-            try:
-                tag = DocumentTag.objects.get(name=tag)
-            except DocumentTag.DoesNotExist:
-                tag = DocumentTag.objects.create(name=tag)
-            new_tags.append('"%s"' % tag.name)
+        new_tags = [
+            '"%s"' % tag.name for tag in get_or_create_tags(DocumentTag, deduped_tags)
+        ]
         if new_tags:
             revision.tags = " ".join(new_tags)
 
@@ -182,16 +171,8 @@ class Storage(object):
         revision.save()
 
         # Add review, localization tags
-        for tag_name in review_tags:
-            tag, created = ReviewTag.objects.get_or_create(
-                name=tag_name, defaults={"slug": tag_name}
-            )
-            revision.review_tags.add(tag)
-        for tag_name in localization_tags:
-            tag, created = LocalizationTag.objects.get_or_create(
-                name=tag_name, defaults={"slug": tag_name}
-            )
-            revision.localization_tags.add(tag)
+        add_tags(revision.review_tags, *review_tags)
+        add_tags(revision.localization_tags, *localization_tags)
 
         # Approve old revisions w/o making them current
         if not revision.is_approved:
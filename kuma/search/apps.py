@@ -1,9 +1,19 @@
 from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
+from kuma.celery import app
+
 
 class SearchConfig(AppConfig):
     """Initialize the kuma.search application."""
 
     name = "kuma.search"
     verbose_name = _("Search")
+
+    def ready(self):
+        """Configure kuma.search after models are loaded."""
+
+        # Blend the latest pageviews into the popularity scores: every day
+        from .tasks import update_popularity
+
+        app.add_periodic_task(60 * 60 * 24, update_popularity.s(incremental=True))
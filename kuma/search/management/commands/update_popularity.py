@@ -0,0 +1,51 @@
+"""
+Recompute the search popularity of documents from pageview counts.
+"""
+from collections import namedtuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kuma.search.popularity import update_popularity
+
+
+class Command(BaseCommand):
+    help = "Update document popularity, in MySQL and the search index, from pageviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            help="Path or URL of a CSV file of url,pageviews rows "
+            "(default: settings.SEARCH_POPULARITY_SOURCE)",
+        )
+        parser.add_argument(
+            "--incremental",
+            help="Blend a single day of pageviews into the existing scores "
+            "instead of replacing them",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Number of documents written per bulk request "
+            "(default: settings.SEARCH_POPULARITY_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--skip-index",
+            help="Only update the database, not the search index",
+            action="store_true",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        try:
+            update_popularity(
+                source=options["source"],
+                incremental=options["incremental"],
+                chunk_size=options["chunk_size"],
+                index=not options["skip_index"],
+                log=log,
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
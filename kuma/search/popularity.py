@@ -0,0 +1,178 @@
+"""
+Compute the search ``popularity`` score of every document from pageviews.
+
+The search API sorts and boosts on a ``popularity`` field, which is a number
+between 0.0 and 1.0 where the most viewed document scores 1.0. This module
+reads raw pageview counts (from a CSV file, or a URL serving one), aggregates
+them per document, normalizes them and writes the scores in chunks to both
+the ``Document.popularity`` column and the search index.
+"""
+import csv
+import io
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+
+from django.conf import settings
+from elasticsearch.helpers import bulk
+from elasticsearch_dsl.connections import connections
+
+from kuma.core.utils import chunked, requests_retry_session
+from kuma.wiki.models import Document
+
+from .routing import get_index_name, get_routing
+
+
+log = logging.getLogger("kuma.search.popularity")
+
+# Scores closer together than this are considered unchanged.
+EPSILON = 1e-6
+
+
+def read_pageviews(source):
+    """
+    Yield ``(url, pageviews)`` tuples from a CSV source, which is either a
+    local file path or an http(s) URL. Rows that don't end in an integer
+    count (like a header row) are skipped.
+    """
+    if source.split("://", 1)[0] in ("http", "https"):
+        response = requests_retry_session().get(source, timeout=30)
+        response.raise_for_status()
+        lines = io.StringIO(response.text)
+    else:
+        lines = open(source, newline="")
+
+    with lines:
+        for row in csv.reader(lines):
+            if len(row) < 2:
+                continue
+            try:
+                count = int(row[-1])
+            except ValueError:
+                continue
+            yield row[0], count
+
+
+def normalize_url(url):
+    """
+    Reduce a pageview URL to the key used for matching documents, by
+    dropping the host, query string and fragment, any trailing slash, and
+    letter case.
+    """
+    return urlparse(url.strip()).path.rstrip("/").lower()
+
+
+def aggregate_pageviews(rows):
+    """
+    Sum the pageviews of rows that refer to the same document, for example
+    ``/en-US/docs/Web/`` and ``/en-us/docs/Web?foo=bar``.
+    """
+    totals = Counter()
+    for url, count in rows:
+        totals[normalize_url(url)] += count
+    return totals
+
+
+def compute_scores(totals):
+    """
+    Normalize the aggregated pageviews into scores between 0.0 and 1.0,
+    relative to the most viewed URL.
+    """
+    if not totals:
+        return {}
+    highest = max(totals.values())
+    if highest <= 0:
+        return {}
+    return {url: count / highest for url, count in totals.items() if count > 0}
+
+
+def get_search_id(locale, slug):
+    """Return the ID of a document in the search index."""
+    return "/{}/docs/{}".format(locale.lower(), slug)
+
+
+def update_popularity(
+    source=None, incremental=False, chunk_size=None, index=True, log=log
+):
+    """
+    Recompute the popularity of all documents from the pageviews found in
+    ``source`` and store any score that changed.
+
+    In the default (full) mode, the pageviews are expected to cover a whole
+    period and replace the previous scores; documents without pageviews
+    drop to 0.0. In incremental mode, the pageviews are expected to cover a
+    single day and are blended into the previous scores, decaying them by
+    ``settings.SEARCH_POPULARITY_DECAY``.
+
+    Returns a dict of counters describing what was done.
+    """
+    source = source or settings.SEARCH_POPULARITY_SOURCE
+    if not source:
+        raise ValueError("No pageview source given")
+    chunk_size = max(chunk_size or settings.SEARCH_POPULARITY_CHUNK_SIZE, 1)
+    decay = settings.SEARCH_POPULARITY_DECAY
+
+    scores = compute_scores(aggregate_pageviews(read_pageviews(source)))
+    log.info("Read pageviews for {} URLs".format(len(scores)))
+
+    changed = []
+    matched = 0
+    docs = Document.objects.only("id", "locale", "slug", "popularity")
+    for doc in docs.iterator():
+        score = scores.get(
+            normalize_url("/{}/docs/{}".format(doc.locale, doc.slug)), 0.0
+        )
+        if score:
+            matched += 1
+        if incremental:
+            score = decay * doc.popularity + (1 - decay) * score
+        if abs(score - doc.popularity) > EPSILON:
+            doc.popularity = score
+            changed.append(doc)
+
+    stats = {
+        "matched": matched,
+        "updated": len(changed),
+        "indexed": 0,
+        "index_errors": 0,
+    }
+    for chunk in chunked(changed, chunk_size):
+        Document.objects.bulk_update(chunk, ["popularity"])
+        if index:
+            indexed, errors = update_search_index(chunk)
+            stats["indexed"] += indexed
+            stats["index_errors"] += len(errors)
+    log.info(
+        "Updated the popularity of {updated} documents ({matched} with "
+        "pageviews, {indexed} indexed, {index_errors} not in the "
+        "index)".format(**stats)
+    )
+    return stats
+
+
+def update_search_index(docs):
+    """
+    Partially update the ``popularity`` of the given documents in the search
+    index with a single bulk request. Documents that aren't in the index
+    are reported as errors but don't stop the update. Each update goes to
+    the partition of the document's locale (see ``kuma.search.routing``).
+    """
+    actions = []
+    for doc in docs:
+        action = {
+            "_op_type": "update",
+            "_index": get_index_name(doc.locale),
+            "_id": get_search_id(doc.locale, doc.slug),
+            "doc": {"popularity": doc.popularity},
+        }
+        routing = get_routing(doc.locale)
+        if routing:
+            action["routing"] = routing
+        actions.append(action)
+    return bulk(
+        connections.get_connection(),
+        actions,
+        chunk_size=len(docs),
+        raise_on_error=False,
+        raise_on_exception=False,
+    )
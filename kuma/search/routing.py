@@ -0,0 +1,58 @@
+"""
+Where, in Elasticsearch, the documents of each locale live.
+
+The search index can be partitioned by locale in one of two ways, chosen
+with ``settings.SEARCH_ROUTING``, so that searching in a single locale
+doesn't have to go through the shards holding all the other locales:
+
+``"routing"``
+    A single index, where each document is indexed with its locale as the
+    routing key. A search only hits the shards its locales are routed to.
+
+``"index"``
+    One index (usually an alias) per locale, named
+    ``<SEARCH_INDEX_NAME>_<locale>``. A search only hits the indexes of its
+    locales.
+
+When empty, everything is in the one ``SEARCH_INDEX_NAME`` index.
+"""
+from django.conf import settings
+
+
+ROUTING_MODES = ("", "routing", "index")
+
+
+def get_routing_mode(mode=None):
+    if mode is None:
+        mode = settings.SEARCH_ROUTING
+    if mode not in ROUTING_MODES:
+        raise ValueError("Unknown search routing mode {!r}".format(mode))
+    return mode
+
+
+def get_index_name(locale, mode=None):
+    """Return the name of the index that has the documents of a locale."""
+    if get_routing_mode(mode) == "index":
+        return "{}_{}".format(settings.SEARCH_INDEX_NAME, locale.lower())
+    return settings.SEARCH_INDEX_NAME
+
+
+def get_routing(locale, mode=None):
+    """Return the routing key of the documents of a locale, if any."""
+    if get_routing_mode(mode) == "routing":
+        return locale.lower()
+    return None
+
+
+def get_search_target(locales, mode=None):
+    """
+    Return the ``(indexes, routing)`` to search in order to find the
+    documents of all the given locales, and only hit the partitions that
+    hold them. ``routing`` is either ``None`` or a comma-separated string.
+    """
+    mode = get_routing_mode(mode)
+    indexes = sorted({get_index_name(locale, mode) for locale in locales})
+    routing = None
+    if mode == "routing":
+        routing = ",".join(sorted({get_routing(locale, mode) for locale in locales}))
+    return indexes or [settings.SEARCH_INDEX_NAME], routing or None
@@ -0,0 +1,12 @@
+from celery import task
+
+from kuma.core.decorators import skip_in_maintenance_mode
+
+from .popularity import update_popularity as popularity_update_popularity
+
+
+@task
+@skip_in_maintenance_mode
+def update_popularity(source=None, incremental=True):
+    """Blend the latest pageviews into the search popularity scores."""
+    return popularity_update_popularity(source=source, incremental=incremental)
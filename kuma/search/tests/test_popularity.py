@@ -0,0 +1,133 @@
+import pytest
+from django.core.management import call_command
+from mock import patch
+
+from kuma.wiki.models import Document
+
+from ..popularity import (
+    aggregate_pageviews,
+    compute_scores,
+    normalize_url,
+    read_pageviews,
+    update_popularity,
+)
+
+
+PAGEVIEWS_CSV = """\
+url,pageviews
+/en-US/docs/Root,300
+https://developer.mozilla.org/en-us/docs/Root/?utm_source=x,100
+/fr/docs/Racine,100
+/en-US/docs/Unknown,50
+"""
+
+
+@pytest.fixture
+def pageviews_file(tmp_path):
+    path = tmp_path / "pageviews.csv"
+    path.write_text(PAGEVIEWS_CSV)
+    return str(path)
+
+
+@pytest.fixture
+def mock_bulk():
+    with patch("kuma.search.popularity.bulk") as mock_bulk, patch(
+        "kuma.search.popularity.connections"
+    ):
+        mock_bulk.actions = []
+
+        def consume(connection, actions, **kwargs):
+            batch = list(actions)
+            mock_bulk.actions.extend(batch)
+            return len(batch), []
+
+        mock_bulk.side_effect = consume
+        yield mock_bulk
+
+
+@pytest.mark.parametrize(
+    "url",
+    (
+        "/en-US/docs/Web",
+        "/en-us/docs/web/",
+        "https://developer.mozilla.org/en-US/docs/Web?foo=bar#baz",
+    ),
+)
+def test_normalize_url(url):
+    assert normalize_url(url) == "/en-us/docs/web"
+
+
+def test_read_and_aggregate_pageviews(pageviews_file):
+    totals = aggregate_pageviews(read_pageviews(pageviews_file))
+    assert totals == {
+        "/en-us/docs/root": 400,
+        "/fr/docs/racine": 100,
+        "/en-us/docs/unknown": 50,
+    }
+
+
+def test_read_pageviews_from_url(mock_requests):
+    url = "https://example.com/pageviews.csv"
+    mock_requests.get(url, text=PAGEVIEWS_CSV)
+    assert list(read_pageviews(url))[0] == ("/en-US/docs/Root", 300)
+
+
+def test_compute_scores():
+    assert compute_scores({"/a": 200, "/b": 50, "/c": 0}) == {"/a": 1.0, "/b": 0.25}
+    assert compute_scores({}) == {}
+
+
+def test_update_popularity(root_doc, trans_doc, pageviews_file, mock_bulk):
+    stats = update_popularity(pageviews_file)
+    assert stats["matched"] == 2
+    assert stats["updated"] == 2
+    assert stats["indexed"] == 2
+
+    assert Document.objects.get(pk=root_doc.pk).popularity == 1.0
+    assert Document.objects.get(pk=trans_doc.pk).popularity == 0.25
+
+    actions = mock_bulk.actions
+    assert {action["_id"]: action["doc"] for action in actions} == {
+        "/en-us/docs/Root": {"popularity": 1.0},
+        "/fr/docs/Racine": {"popularity": 0.25},
+    }
+
+    # Nothing changed, so nothing is written the second time around.
+    mock_bulk.reset_mock()
+    stats = update_popularity(pageviews_file)
+    assert stats["updated"] == 0
+    assert not mock_bulk.called
+
+
+def test_update_popularity_incremental(
+    root_doc, trans_doc, pageviews_file, mock_bulk, settings
+):
+    settings.SEARCH_POPULARITY_DECAY = 0.5
+    Document.objects.filter(pk=trans_doc.pk).update(popularity=0.75)
+
+    update_popularity(pageviews_file, incremental=True)
+
+    assert Document.objects.get(pk=root_doc.pk).popularity == 0.5
+    assert Document.objects.get(pk=trans_doc.pk).popularity == 0.5
+
+
+def test_update_popularity_command(root_doc, pageviews_file, mock_bulk):
+    call_command("update_popularity", pageviews_file, "--skip-index")
+    assert Document.objects.get(pk=root_doc.pk).popularity == 1.0
+    assert not mock_bulk.called
+
+
+def test_update_popularity_routing(root_doc, pageviews_file, mock_bulk, settings):
+    settings.SEARCH_ROUTING = "index"
+    update_popularity(pageviews_file)
+    (action,) = mock_bulk.actions
+    assert action["_index"] == settings.SEARCH_INDEX_NAME + "_en-us"
+    assert "routing" not in action
+
+    settings.SEARCH_ROUTING = "routing"
+    Document.objects.filter(pk=root_doc.pk).update(popularity=0.0)
+    mock_bulk.actions = []
+    update_popularity(pageviews_file)
+    (action,) = mock_bulk.actions
+    assert action["_index"] == settings.SEARCH_INDEX_NAME
+    assert action["routing"] == "en-us"
@@ -0,0 +1,36 @@
+import pytest
+
+from ..routing import get_index_name, get_routing, get_search_target
+
+
+def test_no_routing(settings):
+    settings.SEARCH_ROUTING = ""
+    assert get_index_name("de") == settings.SEARCH_INDEX_NAME
+    assert get_routing("de") is None
+    assert get_search_target(["de", "fr"]) == ([settings.SEARCH_INDEX_NAME], None)
+
+
+def test_routing_by_key(settings):
+    settings.SEARCH_ROUTING = "routing"
+    assert get_index_name("de") == settings.SEARCH_INDEX_NAME
+    assert get_routing("en-US") == "en-us"
+    assert get_search_target(["fr", "de", "fr"]) == (
+        [settings.SEARCH_INDEX_NAME],
+        "de,fr",
+    )
+
+
+def test_routing_by_index(settings):
+    settings.SEARCH_ROUTING = "index"
+    settings.SEARCH_INDEX_NAME = "mdn_docs"
+    assert get_index_name("en-US") == "mdn_docs_en-us"
+    assert get_routing("de") is None
+    assert get_search_target(["fr", "de"]) == (["mdn_docs_de", "mdn_docs_fr"], None)
+    # An explicit mode overrides the setting.
+    assert get_search_target(["fr"], mode="") == (["mdn_docs"], None)
+
+
+def test_unknown_routing(settings):
+    settings.SEARCH_ROUTING = "shards"
+    with pytest.raises(ValueError):
+        get_search_target(["de"])
@@ -912,6 +912,10 @@ PIPELINE_JS = {
         "source_filenames": ("js/users.js",),
         "output_filename": "build/js/users.js",
     },
+    "ban-user-cleanup": {
+        "source_filenames": ("js/ban-user-cleanup.js",),
+        "output_filename": "build/js/ban-user-cleanup.js",
+    },
     "user-signup": {
         "source_filenames": ("js/components/user-signup/signup.js",),
         "output_filename": "build/js/signup.js",
@@ -1319,21 +1323,42 @@ CELERY_TASK_ROUTES = {
     "kuma.users.tasks.send_welcome_email": {"queue": "mdn_emails"},
     "kuma.users.tasks.email_document_progress": {"queue": "mdn_emails"},
     "kuma.wiki.tasks.send_first_edit_email": {"queue": "mdn_emails"},
+    "kuma.wiki.tasks.send_edit_digests": {"queue": "mdn_emails"},
     "tidings.events._fire_task": {"queue": "mdn_emails"},
     "tidings.events.claim_watches": {"queue": "mdn_emails"},
     "kuma.wiki.tasks.move_page": {"queue": "mdn_wiki"},
     "kuma.wiki.tasks.acquire_render_lock": {"queue": "mdn_wiki"},
     "kuma.wiki.tasks.release_render_lock": {"queue": "mdn_wiki"},
     "kuma.wiki.tasks.render_document": {"queue": "mdn_wiki"},
-    "kuma.wiki.tasks.render_document_chunk": {"queue": "mdn_wiki"},
+    "kuma.wiki.tasks.render_run_chunk": {"queue": "mdn_wiki_bulk"},
     "kuma.wiki.tasks.clean_document_chunk": {"queue": "mdn_wiki"},
     "kuma.wiki.tasks.build_json_data_for_document": {"queue": "mdn_wiki"},
+    "kuma.wiki.tasks.cache_revision_diff": {"queue": "mdn_wiki"},
+    "kuma.wiki.tasks.tidy_revision_chunk": {"queue": "mdn_wiki"},
+    "kuma.users.tasks.clean_up_banned_user": {"queue": "mdn_wiki"},
+    "kuma.attachments.tasks.create_attachment_variants": {"queue": "mdn_purgeable"},
     "kuma.feeder.tasks.update_feeds": {"queue": "mdn_purgeable"},
+    "kuma.search.tasks.update_popularity": {"queue": "mdn_purgeable"},
     "kuma.api.tasks.publish": {"queue": "mdn_api"},
     "kuma.api.tasks.unpublish": {"queue": "mdn_api"},
     "kuma.api.tasks.request_cdn_cache_invalidation": {"queue": "mdn_api"},
+    "kuma.api.tasks.export_documents": {"queue": "mdn_api"},
+}
+
+# The celery queues of the interactive and bulk lanes of deferred document
+# renders (see kuma.wiki.scheduling). Bulk renders get their own queue, so that
+# they never hold up the renders editors are waiting for.
+WIKI_RENDER_QUEUES = {
+    "interactive": "mdn_wiki",
+    "bulk": "mdn_wiki_bulk",
 }
 
+# Seconds to wait before an interactive render, so that the renders scheduled
+# by a burst of edits or reloads of a document are coalesced into one.
+WIKI_RENDER_COALESCE_WINDOW = config(
+    "WIKI_RENDER_COALESCE_WINDOW", default=2.0, cast=float
+)
+
 # Do not change this without also deleting all wiki documents:
 WIKI_DEFAULT_LANGUAGE = LANGUAGE_CODE
 
@@ -1361,6 +1386,12 @@ CONSTANCE_CONFIG = dict(
         "response cycle before flagging it to be sent to the deferred rendering "
         "queue for future renders.",
     ),
+    KUMA_DOCUMENT_DEFERRED_RELEASE_COUNT=(
+        5,
+        "Number of renders in a row under KUMA_DOCUMENT_FORCE_DEFERRED_TIMEOUT "
+        "after which a document is no longer sent to the deferred rendering "
+        "queue. 0 means documents are never released automatically.",
+    ),
     KUMASCRIPT_TIMEOUT=(
         0.0,
         "Maximum seconds to wait for a response from the kumascript service. "
@@ -1421,6 +1452,19 @@ WIKI_ATTACHMENTS_KEEP_TRASHED_DAYS = config(
     "WIKI_ATTACHMENTS_KEEP_TRASHED_DAYS", default=14, cast=int
 )
 
+# Save the content of new revisions compressed (see kuma.wiki.compression).
+# Compressed revisions can always be read, whatever this is set to.
+WIKI_REVISION_COMPRESSION = config(
+    "WIKI_REVISION_COMPRESSION", default=False, cast=bool
+)
+
+# Tidy the content of revisions that were never tidied when a request needs
+# it, like the revisions feeds. Turn off once every revision is tidied (see the
+# tidy_revisions command), so that requests never have to wait for tidy.
+WIKI_TIDY_REVISIONS_IN_REQUEST = config(
+    "WIKI_TIDY_REVISIONS_IN_REQUEST", default=True, cast=bool
+)
+
 # JSON array listing tag suggestions for documents
 WIKI_DOCUMENT_TAG_SUGGESTIONS = config(
     "WIKI_DOCUMENT_TAG_SUGGESTIONS",
@@ -1621,6 +1665,8 @@ LOGGING = {
     "loggers": {
         "django": {"handlers": ["console"], "level": "INFO"},  # Drop mail_admins
         "kuma": {"handlers": ["console-simple"], "propagate": True, "level": "ERROR"},
+        # Slow search queries are logged as warnings.
+        "kuma.api.v1.search": {"handlers": [], "propagate": True, "level": "WARNING"},
         "elasticsearch": {
             "handlers": ["console-simple"],
             "level": config("ES_LOG_LEVEL", default="ERROR"),
@@ -1784,6 +1830,19 @@ MDN_API_S3_BUCKET_NAME = config("MDN_API_S3_BUCKET_NAME", default=None)
 # Serve and upload attachments via S3, instead of the local filesystem
 ATTACHMENTS_USE_S3 = config("ATTACHMENTS_USE_S3", default=False, cast=bool)
 
+# When attachments are served from the local filesystem, leave sending the
+# files to nginx, with an X-Accel-Redirect to this prefix followed by their
+# path in the storage, like "/protected-media/". By default, Django sends them.
+ATTACHMENTS_X_ACCEL_REDIRECT_PREFIX = config(
+    "ATTACHMENTS_X_ACCEL_REDIRECT_PREFIX", default=""
+)
+
+# The widths of the resized variants of image attachments, that raw_file
+# serves for ?w=
+ATTACHMENTS_IMAGE_WIDTHS = config(
+    "ATTACHMENTS_IMAGE_WIDTHS", default="320,640,1280", cast=Csv(int)
+)
+
 # AWS S3 credentials and settings for uploading attachments
 ATTACHMENTS_AWS_ACCESS_KEY_ID = config("ATTACHMENTS_AWS_ACCESS_KEY_ID", default=None)
 ATTACHMENTS_AWS_SECRET_ACCESS_KEY = config(
@@ -1866,3 +1925,35 @@ ENABLE_SUBSCRIPTIONS = config("ENABLE_SUBSCRIPTIONS", cast=bool, default=False)
 # Kuma doesn't index anything, that's done by the Yari Deployer, but we need
 # to know what the index is called for searching.
 SEARCH_INDEX_NAME = config("SEARCH_INDEX_NAME", default="mdn_docs")
+# The Elasticsearch highlighter used for search results: "plain", "unified",
+# "fvh" or empty for the Elasticsearch default. The faster "fvh" requires the
+# index to store term vectors (see docs/elasticsearch.rst).
+SEARCH_HIGHLIGHTER = config("SEARCH_HIGHLIGHTER", default="")
+# How the search index is partitioned by locale (see docs/elasticsearch.rst):
+# empty for a single index, "routing" for a single index where each document
+# is routed to a shard by its locale, or "index" for one index (or alias)
+# per locale, named "<SEARCH_INDEX_NAME>_<locale>".
+SEARCH_ROUTING = config("SEARCH_ROUTING", default="")
+
+# Searches slower than this many milliseconds (wall-clock) are logged with
+# their compiled query.
+SEARCH_SLOW_QUERY_MS = config("SEARCH_SLOW_QUERY_MS", default=1000, cast=int)
+# Search timings are aggregated in windows of this many seconds, and the
+# stats endpoint reports on this many of the most recent windows.
+SEARCH_STATS_WINDOW_SECONDS = config(
+    "SEARCH_STATS_WINDOW_SECONDS", default=60 * 60, cast=int
+)
+SEARCH_STATS_WINDOWS = config("SEARCH_STATS_WINDOWS", default=24, cast=int)
+
+# Where the popularity pipeline (kuma.search.popularity) reads pageview counts
+# from. Either a local path or an http(s) URL serving CSV rows of
+# "url,pageviews".
+SEARCH_POPULARITY_SOURCE = config("SEARCH_POPULARITY_SOURCE", default="")
+# How many documents are written per bulk request, to both MySQL and
+# Elasticsearch, when updating popularity scores.
+SEARCH_POPULARITY_CHUNK_SIZE = config(
+    "SEARCH_POPULARITY_CHUNK_SIZE", default=1000, cast=int
+)
+# In incremental (daily) mode, how much of the previous score is kept when
+# blending in the newly computed one.
+SEARCH_POPULARITY_DECAY = config("SEARCH_POPULARITY_DECAY", default=0.8, cast=float)
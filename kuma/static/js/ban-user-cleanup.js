@@ -0,0 +1,35 @@
+//
+// Follow the progress of a ban cleanup, and show its summary once it's done
+//
+(function ($) {
+    'use strict';
+
+    var POLL_INTERVAL = 2000;
+
+    $(document).ready(function() {
+        var $progress = $('#ban-cleanup-progress');
+        var url = $progress.data('progress-url');
+
+        if (!url) {
+            return;
+        }
+
+        function poll() {
+            $.getJSON(url).done(function(progress) {
+                if (progress.finished || progress.failed) {
+                    // The page shows the summary, or the failure, once reloaded.
+                    window.location.reload();
+                    return;
+                }
+                $progress.find('.done').text(progress.done);
+                $progress.find('progress').attr('value', progress.done);
+                window.setTimeout(poll, POLL_INTERVAL);
+            }).fail(function() {
+                window.setTimeout(poll, POLL_INTERVAL * 5);
+            });
+        }
+
+        window.setTimeout(poll, POLL_INTERVAL);
+    });
+
+})(window.jQuery);
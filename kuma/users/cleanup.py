@@ -0,0 +1,277 @@
+"""
+Cleanup of the recent revisions of users banned as spammers.
+
+Banning a prolific spammer used to report, revert and delete everything in
+the moderator's request, with a few queries for each revision, and it timed
+out. ``clean_up_spam`` does it in a celery task instead, for a
+``UserBanCleanup`` that the moderator's page follows: the revisions, and the
+revisions before them, are loaded with a handful of queries, what to do with
+each document is decided in memory, and the reports share a single Akismet
+client and its pooled connections.
+"""
+import json
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from kuma.spam import akismet
+from kuma.wiki.forms import RevisionAkismetSubmissionSpamForm
+from kuma.wiki.models import DocumentDeletionLog, Revision, RevisionAkismetSubmission
+from kuma.wiki.scheduling import BULK
+
+from .models import UserBanCleanup
+
+
+# The progress of a cleanup is saved after this many revisions.
+PROGRESS_EVERY = 10
+
+
+def recent_revisions(user):
+    """Return the revisions of a user from the last three days, newest first."""
+    date_three_days_ago = datetime.now().date() - timedelta(days=3)
+    revisions = user.created_revisions.defer("content", "summary").order_by("-id")
+    return revisions.filter(created__gte=date_three_days_ago)
+
+
+def revision_by_distinct_doc(list_of_revisions):
+    documents = {}
+    for rev in list_of_revisions:
+        documents.setdefault(rev.document_id, rev)
+        if documents[rev.document_id].id < rev.id:
+            documents[rev.document_id] = rev
+
+    return [documents[doc_id] for doc_id in sorted(documents)]
+
+
+def get_previous_ids(revisions):
+    """
+    Return the ID of the previous revision of each of the revisions, like
+    ``Revision.get_previous``, with a single query for all of them.
+    """
+    approved = {}
+    for pk, document_id, created in (
+        Revision.objects.filter(
+            document__in={rev.document_id for rev in revisions}, is_approved=True
+        )
+        .order_by("created")
+        .values_list("id", "document_id", "created")
+    ):
+        approved.setdefault(document_id, ([], []))
+        approved[document_id][0].append(created)
+        approved[document_id][1].append(pk)
+    previous_ids = {}
+    for rev in revisions:
+        created, pks = approved.get(rev.document_id, ([], []))
+        index = bisect_left(created, rev.created)
+        previous_ids[rev.id] = pks[index - 1] if index else rev.based_on_id
+    return previous_ids
+
+
+def revert_spam(revision, moderator):
+    """
+    Revert the document of a revision back to it, and return the new
+    revision, or None if that failed.
+    """
+    try:
+        return revision.document.revert(revision, moderator, "spam")
+    except IntegrityError:
+        return None
+
+
+def delete_spam_document(document, moderator):
+    """Delete a spam document, and return whether that worked."""
+    try:
+        DocumentDeletionLog.objects.create(
+            locale=document.locale,
+            slug=document.slug,
+            user=moderator,
+            reason="Spam",
+        )
+        document.delete()
+    except Exception:
+        return False
+    return True
+
+
+def report_spam(revisions, moderator, request=None):
+    """
+    Report the revisions to Akismet as spam, and return the reported ones
+    and the ones that couldn't be.
+    """
+    # A single client, so that all the reports share its pooled session.
+    client = akismet.Akismet()
+    reported, not_reported = [], []
+    for revision in revisions:
+        submission = RevisionAkismetSubmission(sender=moderator, type="spam")
+        form = RevisionAkismetSubmissionSpamForm(
+            data={"revision": revision.id}, instance=submission, request=request
+        )
+        form.akismet_client = client
+        if form.is_valid():
+            form.save()
+            reported.append(revision)
+        else:
+            not_reported.append(revision)
+    return reported, not_reported
+
+
+def save_progress(cleanup, done):
+    cleanup.done = done
+    UserBanCleanup.objects.filter(pk=cleanup.pk).update(done=done)
+
+
+def clean_up_spam(cleanup, request=None):
+    """
+    Report the revisions of a cleanup as spam and, where the newest
+    revisions of a document are spam, revert it to the revision before
+    them, or delete it if it was created by the spammer. Return the
+    summary of what was done, by section.
+    """
+    user, moderator = cleanup.user, cleanup.moderator
+    recent = list(recent_revisions(user).select_related("document"))
+    revision_ids = set(cleanup.get_revision_ids())
+    already_spam_ids = set(cleanup.get_already_spam_ids())
+    # Newest first, so that the newest revisions of each document decide
+    # what to do with it.
+    spam = sorted(
+        (rev for rev in recent if rev.id in revision_ids),
+        key=lambda rev: rev.id,
+        reverse=True,
+    )
+    spam_ids = {rev.id for rev in spam}
+    spam_by_id = {rev.id: rev for rev in spam}
+    previous_ids = get_previous_ids(spam)
+    current_ids = {rev.document_id: rev.document.current_revision_id for rev in spam}
+
+    latest_is_not_spam = [
+        rev
+        for rev in revision_by_distinct_doc(spam)
+        if current_ids[rev.document_id] != rev.id
+    ]
+
+    # Decide what to do with each document in memory.
+    previous_good_ids = {}
+    to_revert, to_delete = [], []
+    handled = set()
+    for revision in spam:
+        document_id = revision.document_id
+        if document_id in handled:
+            continue  # The newest spam revision of the document decided
+        handled.add(document_id)
+        if current_ids[document_id] not in spam_ids:
+            # This document has a more current revision, no need to revert
+            previous_good_ids[document_id] = current_ids[document_id]
+            continue
+        # Find the oldest spam revision of the newest ones of the document.
+        while previous_ids.get(revision.id) in spam_ids:
+            revision = spam_by_id[previous_ids[revision.id]]
+        previous_id = previous_ids[revision.id]
+        if previous_id:
+            previous_good_ids[document_id] = previous_id
+            to_revert.append((revision, previous_id))
+        else:
+            to_delete.append(revision)
+
+    done = 0
+    reported, not_reported = [], []
+    for chunk_start in range(0, len(spam), PROGRESS_EVERY):
+        chunk = spam[chunk_start : chunk_start + PROGRESS_EVERY]
+        chunk_reported, chunk_not_reported = report_spam(chunk, moderator, request)
+        reported.extend(chunk_reported)
+        not_reported.extend(chunk_not_reported)
+        done += len(chunk)
+        save_progress(cleanup, done)
+
+    # The revisions to revert to, with a single query.
+    previous_revisions = Revision.objects.select_related("document").in_bulk(
+        [previous_id for _, previous_id in to_revert]
+    )
+    reverted, not_reverted, reverted_documents = [], [], []
+    for revision, previous_id in to_revert:
+        previous = previous_revisions[previous_id]
+        new_revision = revert_spam(previous, moderator)
+        if new_revision:
+            reverted.append(revision)
+            if new_revision.pk != previous_id:  # pragma: no branch
+                reverted_documents.append(previous.document)
+        else:
+            # If the revert was unsuccessful, include this in the follow-up list
+            not_reverted.append(revision)
+    # The reverted documents are rendered once they are all reverted.
+    for document in reverted_documents:
+        document.schedule_rendering("max-age=0", lane=BULK)
+
+    deleted, not_deleted = [], []
+    for revision in to_delete:
+        if delete_spam_document(revision.document, moderator):
+            deleted.append(revision)
+        else:
+            not_deleted.append(revision)
+
+    skipped_revisions = [
+        rev
+        for rev in spam
+        if rev.document_id in previous_good_ids
+        and rev.id < previous_good_ids[rev.document_id]
+    ]
+    already_spam = [rev for rev in recent if rev.id in already_spam_ids]
+    identified_as_not_spam = [
+        rev
+        for rev in recent
+        if rev.id not in already_spam_ids and rev.id not in spam_ids
+    ]
+
+    return {
+        "actions_taken": {
+            "revisions_reported_as_spam": revision_by_distinct_doc(reported),
+            "revisions_reverted_list": revision_by_distinct_doc(reverted),
+            "revisions_deleted_list": revision_by_distinct_doc(deleted),
+        },
+        "needs_follow_up": {
+            # TODO: Phase V: If user made actions while reviewer was banning them
+            "manual_revert": [],
+            "skipped_revisions": revision_by_distinct_doc(skipped_revisions),
+            "not_submitted_to_akismet": revision_by_distinct_doc(not_reported),
+            "not_reverted_list": revision_by_distinct_doc(not_reverted),
+            "not_deleted_list": revision_by_distinct_doc(not_deleted),
+        },
+        "no_actions_taken": {
+            "latest_revision_is_not_spam": latest_is_not_spam,
+            "revisions_already_identified_as_spam": revision_by_distinct_doc(
+                already_spam
+            ),
+            "revisions_identified_as_not_spam": revision_by_distinct_doc(
+                identified_as_not_spam
+            ),
+        },
+    }
+
+
+def finish_cleanup(cleanup, summary):
+    """Record the summary of a cleanup, by the IDs of its revisions."""
+    cleanup.summary = json.dumps(
+        {
+            name: {
+                key: [rev.id for rev in revisions] for key, revisions in section.items()
+            }
+            for name, section in summary.items()
+        }
+    )
+    cleanup.finished = timezone.now()
+    cleanup.save(update_fields=["done", "summary", "finished"])
+
+
+def ban_and_revert_notification(spammer, moderator, info):
+    subject = "[MDN] %s has been banned by %s" % (spammer, moderator)
+    context = {"spammer": spammer, "moderator": moderator}
+    context.update(info)
+    body = render_to_string("wiki/email/spam_ban.ltxt", context)
+
+    send_mail(
+        subject, body, settings.DEFAULT_FROM_EMAIL, [settings.EMAIL_LIST_SPAM_WATCH]
+    )
@@ -142,6 +142,7 @@ class UserEditForm(forms.ModelForm):
             "discourse_url",
             "username",
             "is_newsletter_subscribed",
+            "edit_digest",
         )
 
     def __init__(self, *args, **kwargs):
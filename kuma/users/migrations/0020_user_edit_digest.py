@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0019_auto_20201105_0411"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="edit_digest",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "An email for each edit"),
+                    ("hourly", "An hourly digest"),
+                    ("daily", "A daily digest"),
+                ],
+                default="",
+                max_length=8,
+                verbose_name="Edit notifications",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0020_user_edit_digest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserBanCleanup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("revision_ids", models.TextField(blank=True)),
+                ("already_spam_ids", models.TextField(blank=True)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("done", models.PositiveIntegerField(default=0)),
+                ("summary", models.TextField(blank=True)),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "moderator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="ban_cleanups_started",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Started by",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ban_cleanups",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Banned user",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 import datetime
+import json
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
@@ -112,6 +113,21 @@ class User(AbstractUser):
 
     is_newsletter_subscribed = models.BooleanField(default=False)
 
+    EDIT_DIGEST_HOURLY = "hourly"
+    EDIT_DIGEST_DAILY = "daily"
+    EDIT_DIGEST_CHOICES = (
+        ("", _("An email for each edit")),
+        (EDIT_DIGEST_HOURLY, _("An hourly digest")),
+        (EDIT_DIGEST_DAILY, _("A daily digest")),
+    )
+    edit_digest = models.CharField(
+        verbose_name=_("Edit notifications"),
+        max_length=8,
+        choices=EDIT_DIGEST_CHOICES,
+        default="",
+        blank=True,
+    )
+
     WEBSITE_VALIDATORS = {
         "website": validators.RegexValidator(
             r"^https?://",
@@ -294,6 +310,96 @@ class UserSubscription(models.Model):
         )
 
 
+class UserBanCleanup(models.Model):
+    """
+    The cleanup of the recent revisions of a user banned as a spammer.
+
+    The revisions are reported as spam and reverted, or their new documents
+    deleted, by a celery task that records its progress as it goes, so that
+    the moderator's page can follow it, and then the IDs of the revisions
+    in each section of the summary.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name="ban_cleanups",
+        verbose_name="Banned user",
+        on_delete=models.CASCADE,
+    )
+    moderator = models.ForeignKey(
+        User,
+        related_name="ban_cleanups_started",
+        verbose_name="Started by",
+        on_delete=models.PROTECT,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # The comma-separated IDs of the revisions to report and revert, and of
+    # the revisions that were already reported as spam
+    revision_ids = models.TextField(blank=True)
+    already_spam_ids = models.TextField(blank=True)
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    # The IDs of the revisions of each section of the summary, as JSON
+    summary = models.TextField(blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return "Cleanup of %s by %s" % (self.user, self.moderator)
+
+    def get_absolute_url(self):
+        return reverse(
+            "users.ban_user_and_cleanup_job",
+            kwargs={"username": self.user.username, "cleanup_id": self.pk},
+        )
+
+    @classmethod
+    def start(cls, user, moderator, revision_ids, already_spam_ids):
+        """Record the cleanup of these revisions of a user."""
+        revision_ids = sorted(revision_ids, reverse=True)
+        return cls.objects.create(
+            user=user,
+            moderator=moderator,
+            revision_ids=",".join(str(pk) for pk in revision_ids),
+            already_spam_ids=",".join(str(pk) for pk in sorted(already_spam_ids)),
+            total=len(revision_ids),
+        )
+
+    def get_revision_ids(self):
+        return [int(pk) for pk in self.revision_ids.split(",") if pk]
+
+    def get_already_spam_ids(self):
+        return [int(pk) for pk in self.already_spam_ids.split(",") if pk]
+
+    def get_progress(self):
+        return {
+            "total": self.total,
+            "done": self.done,
+            "finished": bool(self.finished),
+            "failed": bool(self.last_error),
+        }
+
+    def get_summary(self):
+        """
+        Return the sections of the summary, with the revisions loaded by a
+        single query.
+        """
+        from kuma.wiki.models import Revision
+
+        summary = json.loads(self.summary or "{}")
+        ids = {
+            pk for section in summary.values() for pks in section.values() for pk in pks
+        }
+        revisions = Revision.objects.select_related("document").in_bulk(ids)
+        return {
+            name: {
+                key: [revisions[pk] for pk in pks if pk in revisions]
+                for key, pks in section.items()
+            }
+            for name, section in summary.items()
+        }
+
+
 @receiver(models.signals.post_save, sender=UserSubscription)
 def set_user_subscriber_number(sender, instance, **kwargs):
     if not instance.canceled and not instance.user.subscriber_number:
@@ -1,4 +1,5 @@
 import logging
+import traceback
 
 from celery import task
 from django.conf import settings
@@ -59,3 +60,27 @@ def send_welcome_email(user_pk, locale):
             )
             email.attach_alternative(content_html, "text/html")
             email.send()
+
+
+@task
+@skip_in_maintenance_mode
+def clean_up_banned_user(cleanup_pk):
+    """
+    Report and revert the recent revisions of a user banned as a spammer,
+    and send the summary to the spam watch mailing list.
+    """
+    from .cleanup import ban_and_revert_notification, clean_up_spam, finish_cleanup
+    from .models import UserBanCleanup
+
+    cleanup = UserBanCleanup.objects.select_related("user", "moderator").get(
+        pk=cleanup_pk
+    )
+    try:
+        summary = clean_up_spam(cleanup)
+    except Exception:
+        UserBanCleanup.objects.filter(pk=cleanup_pk).update(
+            last_error=traceback.format_exc()
+        )
+        raise
+    finish_cleanup(cleanup, summary)
+    ban_and_revert_notification(cleanup.user, cleanup.moderator, summary)
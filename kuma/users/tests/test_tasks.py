@@ -9,9 +9,15 @@ from waffle.testutils import override_switch
 
 from kuma.core.tests import assert_no_cache_header, call_on_commit_immediately
 from kuma.core.urlresolvers import reverse
-from kuma.users.tasks import send_recovery_email, send_welcome_email
+from kuma.users.models import UserBanCleanup
+from kuma.users.tasks import (
+    clean_up_banned_user,
+    send_recovery_email,
+    send_welcome_email,
+)
+from kuma.wiki.models import Document
 
-from . import create_user, UserTestCase
+from . import create_user, SampleRevisionsMixin, UserTestCase
 
 
 class SendRecoveryEmailTests(TestCase):
@@ -158,3 +164,59 @@ class TestWelcomeEmails(UserTestCase):
         # no increase in number of emails (no 2nd welcome email)
         self.assertEqual(len(mail.outbox), 3)
         self.assertTrue("Confirm" in mail.outbox[2].subject)
+
+
+class CleanUpBannedUserTests(SampleRevisionsMixin, UserTestCase):
+    def test_clean_up(self):
+        # A spam revision on top of the admin's, and two spam documents.
+        spam_revision = self.create_revisions(
+            num=1, document=self.document, creator=self.testuser
+        )[0]
+        new_document_revisions = self.create_revisions(num=2, creator=self.testuser)
+        revision_ids = [spam_revision.id] + [rev.id for rev in new_document_revisions]
+        cleanup = UserBanCleanup.start(self.testuser, self.admin, revision_ids, [])
+        assert cleanup.get_progress() == {
+            "total": 3,
+            "done": 0,
+            "finished": False,
+            "failed": False,
+        }
+
+        clean_up_banned_user(cleanup.pk)
+
+        cleanup.refresh_from_db()
+        assert cleanup.get_progress() == {
+            "total": 3,
+            "done": 3,
+            "finished": True,
+            "failed": False,
+        }
+        self.document.refresh_from_db()
+        assert self.document.current_revision_id not in revision_ids
+        assert self.document.current_revision.content == (
+            self.original_revision.content
+        )
+        assert not Document.objects.filter(
+            pk__in=[rev.document_id for rev in new_document_revisions]
+        ).exists()
+
+        summary = cleanup.get_summary()
+        assert summary["actions_taken"]["revisions_reverted_list"] == [spam_revision]
+        assert summary["actions_taken"]["revisions_deleted_list"] == (
+            new_document_revisions
+        )
+        assert len(mail.outbox) == 1
+        assert self.testuser.username in mail.outbox[0].subject
+
+    def test_clean_up_failure(self):
+        revision = self.create_revisions(num=1, creator=self.testuser)[0]
+        cleanup = UserBanCleanup.start(self.testuser, self.admin, [revision.id], [])
+        with mock.patch(
+            "kuma.users.cleanup.clean_up_spam", side_effect=ValueError("oops")
+        ):
+            with self.assertRaises(ValueError):
+                clean_up_banned_user(cleanup.pk)
+        cleanup.refresh_from_db()
+        assert cleanup.get_progress()["failed"]
+        assert "oops" in cleanup.last_error
+        assert not mail.outbox
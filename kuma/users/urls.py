@@ -66,6 +66,16 @@ users_patterns = [
         views.ban_user_and_cleanup_summary,
         name="users.ban_user_and_cleanup_summary",
     ),
+    re_path(
+        r"^ban_user_and_cleanup/(?P<username>[^/]+)/(?P<cleanup_id>\d+)$",
+        views.ban_user_and_cleanup_job,
+        name="users.ban_user_and_cleanup_job",
+    ),
+    re_path(
+        r"^ban_user_and_cleanup/(?P<username>[^/]+)/(?P<cleanup_id>\d+)/progress$",
+        views.ban_user_and_cleanup_progress,
+        name="users.ban_user_and_cleanup_progress",
+    ),
     re_path(
         r"^account/recover/send",
         views.send_recovery_email,
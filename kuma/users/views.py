@@ -1,5 +1,4 @@
 import json
-from datetime import datetime, timedelta
 from urllib.parse import urlencode, urlparse
 
 import stripe
@@ -13,9 +12,8 @@ from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.models import Group
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.core.validators import validate_email, ValidationError
-from django.db import IntegrityError, transaction
+from django.db import transaction
 from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
@@ -24,7 +22,6 @@ from django.http import (
 )
 from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.encoding import force_text
 from django.utils.http import urlsafe_base64_decode
@@ -50,25 +47,22 @@ from kuma.core.ga_tracking import (
     track_event,
 )
 from kuma.core.utils import urlparams
-from kuma.wiki.forms import RevisionAkismetSubmissionSpamForm
-from kuma.wiki.models import (
-    Document,
-    DocumentDeletionLog,
-    Revision,
-    RevisionAkismetSubmission,
-)
+from kuma.wiki.models import Revision
+from kuma.wiki.scheduling import BULK
 
 # we have to import the SignupForm form here due to allauth's odd form subclassing
 # that requires providing a base form class (see ACCOUNT_SIGNUP_FORM_CLASS)
 from . import signals
+from .cleanup import delete_spam_document, recent_revisions, revert_spam
 from .forms import UserBanForm, UserDeleteForm, UserEditForm, UserRecoveryEmailForm
-from .models import User, UserBan
+from .models import User, UserBan, UserBanCleanup
 from .signup import SignupForm
 from .stripe_utils import (
     cancel_stripe_customer_subscriptions,
     create_stripe_customer_and_subscription_for_user,
     retrieve_and_synchronize_subscription_info,
 )
+from .tasks import clean_up_banned_user
 
 
 @ensure_wiki_domain
@@ -123,10 +117,7 @@ def ban_user_and_cleanup(request, username):
     user_ban = UserBan.objects.filter(user=user, is_active=True)
 
     # Get revisions for the past 3 days for this user
-    date_three_days_ago = datetime.now().date() - timedelta(days=3)
-    revisions = user.created_revisions.prefetch_related("document")
-    revisions = revisions.defer("content", "summary").order_by("-id")
-    revisions = revisions.filter(created__gte=date_three_days_ago)
+    revisions = recent_revisions(user).prefetch_related("document")
     revisions_not_spam = revisions.filter(akismet_submissions=None)
 
     return render(
@@ -147,11 +138,10 @@ def ban_user_and_cleanup(request, username):
 @permission_required("users.add_userban")
 def ban_user_and_cleanup_summary(request, username):
     """
-    A summary page of actions taken when banning a user and reverting revisions
-    This method takes all the revisions from the last three days,
-    sends back the list of revisions that were successfully reverted/deleted
-    and submitted to Akismet, and also a list of
-    revisions where no action was taken (revisions needing follow up).
+    Ban a user and start the cleanup of the revisions from the last three
+    days: the checked revisions are submitted to Akismet and reverted or
+    deleted, by a background job. Once it's done, the summary of the
+    actions taken, and of the revisions needing follow up, is shown.
     """
     user = get_object_or_404(User, username=username)
 
@@ -165,201 +155,69 @@ def ban_user_and_cleanup_summary(request, username):
     else:
         user_ban.update(by=request.user, reason="Spam")
 
-    date_three_days_ago = datetime.now().date() - timedelta(days=3)
-    revisions_from_last_three_days = user.created_revisions.prefetch_related("document")
-    revisions_from_last_three_days = revisions_from_last_three_days.defer(
-        "content", "summary"
-    ).order_by("-id")
-    revisions_from_last_three_days = revisions_from_last_three_days.filter(
-        created__gte=date_three_days_ago
+    revisions = recent_revisions(user)
+    cleanup = UserBanCleanup.start(
+        user,
+        request.user,
+        revisions.filter(id__in=request.POST.getlist("revision-id")).values_list(
+            "id", flat=True
+        ),
+        revisions.filter(
+            id__in=request.POST.getlist("revision-already-spam")
+        ).values_list("id", flat=True),
     )
+    clean_up_banned_user.delay(cleanup.pk)
 
-    """ The "Actions Taken" section """
-    # The revisions to be submitted to Akismet and reverted,
-    # these must be sorted descending so that they are reverted accordingly
-    revisions_to_mark_as_spam_and_revert = revisions_from_last_three_days.filter(
-        id__in=request.POST.getlist("revision-id")
-    ).order_by("-id")
-
-    # 1. Submit revisions to Akismet as spam
-    # 2. If this is the most recent revision for a document:
-    #    Revert revision if it has a previous version OR
-    #    Delete revision if it is a new document
-    submitted_to_akismet = []
-    not_submitted_to_akismet = []
-    revisions_reverted_list = []
-    revisions_not_reverted_list = []
-    revisions_deleted_list = []
-    revisions_not_deleted_list = []
-    latest_is_not_spam = [
-        rev
-        for rev in revision_by_distinct_doc(revisions_to_mark_as_spam_and_revert)
-        if rev.document.current_revision != rev
-    ]
-    previous_good_rev = {}
-
-    for revision in revisions_to_mark_as_spam_and_revert:
-        submission = RevisionAkismetSubmission(sender=request.user, type="spam")
-        akismet_submission_data = {"revision": revision.id}
-
-        data = RevisionAkismetSubmissionSpamForm(
-            data=akismet_submission_data, instance=submission, request=request
-        )
-        # Submit to Akismet or note that validation & sending to Akismet failed
-        if data.is_valid():
-            data.save()
-            # Since we only want to display 1 revision per document, only add to
-            # this list if this is one of the revisions for a distinct document
-            submitted_to_akismet.append(revision)
-        else:
-            not_submitted_to_akismet.append(revision)
-
-        # If there is a current revision and the revision is not in the spam list,
-        # to be reverted, do not revert any revisions
-        try:
-            revision.document.refresh_from_db(fields=["current_revision"])
-        except Document.DoesNotExist:
-            continue  # This document was previously deleted in this loop, continue
-        if (
-            revision.document.current_revision
-            not in revisions_to_mark_as_spam_and_revert
-        ):
-            if revision.document_id not in previous_good_rev:
-                previous_good_rev[
-                    revision.document_id
-                ] = revision.document.current_revision
-
-            continue  # This document has a more current revision, no need to revert
-
-        # Loop through all previous revisions to find the oldest spam
-        # revision on a specific document from this request.
-        while revision.previous in revisions_to_mark_as_spam_and_revert:
-            revision = revision.previous
-        # If this is a new revision on an existing document, revert it
-        if revision.previous:
-            previous_good_rev[revision.document_id] = revision.previous
-
-            reverted = revert_document(
-                request=request, revision_id=revision.previous.id
-            )
-            if reverted:
-                revisions_reverted_list.append(revision)
-            else:
-                # If the revert was unsuccessful, include this in the follow-up list
-                revisions_not_reverted_list.append(revision)
+    # Small cleanups may already be done.
+    cleanup.refresh_from_db()
+    if cleanup.finished:
+        return render_ban_cleanup_summary(request, cleanup)
+    return redirect(cleanup)
 
-        # If this is a new document/translation, delete it
-        else:
-            deleted = delete_document(request=request, document=revision.document)
-            if deleted:
-                revisions_deleted_list.append(revision)
-            else:
-                # If the delete was unsuccessful, include this in the follow-up list
-                revisions_not_deleted_list.append(revision)
 
-    # Find just the latest revision for each document
-    submitted_to_akismet_by_distinct_doc = revision_by_distinct_doc(
-        submitted_to_akismet
-    )
-    not_submitted_to_akismet_by_distinct_doc = revision_by_distinct_doc(
-        not_submitted_to_akismet
-    )
-    revisions_reverted_by_distinct_doc = revision_by_distinct_doc(
-        revisions_reverted_list
-    )
-    revisions_not_reverted_by_distinct_doc = revision_by_distinct_doc(
-        revisions_not_reverted_list
+@ensure_wiki_domain
+@never_cache
+@permission_required("users.add_userban")
+def ban_user_and_cleanup_job(request, username, cleanup_id):
+    """
+    The summary of a ban cleanup, or its progress, polled until it's done.
+    """
+    cleanup = get_object_or_404(
+        UserBanCleanup.objects.select_related("user"),
+        pk=cleanup_id,
+        user__username=username,
     )
-    revisions_deleted_by_distinct_doc = revision_by_distinct_doc(revisions_deleted_list)
-    revisions_not_deleted_by_distinct_doc = revision_by_distinct_doc(
-        revisions_not_deleted_list
+    if cleanup.finished:
+        return render_ban_cleanup_summary(request, cleanup)
+    return render(
+        request,
+        "users/ban_user_and_cleanup_progress.html",
+        {
+            "detail_user": cleanup.user,
+            "cleanup": cleanup,
+            "progress": cleanup.get_progress(),
+        },
     )
 
-    actions_taken = {
-        "revisions_reported_as_spam": submitted_to_akismet_by_distinct_doc,
-        "revisions_reverted_list": revisions_reverted_by_distinct_doc,
-        "revisions_deleted_list": revisions_deleted_by_distinct_doc,
-    }
-
-    """ The "Needs followup" section """
-    # TODO: Phase V: If user made actions while reviewer was banning them
-    new_action_by_user = []
-    skipped_revisions = [
-        rev
-        for rev in revisions_to_mark_as_spam_and_revert
-        if rev.document_id in previous_good_rev
-        and rev.id < previous_good_rev[rev.document_id].id
-    ]
-    skipped_revisions = revision_by_distinct_doc(skipped_revisions)
-
-    needs_follow_up = {
-        "manual_revert": new_action_by_user,
-        "skipped_revisions": skipped_revisions,
-        "not_submitted_to_akismet": not_submitted_to_akismet_by_distinct_doc,
-        "not_reverted_list": revisions_not_reverted_by_distinct_doc,
-        "not_deleted_list": revisions_not_deleted_by_distinct_doc,
-    }
-
-    """ The "No Actions Taken" section """
-    revisions_already_spam = revisions_from_last_three_days.filter(
-        id__in=request.POST.getlist("revision-already-spam")
-    )
-    revisions_already_spam = list(revisions_already_spam)
-    revisions_already_spam_by_distinct_doc = revision_by_distinct_doc(
-        revisions_already_spam
-    )
 
-    identified_as_not_spam = [
-        rev
-        for rev in revisions_from_last_three_days
-        if rev not in revisions_already_spam
-        and rev not in revisions_to_mark_as_spam_and_revert
-    ]
-    identified_as_not_spam_by_distinct_doc = revision_by_distinct_doc(
-        identified_as_not_spam
-    )
+@ensure_wiki_domain
+@never_cache
+@permission_required("users.add_userban")
+def ban_user_and_cleanup_progress(request, username, cleanup_id):
+    """The progress of a ban cleanup, as JSON."""
+    cleanup = get_object_or_404(UserBanCleanup, pk=cleanup_id, user__username=username)
+    return JsonResponse(cleanup.get_progress())
 
-    no_actions_taken = {
-        "latest_revision_is_not_spam": latest_is_not_spam,
-        "revisions_already_identified_as_spam": revisions_already_spam_by_distinct_doc,
-        "revisions_identified_as_not_spam": identified_as_not_spam_by_distinct_doc,
-    }
 
+def render_ban_cleanup_summary(request, cleanup):
     context = {
-        "detail_user": user,
+        "detail_user": cleanup.user,
         "form": UserBanForm(),
-        "actions_taken": actions_taken,
-        "needs_follow_up": needs_follow_up,
-        "no_actions_taken": no_actions_taken,
     }
-
-    # Send an email to the spam watch mailing list.
-    ban_and_revert_notification(user, request.user, context)
-
+    context.update(cleanup.get_summary())
     return render(request, "users/ban_user_and_cleanup_summary.html", context)
 
 
-def revision_by_distinct_doc(list_of_revisions):
-    documents = {}
-    for rev in list_of_revisions:
-        documents.setdefault(rev.document_id, rev)
-        if documents[rev.document_id].id < rev.id:
-            documents[rev.document_id] = rev
-
-    return [documents[doc_id] for doc_id in sorted(documents)]
-
-
-def ban_and_revert_notification(spammer, moderator, info):
-    subject = "[MDN] %s has been banned by %s" % (spammer, moderator)
-    context = {"spammer": spammer, "moderator": moderator}
-    context.update(info)
-    body = render_to_string("wiki/email/spam_ban.ltxt", context)
-
-    send_mail(
-        subject, body, settings.DEFAULT_FROM_EMAIL, [settings.EMAIL_LIST_SPAM_WATCH]
-    )
-
-
 @permission_required("users.add_userban")
 def revert_document(request, revision_id):
     """
@@ -369,16 +227,14 @@ def revert_document(request, revision_id):
         Revision.objects.select_related("document"), pk=revision_id
     )
 
-    comment = "spam"
     document = revision.document
     old_revision_pk = revision.pk
-    try:
-        new_revision = document.revert(revision, request.user, comment)
-        # schedule a rendering of the new revision if it really was saved
-        if new_revision.pk != old_revision_pk:  # pragma: no branch
-            document.schedule_rendering("max-age=0")
-    except IntegrityError:
+    new_revision = revert_spam(revision, request.user)
+    if new_revision is None:
         return False
+    # schedule a rendering of the new revision if it really was saved
+    if new_revision.pk != old_revision_pk:  # pragma: no branch
+        document.schedule_rendering("max-age=0", lane=BULK)
     return True
 
 
@@ -387,17 +243,7 @@ def delete_document(request, document):
     """
     Delete a Document.
     """
-    try:
-        DocumentDeletionLog.objects.create(
-            locale=document.locale,
-            slug=document.slug,
-            user=request.user,
-            reason="Spam",
-        )
-        document.delete()
-    except Exception:
-        return False
-    return True
+    return delete_spam_document(document, request.user)
 
 
 def user_detail(request, username):
@@ -23,6 +23,7 @@ from .forms import RevisionAkismetSubmissionAdminForm
 from .models import (
     Document,
     DocumentDeletionLog,
+    DocumentRenderStats,
     DocumentSpamAttempt,
     DocumentTag,
     EditorToolbar,
@@ -30,6 +31,7 @@ from .models import (
     RevisionAkismetSubmission,
     RevisionIP,
 )
+from .timing import HISTOGRAM_BUCKETS
 
 
 def repair_breadcrumbs(self, request, queryset):
@@ -416,6 +418,58 @@ class DocumentDeletionLogAdmin(DisabledDeletionMixin, admin.ModelAdmin):
     readonly_fields = ["locale", "slug", "user", "timestamp"]
 
 
+@admin.register(DocumentRenderStats)
+class DocumentRenderStatsAdmin(admin.ModelAdmin):
+    """The documents that are slowest to render, with their render phases."""
+
+    list_display = (
+        "document",
+        "total_time",
+        "kumascript_time",
+        "clean_time",
+        "fields_time",
+        "save_time",
+        "max_total_time",
+        "render_count",
+        "is_deferred",
+        "last_rendered_at",
+    )
+    list_filter = ("document__defer_rendering", "document__locale")
+    list_select_related = ("document",)
+    ordering = ("-total_time",)
+    search_fields = ("document__slug", "document__title")
+    fields = list_display[:-1] + ("fast_render_count", "render_histogram")
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def is_deferred(self, obj):
+        return obj.document.defer_rendering
+
+    is_deferred.boolean = True
+    is_deferred.short_description = "Deferred"
+    is_deferred.admin_order_field = "document__defer_rendering"
+
+    def render_histogram(self, obj):
+        """Show the counts of renders by time, for each phase."""
+        histogram = obj.get_histogram()
+        bounds = ["< %ss" % bound for bound in HISTOGRAM_BUCKETS]
+        bounds.append("longer")
+        head = format_html_join("", "<th>{}</th>", ([bound] for bound in bounds))
+        rows = format_html_join(
+            "",
+            "<tr><th>{}</th>{}</tr>",
+            (
+                (name, format_html_join("", "<td>{}</td>", ([n] for n in counts)))
+                for name, counts in histogram.items()
+            ),
+        )
+        return format_html("<table><tr><th></th>{}</tr>{}</table>", head, rows)
+
+    render_histogram.short_description = "Histogram"
+
+
 @admin.register(DocumentTag)
 class DocumentTagAdmin(admin.ModelAdmin):
     list_display = ("name", "slug")
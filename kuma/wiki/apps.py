@@ -1,6 +1,8 @@
 from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
+from kuma.celery import app
+
 
 class WikiConfig(AppConfig):
     """
@@ -15,3 +17,11 @@ class WikiConfig(AppConfig):
         """Configure kuma.wiki after models are loaded."""
         # Register signal handlers
         from . import signal_handlers  # noqa
+
+        # Send the digests of edit notifications every hour and every day
+        from kuma.users.models import User
+
+        from .tasks import send_edit_digests
+
+        app.add_periodic_task(60 * 60, send_edit_digests.s(User.EDIT_DIGEST_HOURLY))
+        app.add_periodic_task(60 * 60 * 24, send_edit_digests.s(User.EDIT_DIGEST_DAILY))
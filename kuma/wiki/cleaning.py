@@ -0,0 +1,193 @@
+"""
+Bulk cleaning of the current revisions of documents.
+
+``Document.clean_current_revision`` cleans one document at a time, and it
+bleaches the content twice (once itself and again in ``Revision.save``),
+and makes a dozen queries for each document. After every change to the
+bleach allowlists, the whole corpus has to be cleaned again, so
+``clean_documents`` does the same for a chunk of documents at once: the
+content is bleached and tidied only once, optionally in a pool of
+processes, and the new revisions, their tags and the documents are written
+with a handful of bulk queries. Revisions stamped as cleaned by the current
+version of ``clean_content`` are skipped, so running it again after an
+interruption only cleans what is left.
+"""
+from copy import copy
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import signals
+
+from .compression import bulk_update
+from .content import clean_content
+from .models import (
+    Document,
+    LocalizationTaggedRevision,
+    ReviewTaggedRevision,
+    Revision,
+)
+from .utils import tidy_content
+
+
+PROGRESS_CACHE_KEY = "kuma:wiki:clean-documents:done"
+PROGRESS_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def clean(content):
+    """
+    Return the cleaned and the tidied content, or None if the content is
+    already clean.
+    """
+    # A module-level function, so that it can be sent to pool processes.
+    # Most documents are already clean, so for those only None is sent back.
+    cleaned_content = clean_content(content)
+    if cleaned_content == content:
+        return None
+    tidied_content, _ = tidy_content(cleaned_content)
+    return cleaned_content, tidied_content or ""
+
+
+def get_tag_ids(through, revision_pks):
+    """Return a dict of the tag IDs of each of the given revisions."""
+    tag_ids = {}
+    items = through.objects.filter(content_object_id__in=revision_pks)
+    for revision_pk, tag_id in items.values_list("content_object_id", "tag_id"):
+        tag_ids.setdefault(revision_pk, []).append(tag_id)
+    return tag_ids
+
+
+def clean_documents(pks, user, pool=None):
+    """
+    Clean the current revisions of the documents with the given primary
+    keys, like ``Document.clean_current_revision``, and return the new
+    revisions, one per document that wasn't already clean.
+
+    pool -- A ``multiprocessing`` pool to clean the content in. Only the
+            content is sent to the pool; the database is only ever queried,
+            and updated in bulk, by the calling process.
+    """
+    docs = list(
+        Document.objects.filter(pk__in=pks, current_revision__isnull=False)
+        .select_related("current_revision", "current_revision__creator")
+        .order_by("pk")
+    )
+    # The revisions cleaned by this version of clean_content since they last
+    # changed are skipped without bleaching them again.
+    docs = [doc for doc in docs if not doc.current_revision.is_content_clean()]
+    contents = [doc.current_revision.content for doc in docs]
+    results = pool.map(clean, contents) if pool else map(clean, contents)
+    changed, clean_revisions = [], []
+    for doc, result in zip(docs, results):
+        if result:
+            changed.append((doc, result))
+        else:
+            doc.current_revision.mark_content_clean()
+            clean_revisions.append(doc.current_revision)
+    bulk_update(clean_revisions, ["content_digest", "cleaner_version"])
+    if not changed:
+        return []
+
+    changed_docs = [doc for doc, _ in changed]
+    prior_pks = [doc.current_revision.pk for doc in changed_docs]
+    review_tag_ids = get_tag_ids(ReviewTaggedRevision, prior_pks)
+    localization_tag_ids = get_tag_ids(LocalizationTaggedRevision, prior_pks)
+
+    now = datetime.now()
+    revisions = []
+    for doc, (cleaned_content, tidied_content) in changed:
+        prior = doc.current_revision
+        # Read before copying, since the copy may share the cache of the
+        # related objects of the prior revision, creator included.
+        prior_created, prior_creator = prior.created, prior.creator
+        rev = copy(prior)
+        rev.pk = None
+        rev.creator = user
+        rev.created = now
+        rev.content = cleaned_content
+        rev.mark_content_clean()
+        rev.tidied_content = tidied_content
+        if not doc.parent_id:
+            # This is updated only if the document is not a translation,
+            # otherwise its original value is preserved.
+            rev.based_on_id = prior.pk
+        rev.comment = "Clean prior revision of {} by {}".format(
+            prior_created, prior_creator
+        )
+        # The current revision sometimes has an old slug that's different
+        # than its document's current slug.
+        rev.slug = doc.slug
+        rev.title = doc.title
+        revisions.append(rev)
+
+    with transaction.atomic():
+        Revision.objects.bulk_create(revisions)
+        # MySQL doesn't return the IDs of rows inserted in bulk, so they are
+        # looked up by the document, creator and creation time.
+        new_pks = dict(
+            Revision.objects.filter(
+                document__in=changed_docs, creator=user, created=now
+            ).values_list("document_id", "pk")
+        )
+        review_tagged, localization_tagged = [], []
+        for doc, rev, prior_pk in zip(changed_docs, revisions, prior_pks):
+            rev.pk = new_pks[doc.pk]
+            rev.document = doc
+            review_tagged.extend(
+                ReviewTaggedRevision(content_object_id=rev.pk, tag_id=tag_id)
+                for tag_id in review_tag_ids.get(prior_pk, ())
+            )
+            localization_tagged.extend(
+                LocalizationTaggedRevision(content_object_id=rev.pk, tag_id=tag_id)
+                for tag_id in localization_tag_ids.get(prior_pk, ())
+            )
+            # Like Revision.make_current, with the modification time that
+            # saving would set. The document's tags are left alone, since the
+            # tags of the revision are copied from the revision that set them.
+            doc.title = rev.title
+            doc.slug = rev.slug
+            doc.html = rev.content
+            doc.render_max_age = rev.render_max_age
+            doc.current_revision = rev
+            doc.is_redirect = bool(doc.get_redirect_url())
+            doc.modified = now
+        ReviewTaggedRevision.objects.bulk_create(review_tagged)
+        LocalizationTaggedRevision.objects.bulk_create(localization_tagged)
+        Document.objects.bulk_update(
+            changed_docs,
+            [
+                "title",
+                "slug",
+                "html",
+                "render_max_age",
+                "current_revision",
+                "is_redirect",
+                "modified",
+            ],
+        )
+        for doc, rev in zip(changed_docs, revisions):
+            doc.populate_attachments()
+            # Bulk writes skip the signals that a save sends, and with them
+            # the invalidation of the document's cached jobs and the
+            # precomputing of the revision's diff.
+            signals.post_save.send(
+                sender=Revision, instance=rev, created=True, raw=False
+            )
+            signals.post_save.send(
+                sender=Document, instance=doc, created=False, raw=False
+            )
+    return revisions
+
+
+def reset_progress():
+    """Start counting the documents cleaned by a new run from zero."""
+    cache.set(PROGRESS_CACHE_KEY, 0, PROGRESS_TIMEOUT)
+
+
+def record_progress(count):
+    """
+    Count the documents of a chunk as cleaned, and return how many have been
+    cleaned so far, by all the chunks of the run.
+    """
+    cache.add(PROGRESS_CACHE_KEY, 0, PROGRESS_TIMEOUT)
+    return cache.incr(PROGRESS_CACHE_KEY, count)
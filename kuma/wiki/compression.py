@@ -0,0 +1,165 @@
+"""
+Optional compressed storage of revision content.
+
+Revisions store their full ``content`` and ``tidied_content``, so pages with
+long histories store many near-identical copies of the same markup. When
+``settings.WIKI_REVISION_COMPRESSION`` is on, these are saved
+zlib-compressed, with a shared dictionary of common MDN markup that helps
+with small revisions, and base64-encoded so they still fit the text columns.
+
+Compressed values start with a marker naming the dictionary they were
+compressed with, and are decompressed when loaded from the database, so
+``Revision.content`` and ``Revision.tidied_content`` always hold plain text
+and nothing else has to know about the storage format. Plain and compressed
+values can be mixed freely, which is what makes the storage optional, and
+existing history can be converted (in both directions) with the
+``compress_revisions`` command.
+
+Bulk updates are made with ``bulk_update``, which compresses the values
+itself rather than relying on ``QuerySet.bulk_update`` to prepare them for
+saving.
+
+Note that database lookups like ``content__contains`` only match revisions
+stored uncompressed.
+"""
+import base64
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+
+# The shared dictionaries, by version. A version must never change once
+# content has been compressed with it; add a new version instead.
+DICTIONARIES = {
+    1: (
+        b'<div class="note"><strong>Note:</strong> </div>'
+        b'<div class="warning"><strong>Warning:</strong> </div>'
+        b'<pre class="brush: js notranslate">'
+        b'<pre class="brush: html notranslate">'
+        b'<pre class="brush: css notranslate">'
+        b'<pre class="syntaxbox notranslate">'
+        b'<h2 id="Syntax">Syntax</h2><h3 id="Parameters">Parameters</h3>'
+        b'<h3 id="Return_value">Return value</h3><h2 id="Examples">Examples</h2>'
+        b'<h2 id="Specifications">Specifications</h2>'
+        b'<h2 id="Browser_compatibility">Browser compatibility</h2>'
+        b'<h2 id="See_also">See also</h2>'
+        b"{{Specifications}}{{Compat}}{{APIRef}}{{CSSRef}}{{HTMLRef}}"
+        b'{{JSRef}}{{jsxref("{{domxref("{{cssxref("{{HTMLElement("'
+        b'{{SeeCompatTable}}{{Deprecated_Header}}<a href="/en-US/docs/Web/'
+        b'<table class="standard-table"><thead><tr><th scope="col">'
+        b'Specification</th><th scope="col">Status</th><th scope="col">'
+        b"Comment</th></tr></thead><tbody><tr><td></td></tr></tbody></table>"
+        b"<dl><dt><code></code></dt><dd></dd></dl><ul><li></li></ul>"
+        b"<p>The <code></code> method </p><p>The <strong></strong> </p>"
+    ),
+}
+CURRENT_VERSION = max(DICTIONARIES)
+
+# "\x00" never appears in wiki markup, which makes the marker unambiguous.
+MARKER = "\x00z"
+MARKER_END = ":"
+
+# Compressing tiny values isn't worth the CPU, nor the base64 overhead.
+MIN_LENGTH = 256
+
+# How far the compress_revisions command got, and in which direction.
+PROGRESS_CACHE_KEY = "kuma:wiki:compress-revisions:last-pk"
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(MARKER)
+
+
+def compress(value, version=CURRENT_VERSION):
+    """
+    Return the compressed form of a text value, or the value itself if
+    compressing wouldn't make it any smaller.
+    """
+    if not value or len(value) < MIN_LENGTH or is_compressed(value):
+        return value
+    compressor = zlib.compressobj(level=9, zdict=DICTIONARIES[version])
+    data = compressor.compress(value.encode("utf-8")) + compressor.flush()
+    compressed = "{}{}{}{}".format(
+        MARKER, version, MARKER_END, base64.b64encode(data).decode("ascii")
+    )
+    return compressed if len(compressed) < len(value) else value
+
+
+def decompress(value):
+    """Return the text of a value, whether it's compressed or not."""
+    if not is_compressed(value):
+        return value
+    version, _, data = value[len(MARKER) :].partition(MARKER_END)
+    decompressor = zlib.decompressobj(zdict=DICTIONARIES[int(version)])
+    text = decompressor.decompress(base64.b64decode(data))
+    return (text + decompressor.flush()).decode("utf-8")
+
+
+class CompressedTextField(models.TextField):
+    """
+    A text field that is saved compressed when
+    ``settings.WIKI_REVISION_COMPRESSION`` is on, and is always plain text
+    in Python.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
+
+    def get_db_prep_save(self, value, connection):
+        # Only saved values are compressed, never the values of lookups.
+        value = super().get_db_prep_save(value, connection)
+        if settings.WIKI_REVISION_COMPRESSION:
+            return compress(value)
+        return value
+
+
+def bulk_update(objs, fields):
+    """
+    Update the fields of the objects with ``QuerySet.bulk_update``, with the
+    values of their compressed text fields compressed first, when
+    ``settings.WIKI_REVISION_COMPRESSION`` is on. The objects hold plain
+    text again afterwards.
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    model = type(objs[0])
+    names = [
+        name
+        for name in fields
+        if isinstance(model._meta.get_field(name), CompressedTextField)
+    ]
+    plain = []
+    if settings.WIKI_REVISION_COMPRESSION:
+        for obj in objs:
+            plain.append({name: getattr(obj, name) for name in names})
+            for name in names:
+                setattr(obj, name, compress(getattr(obj, name)))
+    try:
+        model.objects.bulk_update(objs, fields)
+    finally:
+        for obj, values in zip(objs, plain):
+            for name, value in values.items():
+                setattr(obj, name, value)
+
+
+def get_progress(decompress=False):
+    """
+    Return the ID of the last revision the compress_revisions command
+    converted in the given direction, or 0.
+    """
+    progress = cache.get(PROGRESS_CACHE_KEY)
+    if progress and progress[0] == decompress:
+        return progress[1]
+    return 0
+
+
+def set_progress(pk, decompress=False):
+    # Converting in one direction undoes the progress in the other one.
+    cache.set(PROGRESS_CACHE_KEY, (decompress, pk), None)
+
+
+def clear_progress():
+    cache.delete(PROGRESS_CACHE_KEY)
@@ -599,6 +599,9 @@ LEGACY_MINDTOUCH_NAMESPACES = (
 )
 
 DOCUMENTS_PER_PAGE = 100
+# The lists of documents with at least this many documents, like those of
+# the popular tags, have their count cached.
+DOCUMENTS_COUNT_CACHE_MIN = DOCUMENTS_PER_PAGE * 10
 _ks_urlbits = urlparse(settings.KUMASCRIPT_URL_TEMPLATE)
 KUMASCRIPT_BASE_URL = urlunparse(
     (_ks_urlbits.scheme, _ks_urlbits.netloc, "", "", "", "")
@@ -1,5 +1,7 @@
+import hashlib
 import re
 from collections import defaultdict
+from functools import lru_cache
 from urllib.parse import unquote, urlencode, urlparse, urlsplit
 from xml.sax.saxutils import quoteattr
 
@@ -197,6 +199,40 @@ def clean_content(content):
     return parsed.serialize()
 
 
+# Bump this when clean_content changes in a way that doesn't show in its
+# allowlists, so that all content is cleaned again.
+CLEANER_REVISION = 1
+
+
+def get_cleaner_version():
+    """
+    Return a short stamp of the way clean_content cleans, which changes
+    whenever the bleach allowlists or the allowed iframes do.
+    """
+    return _get_cleaner_version(
+        settings.ALLOW_ALL_IFRAMES, tuple(settings.ALLOWED_IFRAME_PATTERNS)
+    )
+
+
+@lru_cache()
+def _get_cleaner_version(allow_all_iframes, iframe_patterns):
+    allowlists = (
+        CLEANER_REVISION,
+        sorted(ALLOWED_TAGS),
+        sorted((tag, sorted(attrs)) for tag, attrs in ALLOWED_ATTRIBUTES.items()),
+        sorted(ALLOWED_STYLES),
+        sorted(ALLOWED_PROTOCOLS),
+        allow_all_iframes,
+        iframe_patterns,
+    )
+    return hashlib.sha1(repr(allowlists).encode()).hexdigest()[:16]
+
+
+def get_content_digest(content):
+    """Return a digest of the content, to recognize already-clean content."""
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
 @newrelic.agent.function_trace()
 def get_content_sections(src=""):
     """
@@ -0,0 +1,212 @@
+"""
+Diffs between the content of revisions.
+
+Diffing two revisions means tidying both (see ``Revision.get_tidied_content``)
+and comparing them line by line, which is expensive enough that the history
+feeds, the compare view and the edit notifications would do it over and over
+for the same pairs of revisions. Since revisions never change, the diff of a
+pair is computed once, cached, and precomputed in the background when a new
+revision is saved.
+"""
+import difflib
+
+from constance import config
+from django.core.cache import cache
+from django.utils.translation import gettext
+
+from .constants import DIFF_WRAP_COLUMN
+
+
+# Revisions never change, so their diffs can be cached for a long time.
+DIFF_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+class TrimmedHtmlDiff(difflib.HtmlDiff):
+    """
+    An ``HtmlDiff`` that leaves the lines both sides start and end with out
+    of the comparison (which is quadratic in places), except for the few
+    shown as context around the changes. The line numbers in the table are
+    those of the complete content.
+    """
+
+    _line_offset = 0
+
+    def make_table(
+        self, fromlines, tolines, fromdesc="", todesc="", context=False, numlines=5
+    ):
+        fromlines = list(fromlines)
+        tolines = list(tolines)
+        if context:
+            limit = min(len(fromlines), len(tolines))
+            prefix = 0
+            while prefix < limit and fromlines[prefix] == tolines[prefix]:
+                prefix += 1
+            suffix = 0
+            while (
+                suffix < limit - prefix
+                and fromlines[-1 - suffix] == tolines[-1 - suffix]
+            ):
+                suffix += 1
+            # Keep one more line than the context, so that the table still
+            # starts with a separator when lines were skipped.
+            start = max(prefix - numlines - 1, 0)
+            end = max(suffix - numlines - 1, 0)
+            fromlines = fromlines[start : len(fromlines) - end]
+            tolines = tolines[start : len(tolines) - end]
+            self._line_offset = start
+        try:
+            return super().make_table(
+                fromlines, tolines, fromdesc, todesc, context, numlines
+            )
+        finally:
+            self._line_offset = 0
+
+    def _format_line(self, side, flag, linenum, text):
+        if isinstance(linenum, int):
+            linenum += self._line_offset
+        return super()._format_line(side, flag, linenum, text)
+
+
+# The diff tables are cached for every language, with these markers for
+# their translated text, which is put in when they're used. The markers are
+# comments, which can't come from the content, since the diff escapes it.
+FROM_HEADER_MARKER = "<!--kuma-diff-from-->"
+TO_HEADER_MARKER = "<!--kuma-diff-to-->"
+ERROR_MARKER = "<!--kuma-diff-error-->"
+
+
+def make_untranslated_diff_table(content_from, content_to):
+    """
+    Return the HTML table of the differences between two contents, with
+    markers for its translated text (see translate_diff_table).
+    """
+    html_diff = TrimmedHtmlDiff(wrapcolumn=DIFF_WRAP_COLUMN)
+    try:
+        return html_diff.make_table(
+            content_from.splitlines(),
+            content_to.splitlines(),
+            FROM_HEADER_MARKER,
+            TO_HEADER_MARKER,
+            context=True,
+            numlines=config.DIFF_CONTEXT_LINES,
+        )
+    except RuntimeError:
+        # some diffs hit a max recursion error
+        return '<div class="warning"><p>%s</p></div>' % ERROR_MARKER
+
+
+def translate_diff_table(table, prev_id, curr_id):
+    """Put the text in the current language in an untranslated diff table."""
+    return (
+        table.replace(FROM_HEADER_MARKER, gettext("Revision %s") % prev_id)
+        .replace(TO_HEADER_MARKER, gettext("Revision %s") % curr_id)
+        .replace(ERROR_MARKER, gettext("There was an error generating the content."))
+    )
+
+
+def make_diff_table(content_from, content_to, prev_id, curr_id):
+    """Return the HTML table of the differences between two contents."""
+    return translate_diff_table(
+        make_untranslated_diff_table(content_from, content_to), prev_id, curr_id
+    )
+
+
+def make_unified_diff(content_from, content_to, fromfile, tofile):
+    return "\n".join(
+        difflib.unified_diff(
+            content_from.splitlines(),
+            content_to.splitlines(),
+            fromfile=fromfile,
+            tofile=tofile,
+        )
+    )
+
+
+def get_cache_key(from_revision, to_revision, context_lines=None):
+    # The rendered table depends on the context lines, which can change, but
+    # not on the language, since it's cached untranslated.
+    if context_lines is None:
+        context_lines = config.DIFF_CONTEXT_LINES
+    return "kuma:wiki:revision-diff:untranslated:{}:{}:{}".format(
+        from_revision.id, to_revision.id, context_lines
+    )
+
+
+def get_revision_diff(from_revision, to_revision, allow_none=False):
+    """
+    Return the diff of the tidied content of two revisions, as a dict with
+    whether the content ``changed``, the HTML ``table`` of the differences
+    and the ``unified`` diff.
+
+    allow_none -- If the content of either revision still needs tidying,
+                  return None instead of tidying it in-process.
+    """
+    cache_key = get_cache_key(from_revision, to_revision)
+    diff = cache.get(cache_key)
+    if diff is not None:
+        return translate_diff(diff, from_revision, to_revision)
+    return make_revision_diff(from_revision, to_revision, cache_key, allow_none)
+
+
+def translate_diff(diff, from_revision, to_revision):
+    """Return a cached diff, with its table in the current language."""
+    return dict(
+        diff,
+        table=translate_diff_table(diff["table"], from_revision.id, to_revision.id),
+    )
+
+
+def make_revision_diff(from_revision, to_revision, cache_key, allow_none=False):
+    """Compute the diff of two revisions, and cache it with this key."""
+    content_from = from_revision.get_tidied_content(allow_none=allow_none)
+    content_to = to_revision.get_tidied_content(allow_none=allow_none)
+    if content_from is None or content_to is None:
+        return None
+
+    diff = {
+        "changed": content_from != content_to,
+        "table": make_untranslated_diff_table(content_from, content_to),
+        "unified": make_unified_diff(
+            content_from,
+            content_to,
+            "[%s] #%s" % (from_revision.document.locale, from_revision.id),
+            "[%s] #%s" % (to_revision.document.locale, to_revision.id),
+        ),
+    }
+    cache.set(cache_key, diff, DIFF_CACHE_TIMEOUT)
+    return translate_diff(diff, from_revision, to_revision)
+
+
+def get_revision_diffs(pairs, allow_none=False):
+    """
+    Return the diffs of (from_revision, to_revision) pairs, by the ID of the
+    to_revision, like get_revision_diff but with the cached ones fetched
+    from the cache at once.
+    """
+    context_lines = config.DIFF_CONTEXT_LINES
+    cache_keys = {
+        get_cache_key(*pair, context_lines=context_lines): pair for pair in pairs
+    }
+    cached = cache.get_many(list(cache_keys))
+    diffs = {}
+    for cache_key, (from_revision, to_revision) in cache_keys.items():
+        if cache_key in cached:
+            diffs[to_revision.id] = translate_diff(
+                cached[cache_key], from_revision, to_revision
+            )
+        else:
+            diffs[to_revision.id] = make_revision_diff(
+                from_revision, to_revision, cache_key, allow_none=allow_none
+            )
+    return diffs
+
+
+def precompute_revision_diff(revision):
+    """
+    Compute and cache the diff between a revision and the previous one,
+    which is the diff shown in the feeds and the edit notifications.
+    """
+    previous = revision.get_previous()
+    if previous is None:
+        return None
+    return get_revision_diff(previous, revision)
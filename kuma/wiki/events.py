@@ -9,33 +9,40 @@ from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
 from tidings.events import EventUnion, InstanceEvent
 
-from kuma.core.email_utils import emails_with_users_and_watches
+from kuma.core.email_utils import (
+    emails_with_shared_body,
+    render_email,
+    safe_translation,
+)
 from kuma.core.templatetags.jinja_helpers import add_utm
 from kuma.core.urlresolvers import reverse
 
-from .models import Document
+from .models import Document, EditDigestEntry
 from .templatetags.jinja_helpers import get_compare_url, revisions_unified_diff
 
 
 log = logging.getLogger("kuma.wiki.events")
 
 
-def notification_context(revision):
+def notification_context(revision, include_diff=True):
     """
     Return a dict that fills in the blanks in notification templates.
+
+    The diff is left out of the context when ``include_diff`` is false, like
+    for the digests, which only link to it.
     """
     document = revision.document
     # Don't use `previous` since it is cached. (see bug 1239141)
     from_revision = revision.get_previous()
     to_revision = revision
-    diff = revisions_unified_diff(from_revision, to_revision)
 
     context = {
         "document_title": document.title,
         "creator": revision.creator,
-        "diff": diff,
         "locale": document.locale,
     }
+    if include_diff:
+        context["diff"] = revisions_unified_diff(from_revision, to_revision)
 
     if from_revision:
         compare_url = get_compare_url(document, from_revision.id, to_revision.id)
@@ -89,6 +96,7 @@ class EditDocumentEvent(InstanceEvent):
         log.debug(
             "Sending edited notification email for document (id=%s)" % document.id
         )
+        users_and_watches = self._queue_digests(users_and_watches)
         if document.revisions.only("id").first().id == revision.id:
             subject = _(
                 '[MDN][%(locale)s][New] Page "%(document_title)s"'
@@ -98,18 +106,48 @@ class EditDocumentEvent(InstanceEvent):
             subject = _(
                 '[MDN][%(locale)s] Page "%(document_title)s"' " changed by %(creator)s"
             )
+        # The context, and its diff, are computed once for all the watchers,
+        # and the body of the email is rendered once for each of their locales.
         context = notification_context(revision)
 
-        return emails_with_users_and_watches(
+        return emails_with_shared_body(
             subject=subject,
-            text_template="wiki/email/edited.ltxt",
-            html_template=None,
+            body_template="wiki/email/edited.ltxt",
+            footer_template="wiki/email/edited_footer.ltxt",
             context_vars=context,
-            users_and_watches=users_and_watches,
+            users_and_watches=self._with_watched_documents(users_and_watches),
             default_locale=document.locale,
             headers=extra_headers(revision.creator, document),
         )
 
+    def _queue_digests(self, users_and_watches):
+        """
+        Queue the edit for the digests of the watchers who asked for one,
+        and return the other watchers, who are sent an email right away.
+        """
+        queued, others = [], []
+        for user, watches in users_and_watches:
+            if getattr(user, "edit_digest", ""):
+                queued.append(EditDigestEntry(user=user, revision=self.revision))
+            else:
+                others.append((user, watches))
+        # A watcher of the document and of its tree only gets the edit once.
+        EditDigestEntry.objects.bulk_create(queued, ignore_conflicts=True)
+        return others
+
+    def _with_watched_documents(self, users_and_watches):
+        """
+        Yield the users and their watches, with the watched documents already
+        set on the watches, instead of fetching them again for each watch.
+        """
+        document = self.revision.document
+        documents = {doc.pk: doc for doc in [document, *document.get_topic_parents()]}
+        for user, watches in users_and_watches:
+            for watch in watches:
+                if watch is not None and watch.object_id in documents:
+                    watch.content_object = documents[watch.object_id]
+            yield user, watches
+
     def fire(self, **kwargs):
         parent_events = [
             EditDocumentInTreeEvent(doc)
@@ -156,6 +194,29 @@ def first_edit_email(revision):
     return email
 
 
+def edit_digest_email(user, edits):
+    """
+    Create a digest email of edits to the documents a user watches.
+
+    edits -- The notification contexts of the edited revisions, which are
+             shared by the digests of all their watchers.
+    """
+
+    @safe_translation
+    def _make_mail(locale):
+        body = render_email(
+            "wiki/email/edit_digest.ltxt", {"edits": edits, "recipient": user}
+        )
+        return EmailMessage(
+            str(_("[MDN] Digest of edits to the pages you watch")),
+            body,
+            settings.TIDINGS_FROM_ADDRESS,
+            to=[user.email],
+        )
+
+    return _make_mail(user.locale or settings.WIKI_DEFAULT_LANGUAGE)
+
+
 def spam_attempt_email(spam_attempt):
     """
     Create a notification email for a spam attempt.
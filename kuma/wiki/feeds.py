@@ -2,38 +2,105 @@
 
 
 import datetime
+import hashlib
 import json
+from calendar import timegm
+from io import StringIO
 
 from django.conf import settings
-from django.contrib.syndication.views import Feed
-from django.db.models import F
+from django.contrib.sites.shortcuts import get_current_site
+from django.contrib.syndication.views import add_domain, Feed
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F, Max, OuterRef, prefetch_related_objects, Subquery
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template import loader, TemplateDoesNotExist
 from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed, SyndicationFeed
 from django.utils.html import escape
-from django.utils.timezone import get_current_timezone, is_naive
+from django.utils.http import http_date
+from django.utils.timezone import (
+    get_current_timezone,
+    get_default_timezone,
+    is_naive,
+    make_aware,
+)
 from django.utils.translation import gettext as _
+from django.utils.xmlutils import SimplerXMLGenerator
 
 from kuma.core.templatetags.jinja_helpers import add_utm
 from kuma.core.urlresolvers import reverse
+from kuma.core.utils import get_version_token
 from kuma.core.validators import valid_jsonp_callback_value
 from kuma.users.templatetags.jinja_helpers import get_avatar_url
 
+from .diff import get_revision_diffs
 from .models import Document, Revision
-from .templatetags.jinja_helpers import (
-    colorize_diff,
-    diff_table,
-    get_compare_url,
-    tag_diff_table,
-)
+from .templatetags.jinja_helpers import colorize_diff, get_compare_url, tag_diff_table
 
 
 MAX_FEED_ITEMS = getattr(settings, "MAX_FEED_ITEMS", 500)
 DEFAULT_FEED_ITEMS = 50
+# Feeds with more items are streamed, an item at a time, and the revisions
+# of the revisions feed are fetched this many at a time.
+FEED_CHUNK_SIZE = DEFAULT_FEED_ITEMS
+
+# The rendered feeds are cached by URL, until the feed version changes,
+# which happens when a revision is saved or deleted (see
+# kuma.wiki.signal_handlers).
+FEED_CACHE_KEY = "kuma:wiki:feed:{version}:{digest}"
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_VERSION_CACHE_KEY = "kuma:wiki:feed-version"
+# Streamed feeds are only cached if they're no larger than memcached's
+# default limit for an item.
+FEED_CACHE_MAX_SIZE = 1024 * 1024
+
+
+def cache_streamed_content(cache_key, streaming_content, headers, timeout):
+    """
+    Yield the content of a streamed response, and cache it as a response,
+    with the given headers, once it's complete, unless it's larger than
+    FEED_CACHE_MAX_SIZE.
+    """
+    chunks = []
+    size = 0
+    for chunk in streaming_content:
+        if chunks is not None:
+            size += len(chunk)
+            if size > FEED_CACHE_MAX_SIZE:
+                chunks = None
+            else:
+                chunks.append(chunk)
+        yield chunk
+    if chunks is not None:
+        cached_response = HttpResponse(b"".join(chunks))
+        for header, value in headers:
+            cached_response[header] = value
+        cache.set(cache_key, cached_response, timeout)
+
+
+class SizedIterator:
+    """
+    An iterator with a known length, for the items of a feed that are
+    fetched, or rendered, as the feed is written.
+    """
+
+    def __init__(self, iterator, length):
+        self.iterator = iterator
+        self.length = length
+
+    def __iter__(self):
+        return iter(self.iterator)
+
+    def __len__(self):
+        return self.length
 
 
 class DocumentsFeed(Feed):
     title = _("MDN documents")
     subtitle = _("Documents authored by MDN users")
     link = _("/")
+    # None for feeds that don't change with the revisions of documents
+    cache_timeout = FEED_CACHE_TIMEOUT
 
     def __call__(self, request, *args, **kwargs):
         self.request = request
@@ -41,7 +108,157 @@ class DocumentsFeed(Feed):
             self.locale = None
         else:
             self.locale = request.LANGUAGE_CODE
-        return super(DocumentsFeed, self).__call__(request, *args, **kwargs)
+        if not self.cache_timeout or request.method not in ("GET", "HEAD"):
+            return self.get_response(request, *args, **kwargs)
+
+        # The URL has the locale, the format, and the page, and the host,
+        # since the links of the items are absolute.
+        cache_key = FEED_CACHE_KEY.format(
+            version=get_version_token(FEED_VERSION_CACHE_KEY),
+            digest=hashlib.md5(request.build_absolute_uri().encode()).hexdigest(),
+        )
+        response = cache.get(cache_key)
+        if response is None:
+            response = self.get_response(request, *args, **kwargs)
+            if response.streaming:
+                # With the headers as the feed set them, before any middleware
+                response.streaming_content = cache_streamed_content(
+                    cache_key,
+                    response.streaming_content,
+                    list(response.items()),
+                    self.cache_timeout,
+                )
+            else:
+                cache.set(cache_key, response, self.cache_timeout)
+        return response
+
+    def get_response(self, request, *args, **kwargs):
+        """
+        Return the response with the feed, which is streamed, as it's
+        written, when it has more than FEED_CHUNK_SIZE items.
+        """
+        try:
+            obj = self.get_object(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            raise Http404("Feed object does not exist.")
+        feedgen = self.get_feed(obj, request)
+        chunks = feedgen.stream("utf-8")
+        if feedgen.num_items() > FEED_CHUNK_SIZE:
+            response = StreamingHttpResponse(chunks, content_type=feedgen.content_type)
+        else:
+            response = HttpResponse("".join(chunks), content_type=feedgen.content_type)
+        response["Last-Modified"] = http_date(
+            timegm(feedgen.latest_post_date().utctimetuple())
+        )
+        return response
+
+    def get_feed(self, obj, request):
+        """
+        Return the feed generator, like Feed.get_feed, but with items that
+        are only turned into the feed's items, with their descriptions, as
+        they're written, so that a feed is never rendered all at once.
+        """
+        current_site = get_current_site(request)
+
+        link = self._get_dynamic_attr("link", obj)
+        link = add_domain(current_site.domain, link, request.is_secure())
+
+        items = self._get_dynamic_attr("items", obj)
+        feed = self.feed_type(
+            title=self._get_dynamic_attr("title", obj),
+            subtitle=self._get_dynamic_attr("subtitle", obj),
+            link=link,
+            description=self._get_dynamic_attr("description", obj),
+            language=settings.LANGUAGE_CODE,
+            feed_url=add_domain(
+                current_site.domain,
+                self._get_dynamic_attr("feed_url", obj) or request.path,
+                request.is_secure(),
+            ),
+            author_name=self._get_dynamic_attr("author_name", obj),
+            author_link=self._get_dynamic_attr("author_link", obj),
+            author_email=self._get_dynamic_attr("author_email", obj),
+            categories=self._get_dynamic_attr("categories", obj),
+            feed_copyright=self._get_dynamic_attr("feed_copyright", obj),
+            feed_guid=self._get_dynamic_attr("feed_guid", obj),
+            ttl=self._get_dynamic_attr("ttl", obj),
+            latest_post_date=self.get_latest_post_date(items),
+            **self.feed_extra_kwargs(obj),
+        )
+
+        description_tmp = None
+        if self.description_template is not None:
+            try:
+                description_tmp = loader.get_template(self.description_template)
+            except TemplateDoesNotExist:
+                pass
+
+        def get_item(item):
+            context = self.get_context_data(
+                item=item, site=current_site, obj=obj, request=request
+            )
+            if description_tmp is not None:
+                description = description_tmp.render(context, request)
+            else:
+                description = self._get_dynamic_attr("item_description", item)
+            link = add_domain(
+                current_site.domain,
+                self._get_dynamic_attr("item_link", item),
+                request.is_secure(),
+            )
+            author_name = self._get_dynamic_attr("item_author_name", item)
+            if author_name is not None:
+                author_email = self._get_dynamic_attr("item_author_email", item)
+                author_link = self._get_dynamic_attr("item_author_link", item)
+            else:
+                author_email = author_link = None
+            # An item of a feed generator of its own, to have it add the item
+            # as usual.
+            scratch = SyndicationFeed(title="", link="", description="")
+            scratch.add_item(
+                title=self._get_dynamic_attr("item_title", item),
+                link=link,
+                description=description,
+                unique_id=self._get_dynamic_attr("item_guid", item, link),
+                unique_id_is_permalink=self._get_dynamic_attr(
+                    "item_guid_is_permalink", item
+                ),
+                enclosures=self._get_dynamic_attr("item_enclosures", item),
+                pubdate=self.get_aware_date("item_pubdate", item),
+                updateddate=self.get_aware_date("item_updateddate", item),
+                author_name=author_name,
+                author_email=author_email,
+                author_link=author_link,
+                categories=self._get_dynamic_attr("item_categories", item),
+                item_copyright=self._get_dynamic_attr("item_copyright", item),
+                **self.item_extra_kwargs(item),
+            )
+            return scratch.items[0]
+
+        feed.items = SizedIterator(map(get_item, items), len(items))
+        return feed
+
+    def get_aware_date(self, attname, item):
+        date = self._get_dynamic_attr(attname, item)
+        if date and is_naive(date):
+            date = make_aware(date, get_default_timezone())
+        return date
+
+    def get_latest_post_date(self, items):
+        """
+        Return the latest date of the items, for the feed generator, which
+        only gets the items as it writes them.
+        """
+        dates = [
+            date
+            for item in items
+            for date in (
+                self.get_aware_date("item_pubdate", item),
+                self.get_aware_date("item_updateddate", item),
+            )
+            if date
+        ]
+        return max(dates, default=None)
 
     def feed_extra_kwargs(self, obj):
         return {"request": self.request}
@@ -53,9 +270,9 @@ class DocumentsFeed(Feed):
         if format == "json":
             self.feed_type = DocumentJSONFeedGenerator
         elif format == "rss":
-            self.feed_type = Rss201rev2Feed
+            self.feed_type = StreamingRssFeedGenerator
         else:
-            self.feed_type = Atom1Feed
+            self.feed_type = StreamingAtomFeedGenerator
 
     def item_pubdate(self, document):
         """
@@ -115,7 +332,71 @@ class DocumentsFeed(Feed):
         return document.tags.all()
 
 
-class DocumentJSONFeedGenerator(SyndicationFeed):
+def drain(buffer):
+    """Return what was written to a buffer, and empty it."""
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+class StreamingFeedMixin:
+    """
+    For feed generators that write their feed an item at a time, with
+    stream(), and get the latest date of their items from the feed, since
+    the items are only rendered as they're written.
+    """
+
+    def latest_post_date(self):
+        latest_post_date = self.feed.get("latest_post_date")
+        if latest_post_date is None:
+            return super(StreamingFeedMixin, self).latest_post_date()
+        return latest_post_date
+
+    def write(self, outfile, encoding):
+        for chunk in self.stream(encoding):
+            outfile.write(chunk)
+
+    def stream(self, encoding):
+        """Yield the feed, in chunks of an item."""
+        raise NotImplementedError
+
+
+class StreamingRssFeedGenerator(StreamingFeedMixin, Rss201rev2Feed):
+    def stream(self, encoding):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding)
+        handler.startDocument()
+        handler.startElement("rss", self.rss_attributes())
+        handler.startElement("channel", self.root_attributes())
+        self.add_root_elements(handler)
+        for item in self.items:
+            handler.startElement("item", self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement("item")
+            yield drain(buffer)
+        self.endChannelElement(handler)
+        handler.endElement("rss")
+        yield drain(buffer)
+
+
+class StreamingAtomFeedGenerator(StreamingFeedMixin, Atom1Feed):
+    def stream(self, encoding):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding)
+        handler.startDocument()
+        handler.startElement("feed", self.root_attributes())
+        self.add_root_elements(handler)
+        for item in self.items:
+            handler.startElement("entry", self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement("entry")
+            yield drain(buffer)
+        handler.endElement("feed")
+        yield drain(buffer)
+
+
+class DocumentJSONFeedGenerator(StreamingFeedMixin, SyndicationFeed):
     """JSON feed generator for Documents
     TODO: Someday maybe make this into a JSON Activity Stream?"""
 
@@ -125,7 +406,7 @@ class DocumentJSONFeedGenerator(SyndicationFeed):
         if isinstance(obj, datetime.datetime):
             return obj.isoformat()
 
-    def write(self, outfile, encoding):
+    def stream(self, encoding):
         request = self.feed["request"]
 
         # Check for a callback param, validate it before use
@@ -141,7 +422,11 @@ class DocumentJSONFeedGenerator(SyndicationFeed):
                 user_to_avatar_map[user.id] = get_avatar_url(user)
             return user_to_avatar_map[user.id]
 
-        items_out = []
+        if callback:
+            yield "%s(" % callback
+        # The items are written one at a time, as json.dumps would write
+        # the list of them.
+        separator = "["
         for item in self.items:
             document = item["obj"]
 
@@ -181,15 +466,12 @@ class DocumentJSONFeedGenerator(SyndicationFeed):
             if categories:
                 item_out["categories"] = categories
 
-            items_out.append(item_out)
+            yield separator + json.dumps(item_out, default=self._encode_complex)
+            separator = ", "
 
-        data = items_out
-
-        if callback:
-            outfile.write("%s(" % callback)
-        outfile.write(json.dumps(data, default=self._encode_complex))
+        yield "[]" if separator == "[" else "]"
         if callback:
-            outfile.write(")")
+            yield ")"
 
 
 class DocumentsRecentFeed(DocumentsFeed):
@@ -223,7 +505,8 @@ class DocumentsRecentFeed(DocumentsFeed):
         return (
             Document.objects.filter(pk__in=list(item_pks))
             .defer("html")
-            .prefetch_related("current_revision", "current_revision__creator", "tags")
+            .select_related("current_revision__creator")
+            .prefetch_related("tags")
         )
 
 
@@ -260,7 +543,8 @@ class DocumentsReviewFeed(DocumentsRecentFeed):
         return (
             Document.objects.filter(pk__in=list(item_pks))
             .defer("html")
-            .prefetch_related("current_revision", "current_revision__creator", "tags")
+            .select_related("current_revision__creator")
+            .prefetch_related("tags")
         )
 
 
@@ -279,7 +563,8 @@ class DocumentsUpdatedTranslationParentFeed(DocumentsFeed):
 
     def items(self):
         return (
-            Document.objects.prefetch_related("parent")
+            Document.objects.select_related("parent", "current_revision__creator")
+            .prefetch_related("tags")
             .filter(locale=self.locale, parent__isnull=False)
             .filter(modified__lt=F("parent__modified"))
             .order_by("-parent__current_revision__id")[:MAX_FEED_ITEMS]
@@ -314,10 +599,23 @@ class RevisionsFeed(DocumentsFeed):
     title = _("MDN recent revisions")
     subtitle = _("Recent revisions to MDN documents")
 
+    def get_response(self, request, *args, **kwargs):
+        self.next_before = None
+        response = super(RevisionsFeed, self).get_response(request, *args, **kwargs)
+        if self.next_before:
+            # The next page, by keyset pagination
+            query = request.GET.copy()
+            query.pop("page", None)
+            query["before"] = self.next_before
+            next_url = request.build_absolute_uri("?" + query.urlencode())
+            response["Link"] = '<%s>; rel="next"' % next_url
+        return response
+
     def items(self):
         items = Revision.objects
         limit = int(self.request.GET.get("limit", DEFAULT_FEED_ITEMS))
         page = int(self.request.GET.get("page", 1))
+        before = self.request.GET.get("before")
 
         start = (page - 1) * limit
         finish = start + limit
@@ -328,12 +626,84 @@ class RevisionsFeed(DocumentsFeed):
         if self.locale:
             items = items.filter(document__locale=self.locale)
 
+        if before is not None:
+            # The revisions before an ID, which stays as fast for the old
+            # revisions as for the recent ones, unlike the offset of a page.
+            items = items.filter(pk__lt=int(before))
+            start, finish = 0, limit
+
         # Temporarily storing the selected revision PKs in a list
         # to speed up retrieval (max MAX_FEED_ITEMS size)
-        item_pks = items.order_by("-id").values_list("pk", flat=True)[start:finish]
-        return Revision.objects.filter(pk__in=list(item_pks)).prefetch_related(
-            "creator", "document"
+        item_pks = list(
+            items.order_by("-id").values_list("pk", flat=True)[start:finish]
         )
+        if item_pks and len(item_pks) == finish - start:
+            self.next_before = item_pks[-1]
+        self.item_pks = item_pks
+        return SizedIterator(self.iter_revisions(sorted(item_pks)), len(item_pks))
+
+    def iter_revisions(self, item_pks):
+        """
+        Fetch the revisions, with what their descriptions need, in chunks,
+        as the feed is written, so that only a chunk of them is in memory.
+        """
+        # What Revision.get_previous would find for each revision
+        previous_pks = (
+            Revision.objects.filter(
+                document=OuterRef("document"),
+                is_approved=True,
+                created__lt=OuterRef("created"),
+            )
+            .order_by("-created")
+            .values("pk")[:1]
+        )
+        revisions = (
+            Revision.objects.select_related("creator", "document")
+            .annotate(previous_pk=Subquery(previous_pks))
+            .order_by("id")
+        )
+        for start in range(0, len(item_pks), FEED_CHUNK_SIZE):
+            chunk = list(
+                revisions.filter(pk__in=item_pks[start : start + FEED_CHUNK_SIZE])
+            )
+            self.prefetch_descriptions(chunk)
+            yield from chunk
+
+    def get_latest_post_date(self, items):
+        latest_created = Revision.objects.filter(pk__in=self.item_pks).aggregate(
+            latest_created=Max("created")
+        )["latest_created"]
+        if latest_created and is_naive(latest_created):
+            latest_created = make_aware(latest_created, get_default_timezone())
+        return latest_created
+
+    def prefetch_descriptions(self, revisions):
+        """
+        Get what the descriptions of the revisions need for all of them at
+        once: their previous revisions, the review tags of both, and the
+        diffs between them.
+        """
+        previous_by_pk = Revision.objects.select_related("document").in_bulk(
+            {revision.previous_pk or revision.based_on_id for revision in revisions}
+            - {None}
+        )
+        for revision in revisions:
+            revision.previous = previous_by_pk.get(
+                revision.previous_pk or revision.based_on_id
+            )
+        prefetch_related_objects(
+            revisions + list(previous_by_pk.values()), "review_tags"
+        )
+        diffs = get_revision_diffs(
+            [
+                (revision.previous, revision)
+                for revision in revisions
+                if revision.previous
+            ],
+            allow_none=not settings.WIKI_TIDY_REVISIONS_IN_REQUEST,
+        )
+        for revision in revisions:
+            revision.feed_diff = diffs.get(revision.id)
 
     def item_title(self, item):
         return "%s (%s)" % (item.document.slug, item.document.locale)
@@ -358,8 +728,9 @@ class RevisionsFeed(DocumentsFeed):
         content_diff = ""
 
         if previous:
-            prev_review_tags = previous.review_tags.names()
-            curr_review_tags = item.review_tags.names()
+            # Prefetched, so not review_tags.names()
+            prev_review_tags = [tag.name for tag in previous.review_tags.all()]
+            curr_review_tags = [tag.name for tag in item.review_tags.all()]
             if set(prev_review_tags) != set(curr_review_tags):
                 table = tag_diff_table(
                     ",".join(prev_review_tags),
@@ -375,18 +746,11 @@ class RevisionsFeed(DocumentsFeed):
                 tag_diff = "<h3>Tag changes:</h3>%s" % table
                 tag_diff = colorize_diff(tag_diff)
 
-        previous_content = ""
-        previous_id = "N/A"
         content_diff = "<h3>Content changes:</h3>"
         if previous:
-            previous_content = previous.get_tidied_content()
-            current_content = item.get_tidied_content()
-            previous_id = previous.id
-            if previous_content != current_content:
-                content_diff = content_diff + diff_table(
-                    previous_content, current_content, previous_id, item.id
-                )
-                content_diff = colorize_diff(content_diff)
+            diff = item.feed_diff
+            if diff and diff["changed"]:
+                content_diff = colorize_diff(content_diff + diff["table"])
         else:
             content_diff = content_diff + escape(item.content)
 
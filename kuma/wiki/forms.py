@@ -17,6 +17,7 @@ from django.utils.translation import gettext_lazy as _
 from taggit.utils import parse_tags
 
 import kuma.wiki.content
+from kuma.core.managers import set_tags
 from kuma.core.urlresolvers import reverse
 from kuma.spam.akismet import AkismetError
 from kuma.spam.forms import AkismetCheckFormMixin, AkismetSubmissionFormMixin
@@ -853,7 +854,7 @@ class RevisionForm(AkismetCheckFormMixin, forms.ModelForm):
             new_rev.creator = self.request.user
             new_rev.toc_depth = old_rev.toc_depth
             new_rev.save()
-            new_rev.review_tags.set(*list(old_rev.review_tags.names()))
+            set_tags(new_rev.review_tags, *list(old_rev.review_tags.names()))
 
         else:
             new_rev = super(RevisionForm, self).save(**kwargs)
@@ -861,8 +862,8 @@ class RevisionForm(AkismetCheckFormMixin, forms.ModelForm):
             new_rev.creator = self.request.user
             new_rev.toc_depth = self.cleaned_data["toc_depth"]
             new_rev.save()
-            new_rev.review_tags.set(*self.cleaned_data["review_tags"])
-            new_rev.localization_tags.set(*self.cleaned_data["localization_tags"])
+            set_tags(new_rev.review_tags, *self.cleaned_data["review_tags"])
+            set_tags(new_rev.localization_tags, *self.cleaned_data["localization_tags"])
 
             # when enabled store the user's IP address
             RevisionIP.objects.log(
@@ -12,6 +12,7 @@ from django.conf import settings
 from django.contrib.sites.models import Site
 from requests.exceptions import ConnectionError, ReadTimeout
 
+from . import timing
 from .constants import KUMASCRIPT_BASE_URL
 from .content import clean_content
 
@@ -129,7 +130,8 @@ def process_body(response):
     # We defer bleach sanitation of kumascript content all the way
     # through editing, source display, and raw output. But, we still
     # want sanitation, so it finally gets picked up here.
-    return clean_content(response.text)
+    with timing.phase("clean"):
+        return clean_content(response.text)
 
 
 def process_errors(response):
@@ -0,0 +1,110 @@
+"""
+Measure the memory it takes to write the recent revisions feed, with its
+diffs, for different numbers of items.
+
+The peak is traced with tracemalloc, for the Python objects allocated while
+writing a feed, along with the process's maximum resident set size, which
+only ever grows, so the item counts are run from the smallest.
+"""
+
+
+import resource
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import translation
+
+from kuma.core.urlresolvers import reverse
+
+from ...feeds import MAX_FEED_ITEMS, RevisionsFeed
+
+
+def get_max_rss():
+    """Return the maximum resident set size of the process, in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes, except on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class Command(BaseCommand):
+    help = "Benchmark the memory used to write the recent revisions feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            action="append",
+            type=int,
+            help="The number of items; can be repeated (default=50 and 500)",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("rss", "atom", "json"),
+            default="rss",
+            help="The format of the feed (default=rss)",
+        )
+        parser.add_argument(
+            "--buffered",
+            action="store_true",
+            help="Also render each feed, with all its items, in memory",
+        )
+
+    def write_feed(self, request, format, buffered):
+        """Write the feed, and return its size and number of items."""
+        feed = RevisionsFeed()
+        # Not cached, to measure the rendering every time
+        feed.cache_timeout = None
+        if buffered:
+            feed.request = request
+            feed.locale = None
+            feedgen = feed.get_feed(feed.get_object(request, format), request)
+            feedgen.items = list(feedgen.items)
+            size = len(feedgen.writeString("utf-8").encode())
+        else:
+            response = feed(request, format=format)
+            size = sum(len(chunk) for chunk in response)
+        return size, len(feed.item_pks)
+
+    def handle(self, *args, **options):
+        counts = sorted(options["items"] or [50, 500])
+        if counts[0] < 1 or counts[-1] > MAX_FEED_ITEMS:
+            raise CommandError(
+                "--items must be between 1 and {}".format(MAX_FEED_ITEMS)
+            )
+
+        variants = [("streamed", False)]
+        if options["buffered"]:
+            variants.append(("buffered", True))
+        factory = RequestFactory()
+        url = reverse(
+            "wiki.feeds.recent_revisions", kwargs={"format": options["format"]}
+        )
+        with translation.override(settings.LANGUAGE_CODE):
+            for count in counts:
+                request = factory.get(url, {"all_locales": "", "limit": count})
+                request.LANGUAGE_CODE = settings.LANGUAGE_CODE
+                for name, buffered in variants:
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    size, num_items = self.write_feed(
+                        request, options["format"], buffered
+                    )
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self.stdout.write(
+                        "{name}, {count} items: {num_items} written, "
+                        "{size:.1f}MB in {elapsed:.2f}s, peak traced memory "
+                        "{peak:.1f}MB, max RSS {max_rss:.1f}MB".format(
+                            name=name,
+                            count=count,
+                            num_items=num_items,
+                            size=size / 1e6,
+                            elapsed=elapsed,
+                            peak=peak / 1e6,
+                            max_rss=get_max_rss() / 1e6,
+                        )
+                    )
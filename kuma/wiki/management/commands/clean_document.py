@@ -1,16 +1,17 @@
 """
 Manually schedule the cleaning of one or more documents
 """
-from math import ceil
+from multiprocessing import Pool
 
-from celery import chain
+from celery import chain, group
 from django.contrib.auth.models import Group
 from django.core.management.base import BaseCommand, CommandError
 
 from kuma.core.utils import chunked
 from kuma.users.models import User
+from kuma.wiki.cleaning import clean_documents, reset_progress
 from kuma.wiki.models import Document
-from kuma.wiki.tasks import clean_document_chunk, email_document_progress
+from kuma.wiki.tasks import clean_document_chunk
 
 
 class Command(BaseCommand):
@@ -32,6 +33,26 @@ class Command(BaseCommand):
         parser.add_argument(
             "--locale", help="Clean ALL documents in this locale (rather than by path)"
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Clean and save this many documents at a time (default=100)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Clean this many chunks at a time in celery tasks (default=4)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help=(
+                "Clean in this process, with a pool of this many processes, "
+                "instead of in celery tasks"
+            ),
+        )
 
     def handle(self, *args, **options):
         user = get_or_create_known_user("mdnwebdocs-bot")
@@ -47,7 +68,15 @@ class Command(BaseCommand):
             docs = docs.order_by("-modified")
             docs = docs.values_list("id", flat=True)
             self.stdout.write("...found {} documents.".format(len(docs)))
-            chain_clean_docs(docs, user.pk)
+            chunk_size = max(options["chunk_size"], 1)
+            if options["processes"]:
+                cleaned = 0
+                with Pool(options["processes"]) as pool:
+                    for chunk in chunked(docs, chunk_size):
+                        cleaned += len(clean_documents(chunk, user, pool=pool))
+                self.stdout.write("...cleaned {} documents.".format(cleaned))
+            else:
+                chain_clean_docs(docs, user.pk, chunk_size, options["concurrency"])
         else:
             # Accept page paths from command line, but be liberal
             # in what we accept, eg: /en-US/docs/CSS (full path);
@@ -82,19 +111,24 @@ def get_or_create_known_user(username):
     return user
 
 
-def chain_clean_docs(doc_pks, user_pk):
-    tasks = []
-    count = 0
+def chain_clean_docs(doc_pks, user_pk, chunk_size=100, concurrency=4):
+    """
+    Clean the documents in chunks, in ``concurrency`` chains of celery tasks
+    that run in parallel.
+    """
     total = len(doc_pks)
-    n = int(ceil(total / 5))
-    chunks = chunked(doc_pks, n)
-
-    for chunk in chunks:
-        count += len(chunk)
-        tasks.append(clean_document_chunk.si(chunk, user_pk))
-        percent_complete = int(ceil((count / total) * 100))
-        tasks.append(
-            email_document_progress.si("clean_document", percent_complete, total)
+    if not total:
+        return
+    reset_progress()
+    chunks = list(chunked(doc_pks, chunk_size))
+    concurrency = max(min(concurrency, len(chunks)), 1)
+    chains = [
+        chain(
+            *[
+                clean_document_chunk.si(chunk, user_pk, total)
+                for chunk in chunks[index::concurrency]
+            ]
         )
-
-    chain(*tasks).apply_async()
+        for index in range(concurrency)
+    ]
+    group(chains).apply_async()
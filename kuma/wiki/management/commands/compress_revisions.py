@@ -0,0 +1,129 @@
+"""
+Convert the stored content of existing revisions to (or from) the compressed
+storage format, in batches.
+
+Revisions are converted in primary key order, and how far a run got is
+stored, so the next run in the same direction starts after it, rather than
+reading the revisions too small to compress all over again.
+"""
+
+
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from kuma.wiki.compression import (
+    clear_progress,
+    compress,
+    get_progress,
+    MARKER,
+    set_progress,
+)
+from kuma.wiki.models import Revision
+
+
+class Command(BaseCommand):
+    help = "Compress (or decompress) the stored content of revisions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--decompress",
+            action="store_true",
+            help="Store the revisions uncompressed again",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Convert this many revisions per query (default=500)",
+        )
+        parser.add_argument(
+            "--start-pk",
+            type=int,
+            help=(
+                "Start after this revision ID (default: where the last run "
+                "in the same direction got to)"
+            ),
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore where the last run got to and start over",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches, to go easy on the database",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        decompress = options["decompress"]
+        if decompress and settings.WIKI_REVISION_COMPRESSION:
+            raise CommandError(
+                "Revisions would be compressed again when saved; turn off "
+                "WIKI_REVISION_COMPRESSION first"
+            )
+        batch_size = max(options["batch_size"], 1)
+
+        # Lookups compare against the stored values, which makes it possible
+        # to skip the revisions that are already converted.
+        if decompress:
+            revisions = Revision.objects.filter(
+                Q(content__startswith=MARKER) | Q(tidied_content__startswith=MARKER)
+            )
+        else:
+            revisions = Revision.objects.exclude(
+                Q(content__startswith=MARKER) & Q(tidied_content__startswith=MARKER)
+            )
+        revisions = revisions.only("id", "content", "tidied_content").order_by("pk")
+
+        if options["restart"]:
+            clear_progress()
+        if options["start_pk"] is not None:
+            last_pk = options["start_pk"]
+        else:
+            last_pk = get_progress(decompress)
+        if last_pk:
+            log.info("Starting after revision ID {}".format(last_pk))
+
+        converted = plain_size = stored_size = 0
+        while True:
+            batch = list(revisions.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for rev in batch:
+                # Loaded values are always plain text.
+                content = rev.content
+                tidied_content = rev.tidied_content
+                plain_size += len(content) + len(tidied_content)
+                if not decompress:
+                    rev.content = compress(content)
+                    rev.tidied_content = compress(tidied_content)
+                stored_size += len(rev.content) + len(rev.tidied_content)
+                # Revisions too small to compress are left alone.
+                if decompress or (rev.content, rev.tidied_content) != (
+                    content,
+                    tidied_content,
+                ):
+                    changed.append(rev)
+            Revision.objects.bulk_update(changed, ["content", "tidied_content"])
+            converted += len(changed)
+            last_pk = batch[-1].pk
+            set_progress(last_pk, decompress)
+            log.info(
+                "Converted {} revisions, up to ID {} ({} characters stored "
+                "for {} characters of content)".format(
+                    converted, last_pk, stored_size, plain_size
+                )
+            )
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        log.info("Done, converted {} revisions".format(converted))
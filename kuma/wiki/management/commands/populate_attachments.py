@@ -1,15 +1,29 @@
 from collections import defaultdict
+from multiprocessing import Pool
 
 from django.core.management.base import BaseCommand
 from django.db import models
 from django.utils.text import get_text_list
 
 from kuma.attachments.models import Attachment
+from kuma.core.utils import chunked
 
 from ...constants import DEKI_FILE_URL, KUMA_FILE_URL
 from ...models import Document, DocumentAttachment
 
 
+def find_files(html):
+    """
+    Return the MindTouch and kuma attachment IDs of the file URLs in the
+    HTML of a document.
+    """
+    # A module-level function, so that it can be sent to pool processes.
+    return (
+        [int(file_id) for file_id in DEKI_FILE_URL.findall(html)],
+        [int(file_id) for file_id in KUMA_FILE_URL.findall(html)],
+    )
+
+
 class Command(BaseCommand):
     help = "Populate m2m relations for documents and their attachments"
 
@@ -22,74 +36,107 @@ class Command(BaseCommand):
             default=False,
             help="Do everything except actually populating " "the attachments.",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Process this many documents or attachments at a time (default=500)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Search the documents in a pool of this many processes (default=1)",
+        )
 
-    def attachments_documents_map(self):
+    def iter_document_chunks(self, documents):
+        """
+        Yield the documents ``self.chunk_size`` at a time, in primary key
+        order, without keeping a cursor open between chunks.
+        """
+        last_pk = 0
+        while True:
+            chunk = list(documents.filter(pk__gt=last_pk)[: self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def attachments_documents_map(self, pool=None):
         """
         Builds and returns a mapping between attachment IDs and a list of IDs
         of the documents whose content contained the attachment URL.
         """
         mapping = defaultdict(list)
-        documents = Document.admin_objects.exclude(is_redirect=True).only("pk", "html")
+        documents = (
+            Document.admin_objects.exclude(is_redirect=True)
+            .only("pk", "html")
+            .order_by("pk")
+        )
 
         self.stdout.write(
             "Attaching files to %s documents...\n\n" % documents.approx_count()
         )
 
-        for document in documents.iterator():
-            mt_files = DEKI_FILE_URL.findall(document.html)
-            kuma_files = KUMA_FILE_URL.findall(document.html)
-            params = None
-
-            if mt_files:
-                params = models.Q(mindtouch_attachment_id__in=mt_files)
-                if kuma_files:
-                    params = params | models.Q(id__in=kuma_files)
-            if kuma_files and not params:
-                params = models.Q(id__in=kuma_files)
-
-            if params:
-                attachment_pks = (
-                    Attachment.objects.filter(params)
-                    .distinct()
-                    .values_list("pk", flat=True)
-                )
-                for attachment_pk in attachment_pks:
+        for chunk in self.iter_document_chunks(documents):
+            htmls = [document.html for document in chunk]
+            files = pool.map(find_files, htmls) if pool else map(find_files, htmls)
+            documents_files = list(zip(chunk, files))
+            mt_files = set()
+            kuma_files = set()
+            for document, (document_mt_files, document_kuma_files) in documents_files:
+                mt_files.update(document_mt_files)
+                kuma_files.update(document_kuma_files)
+            if not mt_files and not kuma_files:
+                continue
+
+            # One query for the attachments of the whole chunk.
+            attachments = Attachment.objects.filter(
+                models.Q(mindtouch_attachment_id__in=mt_files)
+                | models.Q(id__in=kuma_files)
+            ).values_list("pk", "mindtouch_attachment_id")
+            attachment_pks = set()
+            mt_attachment_pks = defaultdict(set)
+            for attachment_pk, mindtouch_attachment_id in attachments:
+                attachment_pks.add(attachment_pk)
+                if mindtouch_attachment_id is not None:
+                    mt_attachment_pks[mindtouch_attachment_id].add(attachment_pk)
+
+            for document, (document_mt_files, document_kuma_files) in documents_files:
+                found = attachment_pks.intersection(document_kuma_files)
+                for file_id in document_mt_files:
+                    found.update(mt_attachment_pks[file_id])
+                for attachment_pk in found:
                     mapping[attachment_pk].append(document.pk)
 
         return mapping
 
-    def create_attachment(self, document, attachment, revision, is_original):
+    def populate_chunk(self, mapping, attachment_pks):
         """
-        Creates a M2M relationship between the given document and attachment
-        using some metadata of the given revision (the latest most likely) and
-        either as an original or as a non-originally uploaded file.
+        Creates or updates, in bulk, the M2M relationships between a chunk of
+        attachments and the documents they were found in, using some metadata
+        of their current revisions. Each attachment is an original of one of
+        the documents, and a non-originally uploaded file of the others.
         """
-        if not self.dry_run:
-            relation, created = DocumentAttachment.objects.update_or_create(
-                file_id=attachment.pk,
-                document_id=document.pk,
-                defaults={
-                    "attached_by": revision.creator,
-                    "name": revision.filename,
-                    "is_original": is_original,
-                    # all relations are linked since they were found in
-                    # the document's content
-                    "is_linked": True,
-                },
+        attachments = Attachment.objects.filter(pk__in=attachment_pks).select_related(
+            "current_revision"
+        )
+        document_pks = set()
+        for attachment_pk in attachment_pks:
+            document_pks.update(mapping[attachment_pk])
+        # Only the documents that aren't deleted.
+        locales = dict(
+            Document.objects.filter(pk__in=document_pks).values_list("pk", "locale")
+        )
+        relations = {
+            (relation.file_id, relation.document_id): relation
+            for relation in DocumentAttachment.objects.filter(
+                file_id__in=attachment_pks
             )
-        self.attached.append(attachment.pk)
-
-    def handle(self, *args, **options):
-        self.dry_run = options["dry_run"]
-        self.attached = []
+        }
 
-        # first get the attachment to document list mapping
-        mapping = self.attachments_documents_map()
-        for attachment_pk, document_pks in mapping.items():
-            # get the attachment
-            attachment = Attachment.objects.only("pk", "current_revision").get(
-                pk=attachment_pk
-            )
+        to_create, to_update = [], []
+        for attachment in attachments:
             if not attachment.current_revision:
                 # bail if there isn't a current attachment revision
                 # probably because faulty data
@@ -99,60 +146,70 @@ class Command(BaseCommand):
                 continue
 
             # the revision we'll use for some minor metadata when creating the
-            # attachment later
+            # attachment
             revision = attachment.current_revision
 
             # get the list of documents that the attachment is contained in
-            documents = Document.objects.filter(pk__in=document_pks).order_by("pk")
-
-            # has the document that the attachment was originally uploaded to
-            # already been found?
-            original_document = None
-
-            # let's see if there is an English document, chances are that's
-            # what we want
-            original_document = documents.filter(locale="en-US").first()
-            if original_document is not None:
-                # create the attachment and mark the original as found
-                self.create_attachment(
-                    original_document,
-                    attachment,
-                    revision,
-                    is_original=True,
+            attachment_document_pks = sorted(
+                pk for pk in set(mapping[attachment.pk]) if pk in locales
+            )
+            if not attachment_document_pks:
+                # we failed, didn't find any document for this attachment
+                self.stderr.write(
+                    "Cannot find document for " "attachment %s" % attachment.pk
                 )
+                continue
 
-            # hm, no English document found, so let's just use the document
-            # with the lowest ID, create the attachment, and move on
-            if original_document is None:
-                original_document = documents.first()
-                if original_document is not None:
-                    self.create_attachment(
-                        original_document,
-                        attachment,
-                        revision,
-                        is_original=True,
+            # let's see if there is an English document, chances are that's
+            # what we want, or else just use the document with the lowest ID
+            english_pks = [
+                pk for pk in attachment_document_pks if locales[pk] == "en-US"
+            ]
+            original_pk = (english_pks or attachment_document_pks)[0]
+
+            for document_pk in attachment_document_pks:
+                fields = {
+                    "attached_by_id": revision.creator_id,
+                    "name": revision.filename,
+                    "is_original": document_pk == original_pk,
+                    # all relations are linked since they were found in
+                    # the document's content
+                    "is_linked": True,
+                }
+                relation = relations.get((attachment.pk, document_pk))
+                if relation is None:
+                    relation = DocumentAttachment(
+                        file_id=attachment.pk, document_id=document_pk
                     )
+                    to_create.append(relation)
+                else:
+                    to_update.append(relation)
+                for name, value in fields.items():
+                    setattr(relation, name, value)
+            self.attached.append(attachment.pk)
 
-            # now go through the rest of the bunch but ignore the original
-            # document we already created an attachment for
-            for rest_document in documents.iterator():
-                if (
-                    original_document is not None
-                    and rest_document.pk == original_document.pk
-                ):
-                    continue
-                self.create_attachment(
-                    rest_document,
-                    attachment,
-                    revision,
-                    is_original=False,
-                )
+        if not self.dry_run:
+            DocumentAttachment.objects.bulk_create(to_create)
+            DocumentAttachment.objects.bulk_update(
+                to_update, ["attached_by", "name", "is_original", "is_linked"]
+            )
 
-            # we failed, didn't find any document for this document
-            if original_document is None:
-                self.stderr.write(
-                    "Cannot find document for " "attachment %s" % attachment.pk
-                )
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.chunk_size = max(options["chunk_size"], 1)
+        self.attached = []
+
+        # first get the attachment to document list mapping
+        pool = Pool(options["processes"]) if options["processes"] > 1 else None
+        try:
+            mapping = self.attachments_documents_map(pool)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        for attachment_pks in chunked(sorted(mapping), self.chunk_size):
+            self.populate_chunk(mapping, attachment_pks)
 
         # yada yada yada
         if self.attached:
@@ -4,19 +4,13 @@ Manually schedule the rendering of a document
 
 import datetime
 import logging
-from math import ceil
 
-from celery import chain
 from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Q
 
-from kuma.core.utils import chunked
-from kuma.wiki.models import Document, DocumentRenderingInProgress
-from kuma.wiki.tasks import (
-    email_document_progress,
-    render_document,
-    render_document_chunk,
-)
+from kuma.wiki.models import Document, DocumentRenderingInProgress, RenderRun
+from kuma.wiki.scheduling import BULK, record_scheduled
+from kuma.wiki.tasks import render_document
 from kuma.wiki.templatetags.jinja_helpers import absolutify
 
 
@@ -77,8 +71,44 @@ class Command(BaseCommand):
             ),
             action="store_true",
         )
+        parser.add_argument(
+            "--chunk-size",
+            help="Render this many documents per task (only with --all)",
+            type=int,
+            default=100,
+        )
+        parser.add_argument(
+            "--concurrency",
+            help=(
+                "Render this many chunks at the same time (only with --all "
+                "or --resume, default 4)"
+            ),
+            type=int,
+            default=4,
+        )
+        parser.add_argument(
+            "--resume",
+            help="Resume the render run with this ID, as reported by --all",
+            type=int,
+            metavar="RUN_ID",
+        )
+        parser.add_argument(
+            "--status",
+            help="Report the progress of the render run with this ID",
+            type=int,
+            metavar="RUN_ID",
+        )
 
     def handle(self, *args, **options):
+        if options["status"]:
+            self.report_status(self.get_run(options["status"]))
+            return
+        if options["resume"]:
+            run = self.get_run(options["resume"])
+            count = run.dispatch(max(options["concurrency"], 1))
+            self.stdout.write(f"Resumed {run}, with {count} chunks left")
+            return
+
         base_url = options["baseurl"] or absolutify("")
         if options["nocache"]:
             cache_control = "no-cache"
@@ -110,16 +140,23 @@ class Command(BaseCommand):
                     raise NotImplementedError("* can only be on the end")
                 else:
                     docs = docs.filter(slug__contains=options["slugsearch"])
-            docs = docs.order_by("-modified")
             docs = docs.values_list("id", flat=True)
 
-            self.chain_render_docs(
-                docs,
-                cache_control,
-                base_url,
-                force,
+            run = RenderRun.start(
+                list(docs),
+                chunk_size=max(options["chunk_size"], 1),
+                concurrency=max(options["concurrency"], 1),
+                cache_control=cache_control,
+                base_url=base_url,
+                force=force,
                 invalidate_cdn_cache=invalidate_cdn_cache,
             )
+            record_scheduled(BULK, run.total)
+            run.dispatch()
+            self.stdout.write(
+                f"Started {run}, follow it with --status {run.pk}, and resume "
+                f"it with --resume {run.pk} if it stalls"
+            )
 
         else:
             # Accept page paths from command line, but be liberal
@@ -150,26 +187,28 @@ class Command(BaseCommand):
                 except DocumentRenderingInProgress:
                     log.error("Rendering is already in progress for this document.")
 
-    def chain_render_docs(
-        self, docs, cache_control, base_url, force, invalidate_cdn_cache=False
-    ):
-        tasks = []
-        count = 0
-        total = len(docs)
-        n = int(ceil(total / 5))
-        chunks = chunked(docs, n)
-
-        for chunk in chunks:
-            count += len(chunk)
-            tasks.append(
-                render_document_chunk.si(
-                    chunk, cache_control, base_url, force, invalidate_cdn_cache
-                )
-            )
-            percent_complete = int(ceil((count / total) * 100))
-            tasks.append(
-                email_document_progress.si("render_document", percent_complete, total)
-            )
-
-        # Make it so.
-        chain(*tasks).apply_async()
+    def get_run(self, pk):
+        try:
+            return RenderRun.objects.get(pk=pk)
+        except RenderRun.DoesNotExist:
+            raise CommandError(f"There is no render run with ID {pk}")
+
+    def report_status(self, run):
+        progress = run.get_progress()
+        if run.finished:
+            eta = "finished"
+        elif progress["eta"] is None:
+            eta = "ETA unknown"
+        else:
+            eta = f"ETA {progress['eta']}s"
+        self.stdout.write(
+            f"{run}: {progress['done']} done in {progress['elapsed']}s, "
+            f"{progress['rate']} documents/s, {eta}"
+        )
+        self.stdout.write(
+            f"{progress['chunks_done']} of {progress['chunks']} chunks done, "
+            f"{progress['chunks_failed']} failed, {progress['rendered']} "
+            f"documents rendered, {progress['errors']} errors"
+        )
+        for chunk in run.chunks.exclude(last_error=""):
+            self.stdout.write(f"{chunk}: {chunk.last_error}")
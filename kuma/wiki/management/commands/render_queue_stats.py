@@ -0,0 +1,36 @@
+"""
+Report the depth and age of the queues of deferred document renders.
+"""
+
+
+from collections import namedtuple
+
+from django.core.management.base import BaseCommand
+
+from kuma.wiki.scheduling import get_queue_stats, LANES, reset_queue_stats
+
+
+class Command(BaseCommand):
+    help = "Report the depth and age of the queues of deferred renders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counts, like after purging the render queues",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        if options["reset"]:
+            reset_queue_stats()
+            log.info("Reset the render queue stats")
+            return
+        stats = get_queue_stats()
+        for lane in LANES:
+            log.info(
+                "{}: {} pending renders, the oldest queued {}s ago".format(
+                    lane, stats[lane]["depth"], stats[lane]["age"]
+                )
+            )
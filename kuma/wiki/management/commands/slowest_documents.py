@@ -0,0 +1,68 @@
+"""
+List the documents that are slowest to render, with the time of each phase.
+"""
+
+
+from collections import namedtuple
+
+from django.core.management.base import BaseCommand
+
+from kuma.wiki.models import DocumentRenderStats
+from kuma.wiki.timing import PHASES
+
+
+SORT_FIELDS = ("total_time", "max_total_time") + tuple(
+    "%s_time" % name for name in PHASES
+)
+
+
+class Command(BaseCommand):
+    help = "List the documents that are slowest to render"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="List this many documents (default=20)",
+        )
+        parser.add_argument("--locale", help="Only list documents in this locale")
+        parser.add_argument(
+            "--deferred",
+            action="store_true",
+            help="Only list documents with deferred rendering",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=SORT_FIELDS,
+            default="total_time",
+            help="Sort by the time of the last render, or of a phase of it",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        stats = DocumentRenderStats.objects.select_related("document")
+        if options["locale"]:
+            stats = stats.filter(document__locale=options["locale"])
+        if options["deferred"]:
+            stats = stats.filter(document__defer_rendering=True)
+        stats = stats.order_by("-" + options["sort"])[: max(options["limit"], 1)]
+
+        columns = ("total", "max") + PHASES
+        log.info(
+            " ".join("{:>10}".format(name) for name in columns)
+            + "  renders  deferred  document"
+        )
+        for stat in stats:
+            times = [stat.total_time, stat.max_total_time] + [
+                getattr(stat, "%s_time" % name) for name in PHASES
+            ]
+            log.info(
+                " ".join("{:>9.3f}s".format(seconds) for seconds in times)
+                + "  {:>7}  {:>8}  {}".format(
+                    stat.render_count,
+                    "yes" if stat.document.defer_rendering else "no",
+                    stat.document.get_absolute_url(),
+                )
+            )
@@ -0,0 +1,125 @@
+"""
+Tidy the content of the revisions that were never tidied, in bulk.
+"""
+
+
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+
+from celery import group
+from django.core.management.base import BaseCommand
+
+from kuma.wiki.tasks import tidy_revision_chunk
+from kuma.wiki.tidying import (
+    clear_checkpoint,
+    get_checkpoint,
+    get_untidied_revisions,
+    iter_untidied_chunks,
+    set_checkpoint,
+    tidy_revisions,
+)
+
+
+class Command(BaseCommand):
+    help = "Tidy the content of the revisions that were never tidied"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Tidy and save this many revisions at a time (default=100)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Tidy in a pool of this many processes (default=1)",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help=(
+                "Schedule a group of parallel celery tasks, one per chunk, "
+                "instead of tidying in this process"
+            ),
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between chunks, to go easy on the database",
+        )
+        parser.add_argument(
+            "--start-pk",
+            type=int,
+            help="Start after this revision ID (default: the last checkpoint)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the last checkpoint and start over",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only report how many revisions still need tidying",
+        )
+
+    def handle(self, *args, **options):
+        Logger = namedtuple("Logger", "info, error")
+        log = Logger(info=self.stdout.write, error=self.stderr.write)
+        chunk_size = max(options["chunk_size"], 1)
+
+        if options["status"]:
+            count = get_untidied_revisions().count()
+            log.info("{} revisions still need tidying".format(count))
+            return
+
+        if options["restart"]:
+            clear_checkpoint()
+        if options["start_pk"] is not None:
+            start_pk = options["start_pk"]
+        else:
+            start_pk = get_checkpoint()
+        if start_pk:
+            log.info("Starting after revision ID {}".format(start_pk))
+
+        chunks = iter_untidied_chunks(start_pk, chunk_size)
+
+        if options["celery"]:
+            # The tasks are rate limited, and each only tidies the revisions
+            # of its chunk that still need it, so running the command again
+            # is always safe.
+            tasks = [tidy_revision_chunk.si(chunk) for chunk in chunks]
+            if tasks:
+                group(tasks).apply_async()
+            log.info("Scheduled {} chunks of revisions to tidy".format(len(tasks)))
+            return
+
+        pool = Pool(options["processes"]) if options["processes"] > 1 else None
+        tidied = 0
+        try:
+            for chunk in chunks:
+                tidied += tidy_revisions(chunk, pool=pool)
+                set_checkpoint(chunk[-1])
+                log.info("Tidied {} revisions, up to ID {}".format(tidied, chunk[-1]))
+                if options["sleep"]:
+                    time.sleep(options["sleep"])
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        clear_checkpoint()
+        log.info("Done, tidied {} revisions".format(tidied))
+        untidied = get_untidied_revisions().count()
+        if untidied:
+            # Including those tidy failed on
+            log.info("{} revisions are still untidied".format(untidied))
+        else:
+            log.info(
+                "Every revision is tidied; WIKI_TIDY_REVISIONS_IN_REQUEST can "
+                "now be turned off"
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wiki", "0014_delete_bcsignal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="popularity",
+            field=models.FloatField(db_index=True, default=0.0, editable=False),
+        ),
+    ]
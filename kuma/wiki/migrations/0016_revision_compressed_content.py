@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 11:02
+
+from django.db import migrations
+
+import kuma.wiki.compression
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wiki", "0015_document_popularity"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="revision",
+            name="content",
+            field=kuma.wiki.compression.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name="revision",
+            name="tidied_content",
+            field=kuma.wiki.compression.CompressedTextField(blank=True),
+        ),
+    ]
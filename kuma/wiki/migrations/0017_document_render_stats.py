@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wiki", "0016_revision_compressed_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentRenderStats",
+            fields=[
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="render_stats",
+                        serialize=False,
+                        to="wiki.Document",
+                    ),
+                ),
+                ("render_count", models.PositiveIntegerField(default=0)),
+                ("fast_render_count", models.PositiveIntegerField(default=0)),
+                ("last_rendered_at", models.DateTimeField(db_index=True, null=True)),
+                ("kumascript_time", models.FloatField(default=0)),
+                ("clean_time", models.FloatField(default=0)),
+                ("fields_time", models.FloatField(default=0)),
+                ("save_time", models.FloatField(default=0)),
+                ("total_time", models.FloatField(db_index=True, default=0)),
+                ("max_total_time", models.FloatField(default=0)),
+                ("histogram", models.TextField(blank=True)),
+            ],
+            options={
+                "verbose_name_plural": "Document render stats",
+            },
+        ),
+    ]
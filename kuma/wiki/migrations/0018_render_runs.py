@@ -0,0 +1,83 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wiki", "0017_document_render_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderRun",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("concurrency", models.PositiveSmallIntegerField(default=1)),
+                ("cache_control", models.CharField(blank=True, max_length=32)),
+                ("base_url", models.CharField(blank=True, max_length=255)),
+                ("force", models.BooleanField(default=False)),
+                ("invalidate_cdn_cache", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RenderRunChunk",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("pks", models.TextField()),
+                ("size", models.PositiveIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("rendered", models.PositiveIntegerField(default=0)),
+                ("errors", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="wiki.RenderRun",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("run", "index"),
+                "unique_together": {("run", "index")},
+            },
+        ),
+    ]
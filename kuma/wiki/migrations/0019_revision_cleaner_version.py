@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wiki", "0018_render_runs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revision",
+            name="cleaner_version",
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="revision",
+            name="content_digest",
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+    ]
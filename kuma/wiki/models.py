@@ -10,6 +10,7 @@ import newrelic.agent
 from constance import config
 from django.apps import apps
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.db.models import signals
@@ -22,11 +23,13 @@ from tidings.models import NotificationsMixin
 
 from kuma.core.exceptions import ProgrammingError
 from kuma.core.i18n import get_language_mapping
+from kuma.core.managers import add_tags, set_tags
 from kuma.core.urlresolvers import reverse
 from kuma.core.utils import safer_pyquery as PyQuery
 from kuma.spam.models import AkismetSubmission, SpamAttempt
 
 from . import kumascript
+from .compression import CompressedTextField
 from .constants import (
     DEKI_FILE_URL,
     EXPERIMENT_TITLE_PREFIX,
@@ -39,6 +42,8 @@ from .constants import (
 from .content import (
     clean_content,
     Extractor,
+    get_cleaner_version,
+    get_content_digest,
     get_content_sections,
     get_seo_description,
     H2TOCFilter,
@@ -63,8 +68,10 @@ from .managers import (
     RevisionIPManager,
     TaggedDocumentManager,
 )
+from .scheduling import INTERACTIVE, schedule_render
 from .signals import render_done, restore_done
 from .templatetags.jinja_helpers import absolutify
+from .timing import empty_histogram, get_bucket, RenderTimer
 from .utils import get_doc_components_from_url, tidy_content
 
 
@@ -203,6 +210,10 @@ class DocumentAttachment(models.Model):
             )
 
 
+# The levels of the topic tree fetched by each query of get_topic_parents.
+TOPIC_PARENTS_RELATED = "__".join(["parent_topic"] * 4)
+
+
 class Document(NotificationsMixin, models.Model):
     """A localized knowledgebase document, not revision-specific."""
 
@@ -318,6 +329,10 @@ class Document(NotificationsMixin, models.Model):
 
     uuid = models.UUIDField(default=uuid4, editable=False)
 
+    # Normalized (0.0 - 1.0) pageview score used to rank search results.
+    # Maintained by the kuma.search.popularity pipeline.
+    popularity = models.FloatField(default=0.0, editable=False, db_index=True)
+
     class Meta(object):
         unique_together = (
             ("parent", "locale"),
@@ -537,10 +552,11 @@ class Document(NotificationsMixin, models.Model):
 
         return (self.rendered_html, errors)
 
-    def schedule_rendering(self, cache_control=None, base_url=None):
+    def schedule_rendering(self, cache_control=None, base_url=None, lane=INTERACTIVE):
         """
         Attempt to schedule rendering. Honor the deferred_rendering field to
-        decide between an immediate or a queued render.
+        decide between an immediate or a queued render. Queued renders go to
+        the given lane (see kuma.wiki.scheduling).
         """
         if settings.MAINTENANCE_MODE:
             return
@@ -556,11 +572,10 @@ class Document(NotificationsMixin, models.Model):
         self.render_scheduled_at = now
 
         if self.defer_rendering:
-            # Attempt to queue a rendering. If celery.conf.ALWAYS_EAGER is
-            # True, this is also an immediate rendering.
-            from .tasks import render_document
-
-            render_document.delay(self.pk, cache_control, base_url)
+            # Attempt to queue a rendering, unless one is already queued. If
+            # celery.conf.ALWAYS_EAGER is True, this is also an immediate
+            # rendering.
+            schedule_render(self.pk, cache_control, base_url, lane=lane)
         else:
             # Attempt an immediate rendering.
             self.render(cache_control, base_url)
@@ -587,33 +602,45 @@ class Document(NotificationsMixin, models.Model):
         Document.objects.filter(pk=self.pk).update(render_started_at=now)
         self.render_started_at = now
 
-        # Perform rendering and update document
-        if not config.KUMASCRIPT_TIMEOUT:
-            # A timeout of 0 should shortcircuit kumascript usage.
-            self.rendered_html, self.rendered_errors = self.html, []
-        else:
-            self.rendered_html, errors = kumascript.get(
-                self, base_url, cache_control=cache_control, timeout=timeout
-            )
-            self.rendered_errors = errors and json.dumps(errors) or None
+        timer = RenderTimer()
+        with timer.activate():
+            # Perform rendering and update document
+            if not config.KUMASCRIPT_TIMEOUT:
+                # A timeout of 0 should shortcircuit kumascript usage.
+                self.rendered_html, self.rendered_errors = self.html, []
+            else:
+                with timer.phase("kumascript"):
+                    self.rendered_html, errors = kumascript.get(
+                        self, base_url, cache_control=cache_control, timeout=timeout
+                    )
+                self.rendered_errors = errors and json.dumps(errors) or None
 
-        # Regenerate the cached content fields
-        self.regenerate_cache_with_fields()
+            # Regenerate the cached content fields
+            with timer.phase("fields"):
+                self.regenerate_cache_with_fields()
 
         # Finally, note the end time of rendering and update the document.
         self.last_rendered_at = datetime.now()
 
         # If this rendering took longer than we'd like, mark it for deferred
-        # rendering in the future.
+        # rendering in the future. Once enough renders in a row are fast
+        # again, release it from deferred rendering.
+        try:
+            stats = self.render_stats
+        except DocumentRenderStats.DoesNotExist:
+            stats = DocumentRenderStats(document=self)
         timeout = config.KUMA_DOCUMENT_FORCE_DEFERRED_TIMEOUT
         max_duration = timedelta(seconds=timeout)
         duration = self.last_rendered_at - self.render_started_at
         if duration >= max_duration:
             self.defer_rendering = True
+            stats.fast_render_count = 0
+        else:
+            stats.fast_render_count += 1
+            release_count = config.KUMA_DOCUMENT_DEFERRED_RELEASE_COUNT
+            if release_count and stats.fast_render_count >= release_count:
+                self.defer_rendering = False
 
-        # TODO: Automatically clear the defer_rendering flag if the rendering
-        # time falls under the limit? Probably safer to require manual
-        # intervention to free docs from deferred jail.
         if self.render_max_age:
             # If there's a render_max_age, automatically update render_expires
             self.render_expires = datetime.now() + timedelta(
@@ -623,7 +650,10 @@ class Document(NotificationsMixin, models.Model):
             # Otherwise, just clear the expiration time as a one-shot
             self.render_expires = None
 
-        self.save()
+        with timer.phase("save"):
+            self.save()
+        stats.record(timer)
+        stats.save()
 
         render_done.send(
             sender=self.__class__,
@@ -840,7 +870,7 @@ class Document(NotificationsMixin, models.Model):
 
             # set review tags
             if old_review_tags:
-                revision.review_tags.set(*old_review_tags)
+                set_tags(revision.review_tags, *old_review_tags)
 
         # populate model instance with fresh data from database
         revision.refresh_from_db()
@@ -898,7 +928,7 @@ class Document(NotificationsMixin, models.Model):
 
         # Finally, commit the revision changes and return the new rev.
         new_rev.save()
-        new_rev.review_tags.set(*parse_tags(review_tags))
+        set_tags(new_rev.review_tags, *parse_tags(review_tags))
         return new_rev
 
     def save(self, *args, **kwargs):
@@ -1097,7 +1127,7 @@ class Document(NotificationsMixin, models.Model):
         moved_rev.save(force_insert=True)
 
         # Step 8: Save the review tags.
-        moved_rev.review_tags.set(*review_tags)
+        set_tags(moved_rev.review_tags, *review_tags)
 
         # Step 9: Save the redirect.
         redirect_doc.save()
@@ -1215,7 +1245,7 @@ Full traceback:
                     else:
                         new_rev.tags = stub_tags
                     new_rev.save()
-                    new_rev.localization_tags.add(*stub_l10n_tags)
+                    add_tags(new_rev.localization_tags, *stub_l10n_tags)
 
         # Finally, assign the new default parent topic
         self.parent_topic = new_parent
@@ -1227,7 +1257,9 @@ Full traceback:
         with the document's HTML content.
 
         We find them by regex-searching over the HTML for URLs that match the
-        file URL patterns.
+        file URL patterns, and return a list of (relation, created) pairs for
+        the attachments found. The relations are updated with a few bulk
+        queries, however many attachments there are.
         """
         mt_files = DEKI_FILE_URL.findall(self.html)
         kuma_files = KUMA_FILE_URL.findall(self.html)
@@ -1245,21 +1277,18 @@ Full traceback:
 
         Attachment = apps.get_model("attachments", "Attachment")
         if params:
-            found_attachments = Attachment.objects.filter(params)
+            found_attachments = (
+                Attachment.objects.filter(params)
+                .select_related("current_revision")
+                .distinct()
+                .order_by("pk")
+            )
         else:
             # If no files found, return an empty Attachment queryset.
             found_attachments = Attachment.objects.none()
 
-        # Delete all document-attachments-relations for attachments that
-        # weren't originally uploaded for the document to populate the list
-        # again below
-        self.attached_files.filter(is_original=False).delete()
-
-        # Reset the linked status for all attachments that are left
-        self.attached_files.all().update(is_linked=False)
-
-        # Go through the attachments discovered in the HTML and
-        # create linked attachments
+        # The relations are synced in bulk, with the difference between the
+        # relations there are and the relations there should be.
         """
         three options of state:
 
@@ -1267,19 +1296,58 @@ Full traceback:
         - linked in the document and originally uploaded
         - not linked in the document, but originally uploaded
         """
-        populated = []
-        for attachment in found_attachments.only("pk", "current_revision").iterator():
+        DocumentAttachment = self.files.through
+        relations = {}
+        to_delete, to_update, populated = [], [], []
+        # The originally uploaded relation of a file is kept over the others.
+        for relation in self.attached_files.order_by("-is_original", "pk"):
+            if relation.file_id in relations:
+                to_delete.append(relation)
+            else:
+                relations[relation.file_id] = relation
+
+        for attachment in found_attachments:
             revision = attachment.current_revision
-            relation, created = self.files.through.objects.update_or_create(
-                file_id=attachment.pk,
-                document_id=self.pk,
-                defaults={
-                    "attached_by": revision.creator,
-                    "name": revision.filename,
-                    "is_linked": True,
-                },
-            )
+            if revision is None:
+                continue
+            relation = relations.pop(attachment.pk, None)
+            if relation is None:
+                relation = DocumentAttachment(file=attachment, document=self)
+                created = True
+            else:
+                created = False
+            fields = {
+                "attached_by_id": revision.creator_id,
+                "name": revision.filename,
+                "is_linked": True,
+            }
+            if not created and any(
+                getattr(relation, name) != value for name, value in fields.items()
+            ):
+                to_update.append(relation)
+            for name, value in fields.items():
+                setattr(relation, name, value)
             populated.append((relation, created))
+
+        # Go through the relations to attachments that aren't in the HTML
+        for relation in relations.values():
+            if not relation.is_original:
+                to_delete.append(relation)
+            elif relation.is_linked:
+                relation.is_linked = False
+                to_update.append(relation)
+
+        if to_delete:
+            DocumentAttachment.objects.filter(
+                pk__in=[relation.pk for relation in to_delete]
+            ).delete()
+        if to_update:
+            DocumentAttachment.objects.bulk_update(
+                to_update, ["attached_by", "name", "is_linked"]
+            )
+        created_relations = [relation for relation, created in populated if created]
+        if created_relations:
+            DocumentAttachment.objects.bulk_create(created_relations)
         return populated
 
     @property
@@ -1341,7 +1409,13 @@ Full traceback:
     def get_topic_parents(self):
         """Build a list of parent topics from self to root"""
         curr, parents = self, []
-        while curr.parent_topic:
+        while curr.parent_topic_id:
+            if not Document.parent_topic.is_cached(curr):
+                # Fetch the next few levels of the tree with a single query,
+                # instead of one query per level.
+                curr.parent_topic = Document._base_manager.select_related(
+                    TOPIC_PARENTS_RELATED
+                ).get(pk=curr.parent_topic_id)
             curr = curr.parent_topic
             parents.append(curr)
         return parents
@@ -1538,13 +1612,18 @@ Full traceback:
         revision, if one is created.
         """
         rev = self.current_revision
-        if not rev:
+        if not rev or rev.is_content_clean():
             return None
 
         cleaned_content = clean_content(rev.content)
 
         if rev.content == cleaned_content:
-            # The content is already clean.
+            # The content is already clean, so record that.
+            rev.mark_content_clean()
+            Revision.objects.filter(pk=rev.pk).update(
+                content_digest=rev.content_digest,
+                cleaner_version=rev.cleaner_version,
+            )
             return None
 
         prior_pk = rev.pk
@@ -1559,6 +1638,7 @@ Full traceback:
             rev.creator = user
             rev.created = datetime.now()
             rev.content = cleaned_content
+            rev.mark_content_clean()
             rev.tidied_content = tidied_and_cleaned_content
             if not self.parent:
                 # This is updated only if the document is not a translation,
@@ -1576,9 +1656,9 @@ Full traceback:
             rev.title = self.title
             rev.save()
             if prior_review_tags:
-                rev.review_tags.set(*prior_review_tags)
+                set_tags(rev.review_tags, *prior_review_tags)
             if prior_localization_tags:
-                rev.localization_tags.set(*prior_localization_tags)
+                set_tags(rev.localization_tags, *prior_localization_tags)
 
         # Populate the model instance with fresh data from database.
         rev.refresh_from_db()
@@ -1590,6 +1670,197 @@ Full traceback:
         return rev
 
 
+class DocumentRenderStats(models.Model):
+    """
+    How long the renders of a document took, phase by phase (see
+    kuma.wiki.timing), to find the documents that are slow to render.
+    """
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="render_stats",
+    )
+    render_count = models.PositiveIntegerField(default=0)
+    # The number of renders in a row that were fast enough to render in the
+    # response cycle. Enough of them release a document from deferred
+    # rendering.
+    fast_render_count = models.PositiveIntegerField(default=0)
+    last_rendered_at = models.DateTimeField(null=True, db_index=True)
+
+    # The times of the last render, in seconds
+    kumascript_time = models.FloatField(default=0)
+    clean_time = models.FloatField(default=0)
+    fields_time = models.FloatField(default=0)
+    save_time = models.FloatField(default=0)
+    total_time = models.FloatField(default=0, db_index=True)
+    max_total_time = models.FloatField(default=0)
+
+    # JSON-encoded counts of the renders by time, for each phase and the
+    # total, in the buckets of timing.HISTOGRAM_BUCKETS
+    histogram = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name_plural = "Document render stats"
+
+    def __str__(self):
+        return "Render stats of %s" % self.document
+
+    def get_histogram(self):
+        return json.loads(self.histogram) if self.histogram else empty_histogram()
+
+    def record(self, timer):
+        """Record the times of a render."""
+        histogram = self.get_histogram()
+        times = dict(timer.times, total=timer.total)
+        for name, seconds in times.items():
+            histogram[name][get_bucket(seconds)] += 1
+            setattr(self, "%s_time" % name, seconds)
+        self.histogram = json.dumps(histogram)
+        self.max_total_time = max(self.max_total_time, timer.total)
+        self.render_count += 1
+        self.last_rendered_at = datetime.now()
+
+
+class RenderRun(models.Model):
+    """
+    A bulk render of many documents, like ``render_document --all``.
+
+    The documents are split into chunks, which are rendered in parallel by
+    celery tasks and record their progress as they go, so that a run can be
+    followed, and resumed if it stalls.
+    """
+
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    concurrency = models.PositiveSmallIntegerField(default=1)
+    # The arguments of the renders
+    cache_control = models.CharField(max_length=32, blank=True)
+    base_url = models.CharField(max_length=255, blank=True)
+    force = models.BooleanField(default=False)
+    invalidate_cdn_cache = models.BooleanField(default=False)
+
+    def __str__(self):
+        return "Render run %s of %s documents" % (self.pk, self.total)
+
+    @classmethod
+    def start(cls, pks, chunk_size=100, concurrency=1, **kwargs):
+        """Create a run of the documents with these primary keys."""
+        pks = sorted(pks)
+        run = cls.objects.create(total=len(pks), concurrency=concurrency, **kwargs)
+        RenderRunChunk.objects.bulk_create(
+            RenderRunChunk(
+                run=run,
+                index=index,
+                pks=",".join(str(pk) for pk in pks[start : start + chunk_size]),
+                size=len(pks[start : start + chunk_size]),
+            )
+            for index, start in enumerate(range(0, len(pks), chunk_size))
+        )
+        return run
+
+    def dispatch(self, concurrency=None):
+        """
+        Schedule the rendering of the chunks that are left, failed ones
+        included, in a group of ``concurrency`` chains of tasks that run in
+        parallel, and return the number of chunks scheduled.
+        """
+        from celery import chain, group
+
+        from .tasks import render_run_chunk
+
+        if concurrency:
+            self.concurrency = concurrency
+        self.finished = None
+        self.save()
+        self.chunks.filter(status=RenderRunChunk.FAILED).update(
+            status=RenderRunChunk.PENDING
+        )
+        pks = list(
+            self.chunks.filter(status=RenderRunChunk.PENDING).values_list(
+                "pk", flat=True
+            )
+        )
+        lanes = [pks[i :: self.concurrency] for i in range(self.concurrency)]
+        group(
+            chain(*(render_run_chunk.si(pk) for pk in lane)) for lane in lanes if lane
+        ).apply_async()
+        return len(pks)
+
+    def get_progress(self):
+        """
+        Return the progress of the run, with the render ``rate`` in documents
+        per second, and the ``eta`` in seconds.
+        """
+        chunks = self.chunks.values_list("status", "size", "rendered", "errors")
+        progress = {
+            "total": self.total,
+            "chunks": len(chunks),
+            "chunks_done": 0,
+            "chunks_failed": 0,
+            "done": 0,
+            "rendered": 0,
+            "errors": 0,
+        }
+        for status, size, rendered, errors in chunks:
+            progress["rendered"] += rendered
+            progress["errors"] += errors
+            if status != RenderRunChunk.PENDING:
+                progress["chunks_done"] += 1
+                progress["done"] += size
+            if status == RenderRunChunk.FAILED:
+                progress["chunks_failed"] += 1
+        elapsed = ((self.finished or datetime.now()) - self.created).total_seconds()
+        rate = progress["done"] / elapsed if elapsed > 0 else 0
+        remaining = self.total - progress["done"]
+        progress.update(
+            elapsed=round(elapsed),
+            rate=round(rate, 2),
+            eta=round(remaining / rate) if rate else None,
+        )
+        return progress
+
+
+class RenderRunChunk(models.Model):
+    """A chunk of the documents of a render run, and how it went."""
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    run = models.ForeignKey(RenderRun, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+    # The comma-separated primary keys of the documents
+    pks = models.TextField()
+    size = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    # The number of documents that failed to render in the last attempt
+    errors = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("run", "index")
+        ordering = ("run", "index")
+
+    def __str__(self):
+        return "Chunk %s of render run %s" % (self.index, self.run_id)
+
+    def get_pks(self):
+        return [int(pk) for pk in self.pks.split(",") if pk]
+
+
 class DocumentDeletionLog(models.Model):
     """
     Log of who deleted a Document, when, and why.
@@ -1664,6 +1935,11 @@ class LocalizationTaggedRevision(ItemBase):
         return tags_for(cls, *args, **kwargs)
 
 
+# The cleaned content of old revisions, by cleaner version and digest.
+CONTENT_CLEANED_CACHE_KEY = "kuma:wiki:content-cleaned:{version}:{digest}"
+CONTENT_CLEANED_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
 class Revision(models.Model):
     """A revision of a localized knowledgebase document"""
 
@@ -1692,8 +1968,14 @@ class Revision(models.Model):
     slug = models.CharField(max_length=255, null=True, db_index=True)
 
     summary = models.TextField()  # wiki markup
-    content = models.TextField()  # wiki markup
-    tidied_content = models.TextField(blank=True)  # wiki markup tidied up
+    # These may be stored compressed, see kuma.wiki.compression.
+    content = CompressedTextField()  # wiki markup
+    tidied_content = CompressedTextField(blank=True)  # wiki markup tidied up
+
+    # The digest of the content when it was last cleaned, and the version of
+    # clean_content that cleaned it, to recognize content that is clean.
+    content_digest = models.CharField(max_length=40, blank=True, editable=False)
+    cleaner_version = models.CharField(max_length=16, blank=True, editable=False)
 
     # Keywords are used mostly to affect search rankings. Moderators may not
     # have the language expertise to translate keywords, so we put them in the
@@ -1812,7 +2094,9 @@ class Revision(models.Model):
         if not self.slug:
             self.slug = self.document.slug
 
-        self.content = clean_content(self.content)
+        if not self.is_content_clean():
+            self.content = clean_content(self.content)
+            self.mark_content_clean()
 
         super(Revision, self).save(*args, **kwargs)
 
@@ -1833,7 +2117,7 @@ class Revision(models.Model):
 
         # Since Revision stores tags as a string, we need to parse them first
         # before setting on the Document.
-        self.document.tags.set(*parse_tags(self.tags))
+        set_tags(self.document.tags, *parse_tags(self.tags))
 
         self.document.save()
 
@@ -1874,6 +2158,21 @@ class Revision(models.Model):
         self.tidied_content = tidied_content or ""
         return tidied_content
 
+    def is_content_clean(self):
+        """
+        Return whether the content is known to be clean, because it hasn't
+        changed since the current version of clean_content cleaned it.
+        """
+        return (
+            self.cleaner_version == get_cleaner_version()
+            and self.content_digest == get_content_digest(self.content or "")
+        )
+
+    def mark_content_clean(self):
+        """Record that the content has just been cleaned by clean_content."""
+        self.content_digest = get_content_digest(self.content or "")
+        self.cleaner_version = get_cleaner_version()
+
     @property
     def content_cleaned(self):
         """
@@ -1883,7 +2182,25 @@ class Revision(models.Model):
         # We still need this for the wiki.revision and wiki.translate endpoints
         # (due to old revisions and "based_on" revisions whose content may have
         # not been cleaned).
-        return clean_content(self.content)
+        if self.is_content_clean():
+            return self.content
+        cache_key = CONTENT_CLEANED_CACHE_KEY.format(
+            version=get_cleaner_version(),
+            digest=get_content_digest(self.content or ""),
+        )
+        content_cleaned = cache.get(cache_key)
+        if content_cleaned is None:
+            content_cleaned = clean_content(self.content)
+            if content_cleaned == self.content and self.pk:
+                # It was clean all along, so record that instead.
+                self.mark_content_clean()
+                Revision.objects.filter(pk=self.pk).update(
+                    content_digest=self.content_digest,
+                    cleaner_version=self.cleaner_version,
+                )
+            else:
+                cache.set(cache_key, content_cleaned, CONTENT_CLEANED_CACHE_TIMEOUT)
+        return content_cleaned
 
     @cached_property
     def previous(self):
@@ -1954,6 +2271,26 @@ class RevisionIP(models.Model):
         return "%s (revision %d)" % (self.ip or "No IP", self.revision.id)
 
 
+class EditDigestEntry(models.Model):
+    """
+    An edit notification queued for the hourly or daily digest of a watcher.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    revision = models.ForeignKey(Revision, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "revision")
+
+    def __str__(self):
+        return "%s (revision %d) for %s" % (
+            self.revision.document,
+            self.revision_id,
+            self.user,
+        )
+
+
 class RevisionAkismetSubmission(AkismetSubmission):
     """
     The Akismet submission per wiki document revision.
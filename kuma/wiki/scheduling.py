@@ -0,0 +1,167 @@
+"""
+Scheduling of deferred document renders.
+
+Renders are queued in one of two lanes, each with its own celery queue (see
+``settings.WIKI_RENDER_QUEUES``): the ``interactive`` lane, for the renders
+someone is waiting for, like after an edit, and the ``bulk`` lane, for
+renders nobody is looking at yet, like ``render_document --all``. Bulk
+re-renders of the whole site then never hold up the editors.
+
+A document has at most one pending render. Scheduling a render while one is
+pending does nothing, unless the pending one is in the bulk lane and the new
+one is interactive, in which case the interactive render replaces it.
+Interactive renders are delayed by ``settings.WIKI_RENDER_COALESCE_WINDOW``
+seconds, so that a burst of edits and reloads ends up in a single render of
+the latest revision.
+
+The depth of each lane, and the age of its oldest pending render, are kept
+in the cache, with a counter of the renders scheduled and started in each
+lane, and the scheduling times of the batches of renders that are still
+waiting, and returned by ``get_queue_stats``.
+"""
+import time
+from uuid import uuid4
+
+from constance import config
+from django.conf import settings
+from django.core.cache import cache
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+# How long a render can wait in a queue, still pending and counted in the
+# stats.
+QUEUE_TIMEOUT = 60 * 60 * 24
+
+
+def get_pending_key(pk):
+    return "kuma:wiki:render-pending:{}".format(pk)
+
+
+def get_lane_key(lane, name):
+    return "kuma:wiki:render-lane:{}:{}".format(lane, name)
+
+
+def incr(key, delta=1):
+    # The counters never expire, and are created on first use.
+    cache.add(key, 0, None)
+    return cache.incr(key, delta)
+
+
+def record_scheduled(lane, count=1):
+    """Count renders added to a lane, and note when they were."""
+    last = incr(get_lane_key(lane, "scheduled"), count)
+    started = cache.get(get_lane_key(lane, "started"), 0)
+    now = time.time()
+    # The number of the first render of each batch, and when it was
+    # scheduled, for the batches that aren't all started. Two batches
+    # scheduled at the same time may lose one of them, which only makes its
+    # renders look as old as the batch before.
+    batches = cache.get(get_lane_key(lane, "batches"), [])
+    batches = [
+        (first, scheduled_at)
+        for (first, scheduled_at), (next_first, _) in zip(
+            batches, batches[1:] + [(last - count + 1, now)]
+        )
+        if next_first > started + 1 and scheduled_at > now - QUEUE_TIMEOUT
+    ]
+    batches.append((last - count + 1, now))
+    cache.set(get_lane_key(lane, "batches"), batches, QUEUE_TIMEOUT)
+
+
+def record_started(lane, count=1):
+    """Count renders taken off a lane, whether they were rendered or not."""
+    incr(get_lane_key(lane, "started"), count)
+
+
+def get_queue_stats():
+    """
+    Return the ``depth`` of each lane, and the ``age`` in seconds of the
+    oldest render in it. Renders leave the lanes in about the order they
+    were scheduled, which is what the age is based on.
+    """
+    stats = {}
+    now = time.time()
+    for lane in LANES:
+        scheduled = cache.get(get_lane_key(lane, "scheduled"), 0)
+        started = cache.get(get_lane_key(lane, "started"), 0)
+        depth = max(scheduled - started, 0)
+        oldest = None
+        if depth:
+            for first, scheduled_at in cache.get(get_lane_key(lane, "batches"), []):
+                if first > started + 1:
+                    break
+                oldest = scheduled_at
+        stats[lane] = {
+            "depth": depth,
+            "age": round(now - oldest, 1) if oldest else 0,
+        }
+    return stats
+
+
+def reset_queue_stats():
+    """Start counting from zero, like after purging the queues."""
+    cache.delete_many(
+        [
+            get_lane_key(lane, name)
+            for lane in LANES
+            for name in ("scheduled", "started", "batches")
+        ]
+    )
+
+
+def is_render_pending(pk, lane=None):
+    """Is a render of this document pending (in the given lane)?"""
+    pending = cache.get(get_pending_key(pk))
+    return bool(pending) and lane in (None, pending["lane"])
+
+
+def schedule_render(pk, cache_control=None, base_url=None, lane=INTERACTIVE):
+    """
+    Queue a render of the document with this primary key, unless one is
+    already pending, and return whether a render was queued.
+    """
+    from .tasks import render_document
+
+    pending = {"token": uuid4().hex, "lane": lane}
+    # A pending render that never started is forgotten after the same time
+    # a scheduled render is considered failed, if it's interactive, and
+    # after as long as a render can wait in a queue, if it's a bulk one.
+    # Interactive renders replace the bulk ones anyway.
+    if lane == INTERACTIVE:
+        timeout = config.KUMA_DOCUMENT_RENDER_TIMEOUT
+    else:
+        timeout = QUEUE_TIMEOUT
+    if not cache.add(get_pending_key(pk), pending, timeout):
+        current = cache.get(get_pending_key(pk))
+        if current and not (current["lane"] == BULK and lane == INTERACTIVE):
+            return False
+        cache.set(get_pending_key(pk), pending, timeout)
+
+    record_scheduled(lane)
+    render_document.apply_async(
+        (pk, cache_control, base_url),
+        {"token": pending["token"], "lane": lane},
+        queue=settings.WIKI_RENDER_QUEUES[lane],
+        countdown=settings.WIKI_RENDER_COALESCE_WINDOW if lane == INTERACTIVE else 0,
+    )
+    return True
+
+
+def start_render(pk, token, lane):
+    """
+    Take a queued render off its lane, and return whether it should go
+    ahead, which it shouldn't if another render has replaced it.
+    """
+    record_started(lane)
+    pending = cache.get(get_pending_key(pk))
+    if pending is None:
+        # Forgotten after waiting too long, but still the latest.
+        return True
+    if pending["token"] != token:
+        return False
+    # Renders scheduled from now on are for changes this one may not see.
+    cache.delete(get_pending_key(pk))
+    return True
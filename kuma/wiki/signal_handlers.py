@@ -1,11 +1,21 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
 from django.dispatch import receiver
 
+from kuma.core.utils import bump_version_token
+
 from .events import spam_attempt_email
+from .feeds import FEED_VERSION_CACHE_KEY
 from .jobs import DocumentCodeSampleJob, DocumentContributorsJob, DocumentTagsJob
-from .models import Document, DocumentSpamAttempt
-from .signals import render_done
-from .tasks import build_json_data_for_document
+from .models import (
+    Document,
+    DocumentSpamAttempt,
+    ReviewTaggedRevision,
+    Revision,
+    TaggedDocument,
+)
+from .signals import render_done, restore_done
+from .tasks import build_json_data_for_document, cache_revision_diff
 
 
 @receiver(post_save, sender=Document, dispatch_uid="wiki.document.post_save")
@@ -24,6 +34,91 @@ def on_document_save(sender, instance, **kwargs):
     code_sample_job.invalidate_generation()
 
 
+@receiver(post_save, sender=Revision, dispatch_uid="wiki.revision.post_save")
+def on_revision_save(sender, instance, created, raw, **kwargs):
+    """
+    A signal handler to precompute the diff of a new revision, once it's
+    committed.
+    """
+    if raw or not created:
+        return
+    transaction.on_commit(lambda: cache_revision_diff.delay(instance.pk))
+
+
+@receiver(post_save, sender=Revision, dispatch_uid="wiki.revision.feeds.post_save")
+@receiver(post_delete, sender=Revision, dispatch_uid="wiki.revision.feeds.post_delete")
+@receiver(post_delete, sender=Document, dispatch_uid="wiki.document.feeds.post_delete")
+@receiver(restore_done, sender=Document, dispatch_uid="wiki.document.feeds.restore")
+@receiver(
+    post_save,
+    sender=ReviewTaggedRevision,
+    dispatch_uid="wiki.review_tag.feeds.post_save",
+)
+@receiver(
+    post_delete,
+    sender=ReviewTaggedRevision,
+    dispatch_uid="wiki.review_tag.feeds.post_delete",
+)
+def invalidate_feeds(sender, instance, **kwargs):
+    """
+    A signal handler to have the cached feeds rendered again, with their
+    version bumped.
+
+    A new revision is saved before it's made the current one of its
+    document, so the document's own post_save is the one that follows all
+    the changes to the document.
+    """
+    bump_version_token(FEED_VERSION_CACHE_KEY)
+
+
+# The fields of a document that the feeds show, or select documents by
+FEED_FIELDS = (
+    "current_revision_id",
+    "title",
+    "slug",
+    "locale",
+    "parent_id",
+    "is_redirect",
+    "deleted",
+)
+
+
+def get_feed_state(document):
+    # Deferred fields are left out, rather than loaded.
+    return tuple(document.__dict__.get(name) for name in FEED_FIELDS)
+
+
+@receiver(post_init, sender=Document, dispatch_uid="wiki.document.feeds.post_init")
+def remember_feed_state(sender, instance, **kwargs):
+    instance._feed_state = get_feed_state(instance)
+
+
+@receiver(post_save, sender=Document, dispatch_uid="wiki.document.feeds.post_save")
+def invalidate_feeds_on_document_save(sender, instance, created=False, **kwargs):
+    """
+    A signal handler to invalidate the cached feeds when a document is
+    created, or saved with changes the feeds show, but not when it's only
+    rendered again, which bulk renders do to every document.
+    """
+    feed_state = get_feed_state(instance)
+    if created or feed_state != instance._feed_state:
+        invalidate_feeds(sender, instance)
+    instance._feed_state = feed_state
+
+
+@receiver(
+    m2m_changed, sender=ReviewTaggedRevision, dispatch_uid="wiki.review_tag.feeds"
+)
+@receiver(m2m_changed, sender=TaggedDocument, dispatch_uid="wiki.document_tag.feeds")
+def invalidate_feeds_on_tags(sender, instance, action, **kwargs):
+    """
+    A signal handler to invalidate the cached feeds when tags are set, which
+    set_tags does in bulk, without the post_save of each tagged item.
+    """
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_feeds(sender, instance)
+
+
 @receiver(render_done, dispatch_uid="wiki.document.render_done")
 def on_render_done(sender, instance, **kwargs):
     """
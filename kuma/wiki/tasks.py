@@ -2,38 +2,78 @@ import json
 import logging
 import textwrap
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
 
 from celery import task
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.core.mail import mail_admins
 from django.db import transaction
 
 from kuma.core.decorators import skip_in_maintenance_mode
-from kuma.core.utils import send_mail_retrying
+from kuma.core.utils import chunked, send_mail_retrying
 from kuma.users.models import User
 
-from .events import first_edit_email
+from .cleaning import clean_documents, record_progress
+from .diff import precompute_revision_diff
+from .events import edit_digest_email, first_edit_email, notification_context
 from .exceptions import PageMoveError
 from .models import (
     Document,
     DocumentDeletionLog,
     DocumentRenderingInProgress,
     DocumentSpamAttempt,
+    EditDigestEntry,
+    RenderRun,
+    RenderRunChunk,
     Revision,
     RevisionIP,
 )
+from .scheduling import (
+    BULK,
+    INTERACTIVE,
+    is_render_pending,
+    record_started,
+    start_render,
+)
+from .tidying import tidy_revisions
 
 
 log = logging.getLogger("kuma.wiki.tasks")
 
+# Documents that fail to render in a chunk of a render run are retried this
+# many times, after 1, 2, 4... times this many seconds.
+RENDER_CHUNK_MAX_RETRIES = 3
+RENDER_CHUNK_RETRY_DELAY = 60
+
+# The digests of edit notifications sent before dequeuing their edits.
+EDIT_DIGESTS_PER_BATCH = 100
+
 
 @task(rate_limit="60/m")
-@skip_in_maintenance_mode
 def render_document(
-    pk, cache_control, base_url, force=False, invalidate_cdn_cache=True
+    pk,
+    cache_control,
+    base_url,
+    force=False,
+    invalidate_cdn_cache=True,
+    token=None,
+    lane=None,
 ):
-    """Simple task wrapper for the render() method of the Document model"""
+    """
+    Simple task wrapper for the render() method of the Document model
+
+    Renders queued by kuma.wiki.scheduling come with a token, and are
+    skipped if another render of the document has replaced them.
+    """
+    # Taken off its lane even in maintenance mode, for the lane's depth to
+    # stay right.
+    if token and not start_render(pk, token, lane):
+        return None
+    if settings.MAINTENANCE_MODE:
+        return None
     document = Document.objects.get(pk=pk)
     if force:
         document.render_started_at = None
@@ -61,45 +101,86 @@ def email_document_progress(command_name, percent_complete, total):
     mail_admins(subject=subject, message=message)
 
 
-@task
+@task(bind=True, max_retries=RENDER_CHUNK_MAX_RETRIES)
 @skip_in_maintenance_mode
-def render_document_chunk(
-    pks,
-    cache_control="no-cache",
-    base_url=None,
-    force=False,
-    invalidate_cdn_cache=False,
-):
+def render_run_chunk(self, chunk_pk):
     """
-    Simple task to render a chunk of documents instead of one per each
+    Render a chunk of the documents of a render run, and record how it went.
+
+    The documents that fail to render are retried, with an exponential
+    backoff, and the documents rendered since the run started are skipped,
+    so that retries and resumed runs only render what is left.
     """
-    logger = render_document_chunk.get_logger()
-    logger.info(
-        "Starting to render document chunk: %s" % ",".join([str(pk) for pk in pks])
+    logger = render_run_chunk.get_logger()
+    chunk = RenderRunChunk.objects.select_related("run").get(pk=chunk_pk)
+    if chunk.status != RenderRunChunk.PENDING:
+        return
+    run = chunk.run
+    base_url = run.base_url or settings.SITE_URL
+    logger.info("Starting to render {}".format(chunk))
+
+    docs = Document.objects.filter(pk__in=chunk.get_pks()).exclude(
+        last_rendered_at__gte=run.created
     )
-    base_url = base_url or settings.SITE_URL
-    for pk in pks:
-        # calling the task without delay here since we want to localize
-        # the processing of the chunk in one process
-        result = render_document(
-            pk,
-            cache_control,
-            base_url,
-            force=force,
-            invalidate_cdn_cache=invalidate_cdn_cache,
-        )
-        if result:
-            logger.error(
-                "Error while rendering document %s with error: %s" % (pk, result)
+    rendered, errors = 0, []
+    for doc in docs.order_by("pk"):
+        if is_render_pending(doc.pk, INTERACTIVE):
+            # Someone is waiting for it, and it will be rendered anyway.
+            continue
+        if run.force:
+            doc.render_started_at = None
+        try:
+            doc.render(
+                run.cache_control,
+                base_url,
+                invalidate_cdn_cache=run.invalidate_cdn_cache,
             )
-    logger.info("Finished rendering of document chunk")
+        except DocumentRenderingInProgress:
+            pass
+        except Exception as e:
+            errors.append("Document {}: {!r}".format(doc.pk, e))
+        else:
+            rendered += 1
+
+    chunk.attempts += 1
+    chunk.rendered += rendered
+    chunk.errors = len(errors)
+    chunk.last_error = "\n".join(errors)
+    if errors and self.request.retries < self.max_retries:
+        chunk.save()
+        logger.info("Retrying {} documents of {}".format(len(errors), chunk))
+        raise self.retry(countdown=RENDER_CHUNK_RETRY_DELAY * 2 ** self.request.retries)
+
+    if chunk.finished is None:
+        # Taken off the lane the first time it's finished, since it was only
+        # counted in it once, when the run started, however often resumed.
+        record_started(BULK, chunk.size)
+    chunk.status = RenderRunChunk.FAILED if errors else RenderRunChunk.DONE
+    chunk.finished = datetime.now()
+    chunk.save()
+    logger.info(
+        "Finished rendering {} ({} documents rendered, {} errors)".format(
+            chunk, chunk.rendered, chunk.errors
+        )
+    )
+
+    # Send a progress email every 20% of the chunks, and at the end.
+    progress = run.get_progress()
+    done, count = progress["chunks_done"], progress["chunks"]
+    if done * 5 // count > (done - 1) * 5 // count:
+        email_document_progress.delay("render_document", done * 100 // count, run.total)
+    if done == count:
+        RenderRun.objects.filter(pk=run.pk).update(finished=datetime.now())
 
 
 @task
 @skip_in_maintenance_mode
-def clean_document_chunk(doc_pks, user_pk):
+def clean_document_chunk(doc_pks, user_pk, total=None):
     """
     Simple task to clean a chunk of documents.
+
+    When the chunk is one of a run that cleans ``total`` documents in
+    parallel chunks, a progress email is sent every 20% of the run.
     """
     logger = clean_document_chunk.get_logger()
     logger.info(
@@ -108,26 +189,28 @@ def clean_document_chunk(doc_pks, user_pk):
         )
     )
     user = User.objects.get(pk=user_pk)
-    num_cleaned = 0
-    for pk in doc_pks:
-        try:
-            doc = Document.objects.get(pk=pk)
-            logger.info("   Cleaning {!r}".format(doc))
-            rev = doc.clean_current_revision(user)
-        except Exception as e:
-            logger.info("   ...mailing error to admins")
-            subject = "Error while cleaning document {}".format(pk)
-            mail_admins(subject=subject, message=str(e))
-        else:
-            if rev is None:
-                logger.info("   ...skipped (it's already clean)")
-            else:
-                num_cleaned += 1
-                logger.info("   ...created {!r}".format(rev))
-    logger.info(
-        "Finished cleaning document chunk ({} of {} "
-        "required cleaning)".format(num_cleaned, len(doc_pks))
-    )
+    try:
+        revisions = clean_documents(doc_pks, user)
+    except Exception as e:
+        logger.info("   ...mailing error to admins")
+        subject = "Error while cleaning documents {}".format(
+            ",".join(str(pk) for pk in doc_pks)
+        )
+        mail_admins(subject=subject, message=str(e))
+    else:
+        for rev in revisions:
+            logger.info("   ...created {!r}".format(rev))
+        logger.info(
+            "Finished cleaning document chunk ({} of {} "
+            "required cleaning)".format(len(revisions), len(doc_pks))
+        )
+
+    if total:
+        done = record_progress(len(doc_pks))
+        if done * 5 // total > (done - len(doc_pks)) * 5 // total:
+            email_document_progress.delay(
+                "clean_document", min(done * 100 // total, 100), total
+            )
 
 
 @task
@@ -234,8 +317,9 @@ def move_page(locale, slug, new_slug, user_id):
     transaction.set_autocommit(True)
 
     # Now that we know the move succeeded, re-render the whole tree.
-    for moved_doc in [doc] + doc.get_descendants():
-        moved_doc.schedule_rendering("max-age=0")
+    doc.schedule_rendering("max-age=0")
+    for moved_doc in doc.get_descendants():
+        moved_doc.schedule_rendering("max-age=0", lane=BULK)
 
     subject = "Page move completed: " + slug + " (" + locale + ")"
 
@@ -293,6 +377,79 @@ def send_first_edit_email(revision_pk):
     first_edit_email(revision).send()
 
 
+@task
+@skip_in_maintenance_mode
+def send_edit_digests(frequency):
+    """
+    Send the hourly or daily digests of the edits queued for the watchers
+    who asked for them, all over a single SMTP connection.
+    """
+    frequencies = [frequency]
+    if frequency == User.EDIT_DIGEST_HOURLY:
+        # Edits queued for watchers who since went back to an email for
+        # each edit are sent with the hourly digests.
+        frequencies.append("")
+    entries = (
+        EditDigestEntry.objects.filter(user__edit_digest__in=frequencies)
+        .select_related("user", "revision__creator", "revision__document")
+        .order_by("user", "revision")
+    )
+    # The context of each revision is shared by the digests of its watchers.
+    contexts = {}
+    digests = []
+    for user, user_entries in groupby(entries, key=attrgetter("user")):
+        user_entries = list(user_entries)
+        edits = []
+        for entry in user_entries:
+            if entry.revision_id not in contexts:
+                contexts[entry.revision_id] = notification_context(
+                    entry.revision, include_diff=False
+                )
+            edits.append(contexts[entry.revision_id])
+        digests.append((edit_digest_email(user, edits), user_entries))
+    if not digests:
+        return
+
+    with mail.get_connection() as connection:
+        for chunk in chunked(digests, EDIT_DIGESTS_PER_BATCH):
+            connection.send_messages([message for message, _ in chunk])
+            # Only what was sent is dequeued, so an SMTP error leaves the
+            # rest for the next run.
+            EditDigestEntry.objects.filter(
+                pk__in=[entry.pk for _, user_entries in chunk for entry in user_entries]
+            ).delete()
+
+
+@task
+@skip_in_maintenance_mode
+def cache_revision_diff(revision_pk):
+    """
+    Compute and cache the diff between a new revision and the previous one,
+    so that the feeds and the compare view don't have to.
+    """
+    try:
+        revision = Revision.objects.select_related("document").get(pk=revision_pk)
+    except Revision.DoesNotExist:
+        # Deleted since, like the revisions of spammers.
+        return
+    precompute_revision_diff(revision)
+
+
+@task(rate_limit="30/m")
+@skip_in_maintenance_mode
+def tidy_revision_chunk(pks):
+    """
+    Tidy the content of a chunk of revisions that haven't been tidied yet,
+    and save it in a single bulk update.
+    """
+    logger = tidy_revision_chunk.get_logger()
+    count = tidy_revisions(pks)
+    logger.info(
+        "Tidied {} of {} revisions, up to ID {}".format(count, len(pks), max(pks))
+    )
+    return count
+
+
 @task
 @skip_in_maintenance_mode
 def delete_old_documentspamattempt_data(days=30):
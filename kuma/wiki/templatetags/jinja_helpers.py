@@ -5,7 +5,6 @@ from functools import lru_cache
 from urllib.parse import urlsplit, urlunparse
 
 import jinja2
-from constance import config
 from cssselect.parser import SelectorSyntaxError
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
@@ -20,6 +19,7 @@ from kuma.core.utils import safer_pyquery as pq
 
 from ..constants import DIFF_WRAP_COLUMN
 from ..content import clean_content
+from ..diff import get_revision_diff, make_diff_table
 from ..utils import tidy_content
 
 
@@ -83,20 +83,19 @@ def revisions_unified_diff(from_revision, to_revision):
     if from_revision is None or to_revision is None:
         return "Diff is unavailable."
 
-    fromfile = "[%s] #%s" % (from_revision.document.locale, from_revision.id)
-    tofile = "[%s] #%s" % (to_revision.document.locale, to_revision.id)
+    return get_revision_diff(from_revision, to_revision)["unified"]
 
-    tidy_from = from_revision.get_tidied_content()
-    tidy_to = to_revision.get_tidied_content()
 
-    return "\n".join(
-        difflib.unified_diff(
-            tidy_from.splitlines(),
-            tidy_to.splitlines(),
-            fromfile=fromfile,
-            tofile=tofile,
-        )
-    )
+@library.global_function
+def revision_diff_table(from_revision, to_revision, allow_none=False):
+    """
+    Return the (cached) HTML diff of the tidied content of two revisions, or
+    None if allow_none is set and it would have to be tidied first.
+    """
+    diff = get_revision_diff(from_revision, to_revision, allow_none=allow_none)
+    if diff is None:
+        return None
+    return jinja2.Markup(diff["table"])
 
 
 @library.global_function
@@ -108,21 +107,7 @@ def diff_table(content_from, content_to, prev_id, curr_id, tidy=False):
         content_from, errors = tidy_content(content_from)
         content_to, errors = tidy_content(content_to)
 
-    html_diff = difflib.HtmlDiff(wrapcolumn=DIFF_WRAP_COLUMN)
-    try:
-        diff = html_diff.make_table(
-            content_from.splitlines(),
-            content_to.splitlines(),
-            gettext("Revision %s") % prev_id,
-            gettext("Revision %s") % curr_id,
-            context=True,
-            numlines=config.DIFF_CONTEXT_LINES,
-        )
-    except RuntimeError:
-        # some diffs hit a max recursion error
-        message = gettext("There was an error generating the content.")
-        diff = '<div class="warning"><p>%s</p></div>' % message
-    return jinja2.Markup(diff)
+    return jinja2.Markup(make_diff_table(content_from, content_to, prev_id, curr_id))
 
 
 @library.global_function
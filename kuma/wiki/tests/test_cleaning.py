@@ -0,0 +1,98 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from mock import patch
+
+from kuma.core.tests import call_on_commit_immediately
+
+from ..cleaning import clean, clean_documents
+from ..models import Document, Revision
+
+
+DIRTY_CONTENT = "<div onclick=\"alert('hacked!')\">click me</div>"
+
+
+@pytest.fixture
+def mock_tidy_content():
+    with patch("kuma.wiki.cleaning.tidy_content") as mock_tidy_content:
+        mock_tidy_content.side_effect = lambda content: ("tidied " + content, None)
+        yield mock_tidy_content
+
+
+@pytest.fixture
+def dirty_doc(root_doc):
+    rev = root_doc.current_revision
+    rev.review_tags.set("editorial", "technical")
+    rev.localization_tags.set("inprogress")
+    # Saving the revision would clean it.
+    Revision.objects.filter(pk=rev.pk).update(
+        content=DIRTY_CONTENT, tags='"Banana" "Orange"', slug=root_doc.slug + "s"
+    )
+    root_doc.refresh_from_db()
+    Document.objects.filter(pk=root_doc.pk).update(html=DIRTY_CONTENT)
+    return root_doc
+
+
+def test_clean(mock_tidy_content):
+    assert clean("<p>Clean</p>") is None
+    assert not mock_tidy_content.called
+    assert clean(DIRTY_CONTENT) == (
+        "<div>click me</div>",
+        "tidied <div>click me</div>",
+    )
+
+
+@call_on_commit_immediately
+@patch("kuma.wiki.signal_handlers.cache_revision_diff")
+def test_clean_documents(
+    mock_cache_revision_diff, mock_tidy_content, dirty_doc, trans_doc, wiki_user_2
+):
+    prior = dirty_doc.current_revision
+    modified = dirty_doc.modified
+    revisions = clean_documents([dirty_doc.pk, trans_doc.pk], wiki_user_2)
+    # The translation was already clean.
+    assert len(revisions) == 1
+    dirty_doc.refresh_from_db()
+    rev = dirty_doc.current_revision
+    assert rev == revisions[0]
+    assert rev.pk != prior.pk
+    assert rev.creator == wiki_user_2
+    assert rev.based_on_id == prior.pk
+    assert rev.content == dirty_doc.html == "<div>click me</div>"
+    assert rev.tidied_content == "tidied <div>click me</div>"
+    assert rev.tags == prior.tags == '"Banana" "Orange"'
+    assert rev.slug == dirty_doc.slug
+    assert rev.title == dirty_doc.title
+    # Saving would have changed the modification time.
+    assert dirty_doc.modified > modified
+    assert dirty_doc.modified == rev.created
+    assert rev.comment == "Clean prior revision of {} by {}".format(
+        prior.created, prior.creator
+    )
+    assert set(rev.review_tags.names()) == {"editorial", "technical"}
+    assert set(rev.localization_tags.names()) == {"inprogress"}
+    mock_cache_revision_diff.delay.assert_called_once_with(rev.pk)
+    # Cleaning again finds nothing to clean, without bleaching again.
+    with patch("kuma.wiki.cleaning.clean_content") as mock_clean_content:
+        assert clean_documents([dirty_doc.pk, trans_doc.pk], wiki_user_2) == []
+        assert not mock_clean_content.called
+
+
+@patch("kuma.wiki.tasks.email_document_progress")
+def test_clean_all(mock_email, mock_tidy_content, dirty_doc, trans_doc):
+    out = StringIO()
+    call_command("clean_document", "--all", "--chunk-size", "1", stdout=out)
+    assert "found 2 documents" in out.getvalue()
+    dirty_doc.refresh_from_db()
+    assert dirty_doc.html == "<div>click me</div>"
+    assert dirty_doc.current_revision.creator.username == "mdnwebdocs-bot"
+    assert mock_email.delay.call_args[0] == ("clean_document", 100, 2)
+
+
+def test_clean_all_in_pool(mock_tidy_content, dirty_doc, trans_doc):
+    out = StringIO()
+    call_command("clean_document", "--all", "--processes", "2", stdout=out)
+    assert "cleaned 1 documents" in out.getvalue()
+    dirty_doc.refresh_from_db()
+    assert dirty_doc.html == "<div>click me</div>"
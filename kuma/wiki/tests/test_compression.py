@@ -0,0 +1,138 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ..compression import bulk_update, compress, decompress, is_compressed, MARKER
+from ..models import Revision
+
+
+LONG_CONTENT = (
+    '<h2 id="Syntax">Syntax</h2><pre class="brush: js notranslate">'
+    "element.addEventListener(type, listener);</pre>"
+    + "<p>An <code>EventTarget</code> method.</p>" * 20
+    + "<p>Non-ASCII: éè中文</p>"
+)
+
+
+def get_stored(rev, field):
+    """Return the value of a field as it's stored in the database."""
+    return (
+        Revision.objects.filter(pk=rev.pk)
+        .extra(select={"stored": field})
+        .values_list("stored", flat=True)[0]
+    )
+
+
+def test_compress_roundtrip():
+    compressed = compress(LONG_CONTENT)
+    assert is_compressed(compressed)
+    assert len(compressed) < len(LONG_CONTENT)
+    assert decompress(compressed) == LONG_CONTENT
+    # Compressing is idempotent.
+    assert compress(compressed) == compressed
+
+
+@pytest.mark.parametrize("value", ("", None, "<p>Short</p>"))
+def test_compress_small_values(value):
+    assert compress(value) == value
+    assert decompress(value) == value
+
+
+@pytest.mark.parametrize("setting", (False, True))
+def test_revision_storage(root_doc, wiki_user, settings, setting):
+    settings.WIKI_REVISION_COMPRESSION = setting
+    rev = Revision.objects.create(
+        document=root_doc,
+        creator=wiki_user,
+        content=LONG_CONTENT,
+        tidied_content=LONG_CONTENT,
+        title="Root Document",
+    )
+    # The value in Python is never compressed...
+    assert rev.content == LONG_CONTENT
+    rev = Revision.objects.get(pk=rev.pk)
+    assert rev.content == LONG_CONTENT
+    assert rev.get_tidied_content() == LONG_CONTENT
+    # ...but the stored value is, when compression is on.
+    assert is_compressed(get_stored(rev, "content")) == setting
+
+    # Lookups only match uncompressed revisions.
+    matches = Revision.objects.filter(content__contains="EventTarget")
+    assert matches.filter(pk=rev.pk).exists() != setting
+
+
+@pytest.mark.parametrize("setting", (False, True))
+def test_bulk_update(root_doc, settings, setting):
+    settings.WIKI_REVISION_COMPRESSION = setting
+    rev = root_doc.current_revision
+    rev.tidied_content = LONG_CONTENT
+    bulk_update([rev], ["tidied_content"])
+    assert rev.tidied_content == LONG_CONTENT
+    assert is_compressed(get_stored(rev, "tidied_content")) == setting
+    assert Revision.objects.get(pk=rev.pk).tidied_content == LONG_CONTENT
+
+
+def test_compress_revisions_command(root_doc, wiki_user, settings):
+    settings.WIKI_REVISION_COMPRESSION = False
+    small = root_doc.current_revision
+    rev = Revision.objects.create(
+        document=root_doc,
+        creator=wiki_user,
+        content=LONG_CONTENT,
+        title="Root Document",
+    )
+    assert not is_compressed(get_stored(rev, "content"))
+
+    call_command("compress_revisions", "--batch-size=1")
+    assert get_stored(rev, "content").startswith(MARKER)
+    assert get_stored(small, "content") == small.content
+    assert Revision.objects.get(pk=rev.pk).content == LONG_CONTENT
+
+    settings.WIKI_REVISION_COMPRESSION = True
+    with pytest.raises(CommandError):
+        call_command("compress_revisions", "--decompress")
+
+    settings.WIKI_REVISION_COMPRESSION = False
+    call_command("compress_revisions", "--decompress")
+    assert get_stored(rev, "content") == LONG_CONTENT
+
+
+def test_compress_revisions_command_progress(root_doc, wiki_user, settings):
+    settings.WIKI_REVISION_COMPRESSION = False
+    small = root_doc.current_revision
+    call_command("compress_revisions")
+
+    # The next run starts after the revisions converted (or too small to
+    # be) by the last one.
+    rev = Revision.objects.create(
+        document=root_doc,
+        creator=wiki_user,
+        content=LONG_CONTENT,
+        title="Root Document",
+    )
+    out = StringIO()
+    call_command("compress_revisions", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "Starting after revision ID {}".format(small.pk)
+    assert lines[-1] == "Done, converted 1 revisions"
+    assert get_stored(rev, "content").startswith(MARKER)
+
+    out = StringIO()
+    call_command("compress_revisions", stdout=out)
+    assert out.getvalue().splitlines() == [
+        "Starting after revision ID {}".format(rev.pk),
+        "Done, converted 0 revisions",
+    ]
+
+    # Decompressing starts over, and so does compressing after it.
+    call_command("compress_revisions", "--decompress")
+    assert get_stored(rev, "content") == LONG_CONTENT
+    out = StringIO()
+    call_command("compress_revisions", stdout=out)
+    assert out.getvalue().splitlines()[-1] == "Done, converted 1 revisions"
+
+    out = StringIO()
+    call_command("compress_revisions", "--restart", stdout=out)
+    assert out.getvalue().splitlines()[0].startswith("Converted 0 revisions")
@@ -0,0 +1,114 @@
+import difflib
+import re
+
+import pytest
+from django.utils import translation
+from mock import patch
+
+from kuma.core.tests import call_on_commit_immediately
+
+from ..diff import get_revision_diff, precompute_revision_diff, TrimmedHtmlDiff
+from ..models import Revision
+from ..tasks import cache_revision_diff
+
+
+def normalize(table):
+    """Drop the per-instance prefix of the anchors in a diff table."""
+    return re.sub(r"(from|to)\d+_", "", table)
+
+
+@pytest.mark.parametrize("numlines", (1, 3))
+def test_trimmed_html_diff(numlines):
+    lines_from = ["<p>Line %s</p>" % i for i in range(40)]
+    lines_to = list(lines_from)
+    lines_to[20] = "<p>Changed</p>"
+    lines_to.insert(30, "<p>Added</p>")
+
+    expected = difflib.HtmlDiff(wrapcolumn=40).make_table(
+        lines_from, lines_to, context=True, numlines=numlines
+    )
+    table = TrimmedHtmlDiff(wrapcolumn=40).make_table(
+        lines_from, lines_to, context=True, numlines=numlines
+    )
+    assert normalize(table) == normalize(expected)
+    assert ">21</td>" in table
+
+
+@pytest.fixture
+def edited_revision(create_revision, wiki_user):
+    # Store the tidied content up front, so nothing needs to be tidied.
+    Revision.objects.filter(pk=create_revision.pk).update(
+        tidied_content=create_revision.content
+    )
+    create_revision.refresh_from_db()
+    content = "<p>Getting started...</p>\n<p>More</p>"
+    return Revision.objects.create(
+        document=create_revision.document,
+        creator=wiki_user,
+        content=content,
+        tidied_content=content,
+        title="Root Document",
+    )
+
+
+def test_get_revision_diff(create_revision, edited_revision):
+    diff = get_revision_diff(create_revision, edited_revision)
+    assert diff["changed"]
+    assert "More" in diff["table"]
+    assert "+<p>More</p>" in diff["unified"]
+
+    # The diff is cached, so nothing needs tidying the second time around.
+    with patch.object(Revision, "get_tidied_content") as get_tidied_content:
+        assert get_revision_diff(create_revision, edited_revision) == diff
+    assert not get_tidied_content.called
+
+
+@patch("kuma.wiki.diff.gettext")
+def test_get_revision_diff_translated(mock_gettext, create_revision, edited_revision):
+    """The cached diff is shown in the language it's fetched in."""
+    mock_gettext.side_effect = lambda text: "[%s] %s" % (
+        translation.get_language(),
+        text,
+    )
+    with translation.override("de"):
+        diff_de = get_revision_diff(create_revision, edited_revision)
+    with translation.override("fr"):
+        diff_fr = get_revision_diff(create_revision, edited_revision)
+    assert "[de] Revision %s" % create_revision.id in diff_de["table"]
+    assert "[de] Revision %s" % edited_revision.id in diff_de["table"]
+    assert "[fr] Revision %s" % create_revision.id in diff_fr["table"]
+    assert "[de]" not in diff_fr["table"]
+    assert "<!--" not in diff_fr["table"]
+    assert diff_fr["unified"] == diff_de["unified"]
+
+
+def test_get_revision_diff_allow_none(create_revision, edited_revision):
+    with patch.object(Revision, "get_tidied_content", return_value=None):
+        assert get_revision_diff(create_revision, edited_revision, True) is None
+    assert get_revision_diff(create_revision, edited_revision, True) is not None
+
+
+def test_precompute_revision_diff(create_revision, edited_revision):
+    assert precompute_revision_diff(create_revision) is None
+    assert precompute_revision_diff(edited_revision) == get_revision_diff(
+        create_revision, edited_revision
+    )
+
+
+@call_on_commit_immediately
+@patch("kuma.wiki.signal_handlers.cache_revision_diff")
+def test_revision_save_schedules_diff(mock_task, root_doc, wiki_user):
+    revision = Revision.objects.create(
+        document=root_doc, creator=wiki_user, content="<p>More</p>", title="Root"
+    )
+    mock_task.delay.assert_called_once_with(revision.pk)
+    revision.save()
+    assert mock_task.delay.call_count == 1
+
+
+@patch("kuma.wiki.tasks.precompute_revision_diff")
+def test_cache_revision_diff_deleted_revision(mock_precompute, edited_revision):
+    pk = edited_revision.pk
+    edited_revision.delete()
+    cache_revision_diff(pk)
+    assert not mock_precompute.called
@@ -4,8 +4,10 @@
 from datetime import datetime
 from unittest import mock
 
+from django.core import mail
 from django.urls import reverse
 
+from kuma.core.email_utils import render_email
 from kuma.core.utils import order_params
 
 from ..events import (
@@ -14,7 +16,8 @@ from ..events import (
     notification_context,
     spam_attempt_email,
 )
-from ..models import DocumentSpamAttempt
+from ..models import Document, DocumentSpamAttempt, EditDigestEntry
+from ..tasks import send_edit_digests
 
 
 def test_notification_context_for_create(create_revision):
@@ -155,7 +158,7 @@ def test_edit_document_event_fires_union(mock_fire, create_revision, wiki_user):
     mock_fire.assert_called_once_with()
 
 
-@mock.patch("kuma.wiki.events.emails_with_users_and_watches")
+@mock.patch("kuma.wiki.events.emails_with_shared_body")
 def test_edit_document_event_emails_on_create(mock_emails, create_revision):
     """Test event email parameters for creation of an English page."""
     users_and_watches = [("fake_user", [None])]
@@ -163,12 +166,12 @@ def test_edit_document_event_emails_on_create(mock_emails, create_revision):
     assert mock_emails.call_count == 1
     args, kwargs = mock_emails.call_args
     assert not args
+    assert list(kwargs.pop("users_and_watches")) == users_and_watches
     assert kwargs == {
         "subject": mock.ANY,
-        "text_template": "wiki/email/edited.ltxt",
-        "html_template": None,
+        "body_template": "wiki/email/edited.ltxt",
+        "footer_template": "wiki/email/edited_footer.ltxt",
         "context_vars": notification_context(create_revision),
-        "users_and_watches": users_and_watches,
         "default_locale": "en-US",
         "headers": {
             "X-Kuma-Editor-Username": "wiki_user",
@@ -182,7 +185,7 @@ def test_edit_document_event_emails_on_create(mock_emails, create_revision):
     assert subject == expected
 
 
-@mock.patch("kuma.wiki.events.emails_with_users_and_watches")
+@mock.patch("kuma.wiki.events.emails_with_shared_body")
 def test_edit_document_event_emails_on_change(mock_emails, edit_revision):
     """Test event email parameters for changing an English page."""
     users_and_watches = [("fake_user", [None])]
@@ -197,6 +200,96 @@ def test_edit_document_event_emails_on_change(mock_emails, edit_revision):
     assert subject == expected
 
 
+@mock.patch("kuma.core.email_utils.render_email", wraps=render_email)
+def test_edit_document_event_renders_once_per_locale(
+    mock_render_email, create_revision, wiki_user, wiki_user_2, wiki_user_3
+):
+    """The body of the edit emails is rendered once for each locale."""
+    wiki_user_3.locale = "fr"
+    wiki_user_3.save()
+    doc = create_revision.document
+    users_and_watches = [
+        (user, [EditDocumentEvent.notify(user, doc)])
+        for user in (wiki_user, wiki_user_2, wiki_user_3)
+    ]
+    messages = list(EditDocumentEvent(create_revision)._mails(users_and_watches))
+    assert [message.to for message in messages] == [
+        [wiki_user.email],
+        [wiki_user_2.email],
+        [wiki_user_3.email],
+    ]
+    bodies = [
+        call[0][0]
+        for call in mock_render_email.call_args_list
+        if call[0][0] == "wiki/email/edited.ltxt"
+    ]
+    assert len(bodies) == 2
+    for message, (user, watches) in zip(messages, users_and_watches):
+        assert "wiki_user changed Root Document." in message.body
+        watch = watches[0]
+        assert "/unsubscribe/{}?s={}".format(watch.pk, watch.secret) in message.body
+
+
+def test_edit_document_event_queues_digests(create_revision, wiki_user, wiki_user_2):
+    """The watchers who asked for a digest don't get an email right away."""
+    wiki_user_2.edit_digest = "hourly"
+    wiki_user_2.save()
+    users_and_watches = [(wiki_user, [None]), (wiki_user_2, [None])]
+    messages = list(EditDocumentEvent(create_revision)._mails(users_and_watches))
+    assert [message.to for message in messages] == [[wiki_user.email]]
+    entry = EditDigestEntry.objects.get()
+    assert entry.user == wiki_user_2
+    assert entry.revision == create_revision
+
+
+def test_send_edit_digests(create_revision, wiki_user, wiki_user_2, wiki_user_3):
+    """The digests of each frequency are sent by their own task."""
+    wiki_user_2.edit_digest = "hourly"
+    wiki_user_2.save()
+    wiki_user_3.edit_digest = "daily"
+    wiki_user_3.save()
+    for user in (wiki_user, wiki_user_2, wiki_user_3):
+        EditDigestEntry.objects.create(user=user, revision=create_revision)
+
+    send_edit_digests("hourly")
+    # The edit queued for a watcher who went back to an email for each edit
+    # is sent with the hourly digests.
+    assert sorted(message.to[0] for message in mail.outbox) == sorted(
+        [wiki_user.email, wiki_user_2.email]
+    )
+    assert "wiki_user changed Root Document [en-US]." in mail.outbox[0].body
+    assert list(EditDigestEntry.objects.values_list("user", flat=True)) == [
+        wiki_user_3.pk
+    ]
+
+    send_edit_digests("daily")
+    assert mail.outbox[-1].to == [wiki_user_3.email]
+    assert not EditDigestEntry.objects.exists()
+
+
+def test_get_topic_parents_fetches_levels_in_bulk(django_assert_num_queries, root_doc):
+    """The topic parents of a document are fetched a few levels at a time."""
+    parent = root_doc
+    for level in range(6):
+        parent = Document.objects.create(
+            locale="en-US",
+            slug="{}/Child{}".format(parent.slug, level),
+            title="Child {}".format(level),
+            parent_topic=parent,
+        )
+    doc = Document.objects.get(pk=parent.pk)
+    with django_assert_num_queries(2):
+        parents = doc.get_topic_parents()
+    assert [parent.title for parent in parents] == [
+        "Child 4",
+        "Child 3",
+        "Child 2",
+        "Child 1",
+        "Child 0",
+        "Root Document",
+    ]
+
+
 def test_first_edit_email_on_create(create_revision):
     """A first edit email is formatted for a new English page."""
     mail = first_edit_email(create_revision)
@@ -1,8 +1,12 @@
 import json
 from datetime import datetime
+from io import StringIO
 from urllib.parse import parse_qs, urlparse
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import make_aware
 from pyquery import PyQuery as pq
 from pytz import AmbiguousTimeError
@@ -536,3 +540,155 @@ def test_documentjsonfeedgenerator_encode():
     dt = datetime(2017, 12, 21, 22, 25)
     assert generator._encode_complex(dt) == "2017-12-21T22:25:00"
     assert generator._encode_complex(dt.date()) is None
+
+
+def test_recent_revisions_before(create_revision, edit_revision, client, settings):
+    """The revisions feed can be paginated by ID, with a link to the next."""
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "rss"})
+    resp = client.get(feed_url, {"limit": 1})
+    assert resp.status_code == 200
+    next_url = urlparse(resp["Link"].split(";")[0].strip("<>"))
+    assert next_url.path == feed_url
+    assert parse_qs(next_url.query) == {
+        "limit": ["1"],
+        "before": [str(edit_revision.id)],
+    }
+
+    resp = client.get(feed_url, {"limit": 1, "before": edit_revision.id})
+    assert resp.status_code == 200
+    items = pq(resp.content).find("item")
+    assert len(items) == 1
+    desc_text, diff_id = extract_description(items[0])
+    assert desc_text == create_revision_rss
+    assert "Link" in resp
+
+    resp = client.get(feed_url, {"limit": 1, "before": create_revision.id})
+    assert resp.status_code == 200
+    assert len(pq(resp.content).find("item")) == 0
+    assert "Link" not in resp
+
+
+def test_recent_revisions_cached(
+    create_revision, edit_revision, client, settings, django_assert_num_queries
+):
+    """The rendered feed is cached until there's a new revision."""
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "json"})
+    resp = client.get(feed_url)
+    assert resp.status_code == 200
+    assert len(json.loads(resp.content)) == 2
+
+    with django_assert_num_queries(0):
+        resp = client.get(feed_url)
+    assert resp.status_code == 200
+    assert len(json.loads(resp.content)) == 2
+
+    edit_revision.document.revisions.create(
+        title=edit_revision.title,
+        content=edit_revision.content,
+        creator=edit_revision.creator,
+    )
+    resp = client.get(feed_url)
+    assert resp.status_code == 200
+    assert len(json.loads(resp.content)) == 3
+
+
+def test_recent_revisions_queries(create_revision, edit_revision, client, settings):
+    """The revisions feed makes as many queries for any number of items."""
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "rss"})
+
+    def count_queries(limit):
+        # Another limit each time, for a feed that isn't cached yet
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(feed_url, {"all_locales": "", "limit": limit})
+        assert resp.status_code == 200
+        return len(queries), len(pq(resp.content).find("item"))
+
+    count_queries(10)
+    num_queries, num_items = count_queries(11)
+    assert num_items == 2
+    for i in range(3):
+        revision = edit_revision.document.revisions.create(
+            title=edit_revision.title,
+            content=edit_revision.content + "<p>%s</p>" % i,
+            creator=edit_revision.creator,
+        )
+        revision.review_tags.add("technical")
+    assert count_queries(12) == (num_queries, 5)
+
+
+def test_recent_revisions_streamed(
+    create_revision, edit_revision, client, settings, monkeypatch
+):
+    """Feeds with more than a chunk of items are streamed, then cached."""
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "rss"})
+    resp = client.get(feed_url, {"limit": 5})
+    assert resp.status_code == 200
+    assert not resp.streaming
+    content = resp.content
+
+    monkeypatch.setattr("kuma.wiki.feeds.FEED_CHUNK_SIZE", 1)
+    resp = client.get(feed_url, {"limit": 2})
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert resp["Content-Type"] == "application/rss+xml; charset=utf-8"
+    assert "Last-Modified" in resp
+    streamed_content = b"".join(resp.streaming_content)
+    assert streamed_content.count(b"<item>") == 2
+    assert streamed_content == content
+
+    resp = client.get(feed_url, {"limit": 2})
+    assert resp.status_code == 200
+    assert not resp.streaming
+    assert resp.content == content
+    assert "Link" in resp
+
+
+def test_recent_revisions_streamed_json(
+    create_revision, edit_revision, client, settings, monkeypatch
+):
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    monkeypatch.setattr("kuma.wiki.feeds.FEED_CHUNK_SIZE", 1)
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "json"})
+    resp = client.get(feed_url, {"callback": "jsonp"})
+    assert resp.status_code == 200
+    assert resp.streaming
+    content = b"".join(resp.streaming_content).decode()
+    assert content.startswith("jsonp([{") and content.endswith("}])")
+    data = json.loads(content[len("jsonp(") : -1])
+    assert [item["author_name"] for item in data] == [
+        create_revision.creator.username,
+        edit_revision.creator.username,
+    ]
+
+
+def test_recent_revisions_streamed_too_large(
+    create_revision, edit_revision, client, settings, monkeypatch
+):
+    """A streamed feed is not cached if it's too large."""
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    monkeypatch.setattr("kuma.wiki.feeds.FEED_CHUNK_SIZE", 1)
+    monkeypatch.setattr("kuma.wiki.feeds.FEED_CACHE_MAX_SIZE", 100)
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "atom"})
+    for i in range(2):
+        resp = client.get(feed_url)
+        assert resp.status_code == 200
+        assert resp.streaming
+        assert b"".join(resp.streaming_content).count(b"<entry>") == 2
+
+
+def test_benchmark_feeds(create_revision, edit_revision, settings):
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    out = StringIO()
+    call_command("benchmark_feeds", "--items=2", "--items=1", "--buffered", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert [line.split(":")[0] for line in lines] == [
+        "streamed, 1 items",
+        "buffered, 1 items",
+        "streamed, 2 items",
+        "buffered, 2 items",
+    ]
+    assert all(" 2 written" in line for line in lines[2:])
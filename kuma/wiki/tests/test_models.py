@@ -1,5 +1,6 @@
 import time
 from datetime import date, datetime, timedelta
+from io import StringIO
 from unittest import mock
 from urllib.parse import urlparse
 from xml.sax.saxutils import escape
@@ -9,6 +10,7 @@ from constance import config
 from constance.test import override_config
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 
 from kuma.attachments.models import Attachment, AttachmentRevision
 from kuma.core.exceptions import ProgrammingError
@@ -25,7 +27,14 @@ from ..exceptions import (
     DocumentRenderingInProgress,
     PageMoveError,
 )
-from ..models import Document, DocumentTag, Revision, RevisionIP, TaggedDocument
+from ..models import (
+    Document,
+    DocumentAttachment,
+    DocumentTag,
+    Revision,
+    RevisionIP,
+    TaggedDocument,
+)
 from ..utils import tidy_content
 
 
@@ -111,6 +120,52 @@ def test_clean_current_revision(
     assert doc.current_revision.pk == rev.pk
 
 
+def test_revision_save_skips_clean_content(root_doc, wiki_user):
+    rev = root_doc.current_revision
+    assert rev.is_content_clean()
+    rev.pk = None
+    with mock.patch("kuma.wiki.models.clean_content") as mock_clean_content:
+        # A copy of a revision with the same content isn't bleached again.
+        rev.save()
+        assert not mock_clean_content.called
+        rev.pk = None
+        rev.content = "<p>Changed</p>"
+        mock_clean_content.return_value = "<p>Changed</p>"
+        rev.save()
+        assert mock_clean_content.call_count == 1
+    assert rev.is_content_clean()
+
+
+def test_revision_is_content_clean_after_allowlist_change(root_doc, settings):
+    rev = root_doc.current_revision
+    assert rev.is_content_clean()
+    settings.ALLOW_ALL_IFRAMES = not settings.ALLOW_ALL_IFRAMES
+    assert not rev.is_content_clean()
+
+
+def test_revision_content_cleaned(root_doc):
+    rev = root_doc.current_revision
+    dirty_content = "<div onclick=\"alert('hacked!')\">click me</div>"
+    Revision.objects.filter(pk=rev.pk).update(
+        content=dirty_content, content_digest="", cleaner_version=""
+    )
+    rev.refresh_from_db()
+    assert rev.content_cleaned == "<div>click me</div>"
+    # The cleaned content of old revisions is cached.
+    with mock.patch("kuma.wiki.models.clean_content") as mock_clean_content:
+        assert rev.content_cleaned == "<div>click me</div>"
+        assert not mock_clean_content.called
+
+
+def test_revision_content_cleaned_marks_clean(root_doc):
+    rev = root_doc.current_revision
+    Revision.objects.filter(pk=rev.pk).update(content_digest="", cleaner_version="")
+    rev.refresh_from_db()
+    assert rev.content_cleaned == rev.content
+    rev.refresh_from_db()
+    assert rev.is_content_clean()
+
+
 def test_document_is_not_experiment():
     """A document without the experiment prefix is not an experiment."""
     doc = Document(slug="test")
@@ -903,8 +958,10 @@ class DeferredRenderingTests(UserTestCase):
         config.KUMASCRIPT_TIMEOUT = 0.0
 
     @mock.patch("kuma.wiki.kumascript.get")
-    @mock.patch.object(tasks.render_document, "delay")
-    def test_schedule_rendering(self, mock_render_document_delay, mock_kumascript_get):
+    @mock.patch.object(tasks.render_document, "apply_async")
+    def test_schedule_rendering(
+        self, mock_render_document_apply_async, mock_kumascript_get
+    ):
         mock_kumascript_get.return_value = (self.rendered_content, None)
         # Scheduling for a non-deferred render should happen on the spot.
         self.d1.defer_rendering = False
@@ -914,7 +971,7 @@ class DeferredRenderingTests(UserTestCase):
         self.d1.schedule_rendering(None, "http://testserver/")
         assert self.d1.render_scheduled_at
         assert self.d1.last_rendered_at
-        assert not mock_render_document_delay.called
+        assert not mock_render_document_apply_async.called
         assert not self.d1.is_rendering_scheduled
 
         # Reset the significant fields and try a deferred render.
@@ -928,7 +985,7 @@ class DeferredRenderingTests(UserTestCase):
         self.d1.schedule_rendering(None, "http://testserver/")
         assert self.d1.render_scheduled_at
         assert not self.d1.last_rendered_at
-        assert mock_render_document_delay.called
+        assert mock_render_document_apply_async.called
 
         # And, since our mock delay() doesn't actually queue a task, this
         # document should appear to be scheduled for a pending render not yet
@@ -937,20 +994,24 @@ class DeferredRenderingTests(UserTestCase):
         assert not self.d1.is_rendering_in_progress
 
     @mock.patch("kuma.wiki.kumascript.get")
-    @mock.patch.object(tasks.render_document, "delay")
-    def test_immediate_rendering(self, mock_render_document_delay, mock_kumascript_get):
+    @mock.patch.object(tasks.render_document, "apply_async")
+    def test_immediate_rendering(
+        self, mock_render_document_apply_async, mock_kumascript_get
+    ):
         """Rendering is immediate when defer_rendering is False"""
         mock_kumascript_get.return_value = (self.rendered_content, None)
-        mock_render_document_delay.side_effect = Exception("Should not be called")
+        mock_render_document_apply_async.side_effect = Exception("Should not be called")
         self.d1.rendered_html = ""
         self.d1.defer_rendering = False
         self.d1.save()
         result_rendered, _ = self.d1.get_rendered(None, "http://testserver/")
-        assert not mock_render_document_delay.called
+        assert not mock_render_document_apply_async.called
 
     @mock.patch("kuma.wiki.kumascript.get")
-    @mock.patch.object(tasks.render_document, "delay")
-    def test_deferred_rendering(self, mock_render_document_delay, mock_kumascript_get):
+    @mock.patch.object(tasks.render_document, "apply_async")
+    def test_deferred_rendering(
+        self, mock_render_document_apply_async, mock_kumascript_get
+    ):
         """Rendering is deferred when defer_rendering is True."""
         mock_kumascript_get.side_effect = Exception("Should not be called")
         self.d1.rendered_html = ""
@@ -958,7 +1019,7 @@ class DeferredRenderingTests(UserTestCase):
         self.d1.save()
         with pytest.raises(DocumentRenderedContentNotAvailable):
             self.d1.get_rendered(None, "http://testserver/")
-        assert mock_render_document_delay.called
+        assert mock_render_document_apply_async.called
 
     @mock.patch("kuma.wiki.kumascript.get")
     def test_errors_stored_correctly(self, mock_kumascript_get):
@@ -1734,3 +1795,55 @@ class AttachmentTests(UserTestCase):
         assert 2 == attachments.count()
         assert attachment == attachments[0].file
         assert attachment2 == attachments[1].file
+
+    def test_populate_syncs_relations(self):
+        attachment, attachment_revision = self.new_attachment()
+        attachment2, attachment_revision2 = self.new_attachment()
+        attachment3, attachment_revision3 = self.new_attachment()
+        doc = document(html=attachment.get_file_url(), save=True)
+        doc.populate_attachments()
+        DocumentAttachment.objects.create(
+            file=attachment2, document=doc, is_original=True, is_linked=True
+        )
+        DocumentAttachment.objects.create(file=attachment3, document=doc)
+        doc.html = attachment3.get_file_url()
+        # A query each for the relations and the attachments, and one each to
+        # delete and to update relations.
+        with self.assertNumQueries(4):
+            populated = doc.populate_attachments()
+        assert [(relation.file, created) for relation, created in populated] == [
+            (attachment3, False)
+        ]
+        relations = {relation.file: relation for relation in doc.attached_files.all()}
+        # The original upload is kept, but isn't linked anymore.
+        assert set(relations) == {attachment2, attachment3}
+        assert not relations[attachment2].is_linked
+        assert relations[attachment3].is_linked
+        assert relations[attachment3].name == attachment_revision3.filename
+
+    def test_populate_attachments_command(self):
+        attachment, attachment_revision = self.new_attachment()
+        attachment2, attachment_revision2 = self.new_attachment(
+            mindtouch_attachment_id=667
+        )
+        deki_url = "%s%s/@api/deki/files/667/=" % (
+            settings.PROTOCOL,
+            settings.ATTACHMENT_HOST,
+        )
+        fr_doc = document(locale="fr", html=attachment.get_file_url(), save=True)
+        en_doc = document(
+            html="%s %s" % (attachment.get_file_url(), deki_url), save=True
+        )
+        out = StringIO()
+        call_command("populate_attachments", "--chunk-size", "1", stdout=out)
+        assert "Attached files to documents" in out.getvalue()
+        relations = {
+            (relation.file, relation.document): relation.is_original
+            for relation in DocumentAttachment.objects.all()
+        }
+        # The English document is the one the attachment was uploaded to.
+        assert relations == {
+            (attachment, en_doc): True,
+            (attachment, fr_doc): False,
+            (attachment2, en_doc): True,
+        }
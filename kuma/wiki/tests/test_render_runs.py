@@ -0,0 +1,133 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from mock import patch
+
+from ..models import Document, RenderRun, RenderRunChunk
+from ..scheduling import BULK, get_queue_stats, record_scheduled, schedule_render
+from ..tasks import render_run_chunk
+
+
+@pytest.fixture
+def docs(root_doc, create_revision, trans_doc, redirect_doc):
+    return list(Document.objects.order_by("pk"))
+
+
+def test_start(docs):
+    pks = [doc.pk for doc in docs]
+    assert len(pks) == 3
+    run = RenderRun.start(reversed(pks), chunk_size=2, concurrency=2)
+    assert run.total == 3
+    chunks = list(run.chunks.all())
+    assert [chunk.get_pks() for chunk in chunks] == [pks[:2], pks[2:]]
+    assert [chunk.size for chunk in chunks] == [2, 1]
+    progress = run.get_progress()
+    assert progress["chunks"] == 2
+    assert progress["done"] == 0
+    assert progress["eta"] is None
+
+
+@patch("kuma.wiki.tasks.email_document_progress")
+@patch("kuma.wiki.models.Document.render", autospec=True)
+def test_render_all(mock_render, mock_email, docs):
+    out = StringIO()
+    call_command("render_document", "--all", "--chunk-size", "1", stdout=out)
+    run = RenderRun.objects.get()
+    assert "--status {}".format(run.pk) in out.getvalue()
+    assert sorted(call[0][0].pk for call in mock_render.call_args_list) == [
+        doc.pk for doc in docs
+    ]
+    run.refresh_from_db()
+    assert run.finished
+    assert run.concurrency == 4
+    progress = run.get_progress()
+    assert progress["done"] == progress["rendered"] == len(docs)
+    assert progress["chunks_done"] == len(docs)
+    assert progress["errors"] == 0
+    # A progress email every 20%, the last one at 100%.
+    assert mock_email.delay.call_args[0] == ("render_document", 100, len(docs))
+    assert get_queue_stats()[BULK]["depth"] == 0
+
+    out = StringIO()
+    call_command("render_document", "--status", str(run.pk), stdout=out)
+    assert "finished" in out.getvalue()
+
+
+def test_render_chunk_retries(root_doc, create_revision):
+    attempts = []
+
+    def render(doc, *args, **kwargs):
+        attempts.append(doc.pk)
+        if len(attempts) == 1:
+            raise Exception("Kumascript is down")
+        Document.objects.filter(pk=doc.pk).update(last_rendered_at=doc.modified)
+
+    run = RenderRun.start([root_doc.pk])
+    chunk = run.chunks.get()
+    with patch("kuma.wiki.models.Document.render", autospec=True) as mock_render:
+        mock_render.side_effect = render
+        render_run_chunk.apply((chunk.pk,))
+    chunk.refresh_from_db()
+    assert attempts == [root_doc.pk, root_doc.pk]
+    assert chunk.status == RenderRunChunk.DONE
+    assert chunk.attempts == 2
+    assert chunk.rendered == 1
+    assert chunk.errors == 0
+
+
+@patch("kuma.wiki.models.Document.render", autospec=True)
+def test_failed_chunk_resume(mock_render, root_doc):
+    mock_render.side_effect = Exception("Kumascript is down")
+    run = RenderRun.start([root_doc.pk])
+    record_scheduled(BULK, run.total)
+    run.dispatch()
+    chunk = run.chunks.get()
+    assert chunk.status == RenderRunChunk.FAILED
+    assert get_queue_stats()[BULK]["depth"] == 0
+    assert chunk.attempts == 4
+    assert "Kumascript is down" in chunk.last_error
+
+    out = StringIO()
+    call_command("render_document", "--status", str(run.pk), stdout=out)
+    assert "1 failed" in out.getvalue()
+    assert "Kumascript is down" in out.getvalue()
+
+    mock_render.side_effect = None
+    out = StringIO()
+    call_command("render_document", "--resume", str(run.pk), stdout=out)
+    assert "1 chunks left" in out.getvalue()
+    chunk.refresh_from_db()
+    assert chunk.status == RenderRunChunk.DONE
+    assert chunk.rendered == 1
+    # The resumed chunk was only taken off the lane once.
+    record_scheduled(BULK)
+    assert get_queue_stats()[BULK]["depth"] == 1
+
+
+@patch("kuma.wiki.models.Document.render", autospec=True)
+def test_render_chunk_skips_done_documents(mock_render, root_doc, create_revision):
+    run = RenderRun.start([root_doc.pk])
+    # Rendered since the run started, like by an earlier attempt.
+    Document.objects.filter(pk=root_doc.pk).update(last_rendered_at=run.created)
+    render_run_chunk.apply((run.chunks.get().pk,))
+    assert not mock_render.called
+    assert run.chunks.get().status == RenderRunChunk.DONE
+
+
+@patch("kuma.wiki.tasks.render_document.apply_async")
+@patch("kuma.wiki.models.Document.render", autospec=True)
+def test_render_chunk_skips_pending_interactive(
+    mock_render, mock_apply_async, root_doc
+):
+    schedule_render(root_doc.pk)
+    run = RenderRun.start([root_doc.pk])
+    render_run_chunk.apply((run.chunks.get().pk,))
+    assert not mock_render.called
+
+
+@pytest.mark.django_db
+def test_unknown_run():
+    with pytest.raises(CommandError):
+        call_command("render_document", "--status", "404")
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from mock import patch
+
+from .. import tasks
+from ..scheduling import (
+    BULK,
+    get_queue_stats,
+    INTERACTIVE,
+    is_render_pending,
+    record_scheduled,
+    record_started,
+    schedule_render,
+)
+
+
+@pytest.fixture
+def mock_apply_async():
+    with patch.object(tasks.render_document, "apply_async") as mock_apply_async:
+        yield mock_apply_async
+
+
+def test_schedule_render_coalesces(root_doc, mock_apply_async, settings):
+    settings.WIKI_RENDER_COALESCE_WINDOW = 2.0
+    assert schedule_render(root_doc.pk, "max-age=0")
+    # A render is already pending, so the others are coalesced into it.
+    assert not schedule_render(root_doc.pk, "max-age=0")
+    assert not schedule_render(root_doc.pk, lane=BULK)
+    assert mock_apply_async.call_count == 1
+    args, kwargs = mock_apply_async.call_args
+    assert args[0] == (root_doc.pk, "max-age=0", None)
+    assert args[1]["lane"] == INTERACTIVE
+    assert kwargs == {"queue": "mdn_wiki", "countdown": 2.0}
+    assert is_render_pending(root_doc.pk, INTERACTIVE)
+    assert get_queue_stats()[INTERACTIVE]["depth"] == 1
+
+
+def test_interactive_render_replaces_bulk(root_doc, mock_apply_async):
+    assert schedule_render(root_doc.pk, lane=BULK)
+    bulk_token = mock_apply_async.call_args[0][1]["token"]
+    assert mock_apply_async.call_args[1] == {"queue": "mdn_wiki_bulk", "countdown": 0}
+    assert schedule_render(root_doc.pk)
+    token = mock_apply_async.call_args[0][1]["token"]
+    assert mock_apply_async.call_args[1]["queue"] == "mdn_wiki"
+
+    # The replaced render is skipped, and only the latest one is rendered.
+    with patch("kuma.wiki.tasks.Document.render") as mock_render:
+        tasks.render_document(root_doc.pk, None, None, token=bulk_token, lane=BULK)
+        assert not mock_render.called
+        tasks.render_document(root_doc.pk, None, None, token=token, lane=INTERACTIVE)
+        assert mock_render.called
+    assert not is_render_pending(root_doc.pk)
+    # Both were taken off their lanes.
+    assert get_queue_stats() == {
+        INTERACTIVE: {"depth": 0, "age": 0},
+        BULK: {"depth": 0, "age": 0},
+    }
+
+
+def test_schedule_render_eager(root_doc):
+    # Renders queued eagerly are started, and no longer pending.
+    with patch("kuma.wiki.tasks.Document.render") as mock_render:
+        assert schedule_render(root_doc.pk)
+        assert mock_render.called
+    assert not is_render_pending(root_doc.pk)
+    assert schedule_render(root_doc.pk)
+
+
+@patch("kuma.wiki.scheduling.time.time")
+def test_queue_stats(mock_time):
+    mock_time.return_value = 1000.0
+    record_scheduled(BULK, 3)
+    mock_time.return_value = 1010.0
+    record_scheduled(BULK)
+    record_scheduled(INTERACTIVE)
+    mock_time.return_value = 1030.0
+    assert get_queue_stats() == {
+        INTERACTIVE: {"depth": 1, "age": 20.0},
+        BULK: {"depth": 4, "age": 30.0},
+    }
+    record_started(BULK, 3)
+    record_started(INTERACTIVE)
+    assert get_queue_stats() == {
+        INTERACTIVE: {"depth": 0, "age": 0},
+        BULK: {"depth": 1, "age": 20.0},
+    }
+
+    call_command("render_queue_stats", "--reset")
+    assert get_queue_stats()[BULK] == {"depth": 0, "age": 0}
+
+
+@patch("kuma.wiki.scheduling.time.time")
+def test_queue_stats_batches(mock_time):
+    mock_time.return_value = 1000.0
+    for _ in range(100):
+        record_scheduled(BULK)
+        record_started(BULK)
+    # Only the scheduling times of the batches still waiting are kept.
+    assert cache.get("kuma:wiki:render-lane:bulk:batches") == [(100, 1000.0)]
+    mock_time.return_value = 1005.0
+    record_scheduled(BULK, 10)
+    mock_time.return_value = 1010.0
+    assert get_queue_stats()[BULK] == {"depth": 10, "age": 5.0}
+
+
+def test_pending_bulk_render_outlives_render_timeout(root_doc, mock_apply_async):
+    now = time.time()
+    assert schedule_render(root_doc.pk, lane=BULK)
+    # Long after a render is considered failed, the bulk render is still
+    # queued, and still pending.
+    with patch("time.time", return_value=now + 60 * 60):
+        assert not schedule_render(root_doc.pk, lane=BULK)
+        assert is_render_pending(root_doc.pk, BULK)
+        assert schedule_render(root_doc.pk)
+    # Interactive renders are forgotten sooner.
+    with patch("time.time", return_value=now + 2 * 60 * 60):
+        assert schedule_render(root_doc.pk)
+    assert mock_apply_async.call_count == 3
+
+
+def test_render_in_maintenance_mode_leaves_lane(root_doc, mock_apply_async, settings):
+    assert schedule_render(root_doc.pk, lane=BULK)
+    token = mock_apply_async.call_args[0][1]["token"]
+    settings.MAINTENANCE_MODE = True
+    with patch("kuma.wiki.tasks.Document.render") as mock_render:
+        tasks.render_document(root_doc.pk, None, None, token=token, lane=BULK)
+        assert not mock_render.called
+    assert get_queue_stats()[BULK]["depth"] == 0
+    assert not is_render_pending(root_doc.pk)
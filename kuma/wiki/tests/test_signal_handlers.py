@@ -1,5 +1,10 @@
 from unittest import mock
 
+import pytest
+
+from kuma.core.managers import set_tags
+
+from ..feeds import FEED_VERSION_CACHE_KEY
 from ..models import Document, Revision
 from ..signals import render_done
 
@@ -34,3 +39,61 @@ def test_render_signal_doc_deleted(build_json_task, root_doc):
     root_doc.deleted = True
     render_done.send(sender=Document, instance=root_doc, invalidate_cdn_cache=False)
     assert not build_json_task.delay.called
+
+
+@pytest.mark.parametrize(
+    "change",
+    (
+        "create_document",
+        "move_document",
+        "make_revision_current",
+        "restore_document",
+        "delete_document",
+        "set_review_tags",
+        "set_document_tags",
+        "add_review_tags",
+    ),
+)
+@mock.patch("kuma.wiki.signal_handlers.bump_version_token")
+def test_feeds_invalidated(mock_bump, root_doc, change):
+    """The cached feeds are invalidated by the changes they show."""
+    revision = root_doc.current_revision
+    if change == "restore_document":
+        Document.objects.filter(pk=root_doc.pk).update(deleted=True)
+        root_doc.deleted = True
+    elif change == "make_revision_current":
+        revision = Revision.objects.create(
+            document=root_doc,
+            creator=revision.creator,
+            content="<p>Edited</p>",
+            title=root_doc.title,
+            is_approved=False,
+        )
+    mock_bump.reset_mock()
+    if change == "create_document":
+        Document.objects.create(locale="fr", slug="Racine", title="Racine")
+    elif change == "move_document":
+        root_doc.slug = "Moved"
+        root_doc.save()
+    elif change == "make_revision_current":
+        revision.make_current()
+    elif change == "restore_document":
+        root_doc.restore()
+    elif change == "delete_document":
+        root_doc.delete()
+    elif change == "set_review_tags":
+        set_tags(revision.review_tags, "technical")
+    elif change == "set_document_tags":
+        set_tags(root_doc.tags, "foo")
+    else:
+        revision.review_tags.add("editorial")
+    mock_bump.assert_called_with(FEED_VERSION_CACHE_KEY)
+
+
+@mock.patch("kuma.wiki.signal_handlers.bump_version_token")
+def test_feeds_not_invalidated_by_render(mock_bump, root_doc):
+    """Saving a document without changes the feeds show keeps them."""
+    root_doc = Document.objects.get(pk=root_doc.pk)
+    root_doc.rendered_html = "<p>Rendered</p>"
+    root_doc.save()
+    assert not mock_bump.called
@@ -0,0 +1,104 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from mock import patch
+from pyquery import PyQuery as pq
+
+from kuma.core.urlresolvers import reverse
+
+from ..models import Revision
+from ..tidying import get_checkpoint, iter_untidied_chunks, set_checkpoint
+
+
+def fake_tidy_content(content):
+    return "<tidy>%s</tidy>" % content, []
+
+
+@pytest.fixture
+def untidied_revisions(root_doc, wiki_user):
+    Revision.objects.filter(pk=root_doc.current_revision.pk).update(
+        tidied_content=root_doc.current_revision.content
+    )
+    return [
+        Revision.objects.create(
+            document=root_doc,
+            creator=wiki_user,
+            content="<p>Revision %s</p>" % i,
+            title="Root Document",
+        )
+        for i in range(5)
+    ]
+
+
+def test_iter_untidied_chunks(untidied_revisions):
+    pks = [rev.pk for rev in untidied_revisions]
+    assert list(iter_untidied_chunks(chunk_size=2)) == [pks[:2], pks[2:4], pks[4:]]
+    assert list(iter_untidied_chunks(start_pk=pks[2], chunk_size=2)) == [pks[3:]]
+
+
+@patch("kuma.wiki.tidying.tidy_content", side_effect=fake_tidy_content)
+def test_tidy_revisions_command(mock_tidy, untidied_revisions):
+    call_command("tidy_revisions", "--chunk-size", "2")
+    for rev in untidied_revisions:
+        rev.refresh_from_db()
+        assert rev.tidied_content == "<tidy>%s</tidy>" % rev.content
+    assert mock_tidy.call_count == len(untidied_revisions)
+    # The checkpoint is cleared once done, and nothing is tidied twice.
+    assert get_checkpoint() == 0
+    call_command("tidy_revisions")
+    assert mock_tidy.call_count == len(untidied_revisions)
+
+
+@patch("kuma.wiki.tidying.tidy_content", side_effect=fake_tidy_content)
+def test_tidy_revisions_command_resumes(mock_tidy, untidied_revisions):
+    set_checkpoint(untidied_revisions[2].pk)
+    call_command("tidy_revisions")
+    assert mock_tidy.call_count == 2
+    assert Revision.objects.filter(tidied_content="").count() == 3
+
+    set_checkpoint(untidied_revisions[2].pk)
+    call_command("tidy_revisions", "--restart")
+    assert not Revision.objects.filter(tidied_content="").exists()
+
+
+@patch("kuma.wiki.tidying.tidy_content")
+def test_tidy_revisions_command_failures(mock_tidy, untidied_revisions):
+    """The revisions that tidy fails on are skipped, and not saved."""
+    failed_pk = untidied_revisions[1].pk
+
+    def tidy_content(content):
+        if content == untidied_revisions[1].content:
+            return "", []
+        return fake_tidy_content(content)
+
+    mock_tidy.side_effect = tidy_content
+    out = StringIO()
+    call_command("tidy_revisions", "--chunk-size", "2", stdout=out)
+    assert mock_tidy.call_count == len(untidied_revisions)
+    assert list(
+        Revision.objects.filter(tidied_content="").values_list("pk", flat=True)
+    ) == [failed_pk]
+    lines = out.getvalue().splitlines()
+    assert "Done, tidied 4 revisions" in lines
+    assert "1 revisions are still untidied" in lines
+
+
+@patch("kuma.wiki.tidying.tidy_content", side_effect=fake_tidy_content)
+def test_tidy_revisions_command_celery(mock_tidy, untidied_revisions):
+    call_command("tidy_revisions", "--celery", "--chunk-size", "3")
+    assert mock_tidy.call_count == len(untidied_revisions)
+    assert not Revision.objects.filter(tidied_content="").exists()
+
+
+@patch("kuma.wiki.feeds.get_revision_diffs")
+def test_revisions_feed_without_tidying(
+    mock_diff, create_revision, edit_revision, client, settings
+):
+    settings.WIKI_TIDY_REVISIONS_IN_REQUEST = False
+    mock_diff.return_value = {}
+    feed_url = reverse("wiki.feeds.recent_revisions", kwargs={"format": "rss"})
+    resp = client.get(feed_url)
+    assert resp.status_code == 200
+    assert len(pq(resp.content).find("item")) == 2
+    assert mock_diff.call_args[1] == {"allow_none": True}
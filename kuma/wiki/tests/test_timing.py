@@ -0,0 +1,114 @@
+from io import StringIO
+
+import pytest
+from constance.test import override_config
+from django.core.management import call_command
+from mock import patch
+
+from kuma.core.urlresolvers import reverse
+
+from ..models import DocumentRenderStats
+from ..timing import get_bucket, phase, RenderTimer
+
+
+@patch("kuma.wiki.timing.time.perf_counter")
+def test_render_timer_nested_phases(mock_perf_counter):
+    mock_perf_counter.side_effect = [0.0, 1.0, 3.5, 4.0, 4.0, 10.0]
+    timer = RenderTimer()
+    with timer.activate():
+        with timer.phase("kumascript"):
+            with phase("clean"):
+                pass
+        with phase("save"):
+            pass
+    # The time of the nested clean isn't counted as kumascript time.
+    assert timer.times == {
+        "kumascript": 1.5,
+        "clean": 2.5,
+        "fields": 0.0,
+        "save": 6.0,
+    }
+    assert timer.total == 10.0
+    # Without a timer in progress, phases aren't timed.
+    with phase("clean"):
+        pass
+
+
+@pytest.mark.parametrize(
+    "seconds,bucket", ((0.0, 0), (0.1, 0), (0.3, 2), (29.0, 7), (100.0, 8))
+)
+def test_get_bucket(seconds, bucket):
+    assert get_bucket(seconds) == bucket
+
+
+@override_config(KUMASCRIPT_TIMEOUT=1.0, KUMA_DOCUMENT_DEFERRED_RELEASE_COUNT=2)
+@patch("kuma.wiki.kumascript.get")
+def test_render_records_stats(mock_kumascript_get, root_doc):
+    mock_kumascript_get.return_value = ("<p>Rendered</p>", None)
+    root_doc.defer_rendering = True
+    root_doc.save()
+
+    root_doc.render()
+    stats = DocumentRenderStats.objects.get(document=root_doc)
+    assert stats.render_count == 1
+    assert stats.fast_render_count == 1
+    assert stats.total_time > 0
+    assert stats.max_total_time == stats.total_time
+    histogram = stats.get_histogram()
+    assert sorted(histogram) == ["clean", "fields", "kumascript", "save", "total"]
+    assert all(sum(counts) == 1 for counts in histogram.values())
+    # Still deferred, until enough renders in a row are fast.
+    assert root_doc.defer_rendering
+
+    root_doc.render()
+    root_doc.refresh_from_db()
+    assert not root_doc.defer_rendering
+    assert root_doc.render_stats.render_count == 2
+
+
+@override_config(
+    KUMASCRIPT_TIMEOUT=1.0,
+    KUMA_DOCUMENT_FORCE_DEFERRED_TIMEOUT=0.0,
+    KUMA_DOCUMENT_DEFERRED_RELEASE_COUNT=2,
+)
+@patch("kuma.wiki.kumascript.get")
+def test_slow_render_resets_fast_renders(mock_kumascript_get, root_doc):
+    mock_kumascript_get.return_value = ("<p>Rendered</p>", None)
+    DocumentRenderStats.objects.create(document=root_doc, fast_render_count=1)
+    root_doc.render()
+    root_doc.refresh_from_db()
+    assert root_doc.defer_rendering
+    assert root_doc.render_stats.fast_render_count == 0
+
+
+def test_slowest_documents(root_doc, create_revision, trans_doc):
+    DocumentRenderStats.objects.create(
+        document=root_doc, total_time=1.5, kumascript_time=1.0, render_count=3
+    )
+    DocumentRenderStats.objects.create(
+        document=trans_doc, total_time=0.5, kumascript_time=2.0, render_count=1
+    )
+    out = StringIO()
+    call_command("slowest_documents", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 3
+    assert lines[1].endswith(root_doc.get_absolute_url())
+    assert lines[2].endswith(trans_doc.get_absolute_url())
+
+    out = StringIO()
+    call_command("slowest_documents", "--sort", "kumascript_time", stdout=out)
+    assert out.getvalue().splitlines()[1].endswith(trans_doc.get_absolute_url())
+
+
+def test_render_stats_admin(admin_client, root_doc):
+    stats = DocumentRenderStats.objects.create(document=root_doc, total_time=1.5)
+    response = admin_client.get(
+        reverse("admin:wiki_documentrenderstats_changelist"), HTTP_HOST="wiki.test"
+    )
+    assert response.status_code == 200
+    response = admin_client.get(
+        reverse("admin:wiki_documentrenderstats_change", args=(stats.pk,)),
+        HTTP_HOST="wiki.test",
+    )
+    assert response.status_code == 200
+    assert b"&lt; 0.1s" in response.content
@@ -253,6 +253,7 @@ def test_kumascript_error_reporting(
         KUMASCRIPT_MAX_AGE=600,
         KUMA_DOCUMENT_FORCE_DEFERRED_TIMEOUT=10.0,
         KUMA_DOCUMENT_RENDER_TIMEOUT=180.0,
+        KUMA_DOCUMENT_DEFERRED_RELEASE_COUNT=5,
     )
     mock_ks_config = mock.patch("kuma.wiki.kumascript.config", **ks_settings)
     with mock_ks_config:
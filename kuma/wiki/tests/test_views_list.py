@@ -1,12 +1,14 @@
 import pytest
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from pyquery import PyQuery as pq
 
 from kuma.core.tests import assert_shared_cache_header
 from kuma.core.urlresolvers import reverse
 from kuma.core.utils import urlparams
 
-from ..models import Document
+from ..models import Document, Revision
 
 
 @pytest.mark.parametrize("http_method", ["put", "post", "delete", "options", "head"])
@@ -335,3 +337,83 @@ def test_list_with_localization_tags(redirect_doc, doc_hierarchy, client, locale
     selector = 'ul.document-list li a[href="/{}/docs/{}"]'
     for doc in exp_docs:
         assert len(dom.find(selector.format(doc.locale, doc.slug))) == 1
+
+
+LIST_VIEWS = {
+    "all_documents": (None, {}),
+    "tag": ({"tag": "listed"}, {"tags": ["listed"]}),
+    "errors": (None, {"rendered_errors": "bad render"}),
+    "without_parent": (None, {}),
+    "top_level": (None, {}),
+    "list_review": (None, {"review_tags": ["technical"]}),
+    "list_review_tag": ({"tag": "technical"}, {"review_tags": ["technical"]}),
+    "list_with_localization_tags": (None, {"localization_tags": ["inprogress"]}),
+    "list_with_localization_tag": (
+        {"tag": "inprogress"},
+        {"localization_tags": ["inprogress"]},
+    ),
+}
+
+
+def create_listed_docs(
+    wiki_user, start, count, tags=(), review_tags=(), localization_tags=(), **fields
+):
+    """Create documents for the lists, without a stored summary."""
+    for i in range(start, start + count):
+        doc = Document.objects.create(
+            locale="en-US", slug="Listed%s" % i, title="Listed %s" % i, **fields
+        )
+        revision = Revision.objects.create(
+            document=doc,
+            creator=wiki_user,
+            content="<p>Listed document %s</p>" % i,
+            title=doc.title,
+        )
+        doc.tags.set(*tags)
+        revision.review_tags.set(*review_tags)
+        revision.localization_tags.set(*localization_tags)
+    # As for the documents that were saved before summaries were stored
+    Document.objects.update(summary_text=None)
+
+
+@pytest.mark.parametrize("endpoint", sorted(LIST_VIEWS))
+def test_list_queries(db, wiki_user, client, endpoint):
+    """The lists of documents make as many queries for any number of them."""
+    kwargs, fields = LIST_VIEWS[endpoint]
+    url = reverse("wiki.{}".format(endpoint), kwargs=kwargs)
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(url, HTTP_HOST=settings.WIKI_HOST)
+        assert resp.status_code == 200
+        # The paginator's count, for the template too
+        assert sum("COUNT(" in query["sql"] for query in queries) == 1
+        return len(queries), len(pq(resp.content).find(".document-list li"))
+
+    create_listed_docs(wiki_user, 0, 1, **fields)
+    count_queries()
+    num_queries, num_docs = count_queries()
+    assert num_docs == 1
+    create_listed_docs(wiki_user, 1, 4, **fields)
+    assert count_queries() == (num_queries, 5)
+
+
+def test_list_count_cached(root_doc, wiki_user, client, monkeypatch):
+    """The count of a long list is cached."""
+    monkeypatch.setattr("kuma.wiki.views.list.DOCUMENTS_COUNT_CACHE_MIN", 2)
+    url = reverse("wiki.all_documents")
+
+    def get_counter():
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(url, HTTP_HOST=settings.WIKI_HOST)
+        assert resp.status_code == 200
+        num_counts = sum("COUNT(" in query["sql"] for query in queries)
+        return num_counts, pq(resp.content).find("#document-list p").eq(0).text()
+
+    # Too short to be cached
+    assert get_counter() == (1, "Found 1 document.")
+    assert get_counter() == (1, "Found 1 document.")
+    create_listed_docs(wiki_user, 0, 1)
+    assert get_counter() == (1, "Found 2 documents")
+    create_listed_docs(wiki_user, 1, 1)
+    assert get_counter() == (0, "Found 2 documents")
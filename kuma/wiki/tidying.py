@@ -0,0 +1,89 @@
+"""
+Backfill of the tidied content of revisions.
+
+``Revision.get_tidied_content`` tidies the content of a revision the first
+time it's needed, in the request that needs it, and new revisions are
+tidied when they are saved, but most old revisions have never been tidied.
+The ``tidy_revisions`` command tidies them in bulk, in primary key order,
+either in a local process pool or in parallel celery tasks. Once it's done,
+``settings.WIKI_TIDY_REVISIONS_IN_REQUEST`` can be turned off.
+"""
+import logging
+
+from django.core.cache import cache
+
+from .compression import bulk_update
+from .models import Revision
+from .utils import tidy_content
+
+
+log = logging.getLogger("kuma.wiki.tidying")
+
+CHECKPOINT_CACHE_KEY = "kuma:wiki:tidy-revisions:last-pk"
+CHECKPOINT_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def get_untidied_revisions():
+    """Return the revisions that still need tidying, in primary key order."""
+    # Empty values are never compressed, so the lookup works either way.
+    return Revision.objects.filter(tidied_content="").order_by("pk")
+
+
+def iter_untidied_chunks(start_pk=0, chunk_size=100):
+    """
+    Yield the primary keys of the revisions that still need tidying, after
+    ``start_pk``, ``chunk_size`` at a time.
+    """
+    pks = get_untidied_revisions().values_list("pk", flat=True)
+    last_pk = start_pk
+    while True:
+        chunk = list(pks.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def tidy(content):
+    # A module-level function, so that it can be sent to pool processes.
+    tidied_content, _ = tidy_content(content)
+    return tidied_content or ""
+
+
+def tidy_revisions(pks, pool=None):
+    """
+    Tidy the revisions with the given primary keys that still need it, and
+    return how many were tidied.
+
+    The revisions that tidy fails on are left untidied, and the backfill,
+    which goes on by primary key, moves past them.
+
+    pool -- A ``multiprocessing`` pool to tidy the content in. Only the
+            content is sent to the pool; the database is only ever queried,
+            and updated in bulk, by the calling process.
+    """
+    revisions = list(get_untidied_revisions().filter(pk__in=pks).only("id", "content"))
+    contents = [rev.content for rev in revisions]
+    tidied_contents = pool.map(tidy, contents) if pool else map(tidy, contents)
+    tidied = []
+    for rev, tidied_content in zip(revisions, tidied_contents):
+        if not tidied_content:
+            log.warning("Could not tidy the content of revision %s", rev.pk)
+            continue
+        rev.tidied_content = tidied_content
+        tidied.append(rev)
+    bulk_update(tidied, ["tidied_content"])
+    return len(tidied)
+
+
+def get_checkpoint():
+    """Return the ID of the last revision the backfill got to, or 0."""
+    return cache.get(CHECKPOINT_CACHE_KEY, 0)
+
+
+def set_checkpoint(pk):
+    cache.set(CHECKPOINT_CACHE_KEY, pk, CHECKPOINT_TIMEOUT)
+
+
+def clear_checkpoint():
+    cache.delete(CHECKPOINT_CACHE_KEY)
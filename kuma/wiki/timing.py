@@ -0,0 +1,82 @@
+"""
+Timing of the phases of document renders.
+
+A render spends its time in four phases: waiting for ``kumascript``,
+``clean``-ing its output, regenerating the derived ``fields`` of the
+document, and the ``save``. ``Document.render`` times each of them with a
+``RenderTimer``, and keeps the results in the ``DocumentRenderStats`` of the
+document, as the times of the last render and a histogram of all of them.
+
+The cleaning happens deep inside ``kumascript.get``, so the timer of the
+render in progress is kept in a thread local, and ``phase`` can time code
+anywhere in the render. The time of a phase never includes the time of the
+phases nested in it.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+PHASES = ("kumascript", "clean", "fields", "save")
+
+# Upper bounds, in seconds, of the buckets of the histograms of render times.
+# The last bucket has no upper bound.
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+_local = threading.local()
+
+
+class RenderTimer:
+    """The time spent in each phase of a render, in seconds."""
+
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        # The time spent in the phases nested in the ones in progress
+        self._nested = []
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.times[name] += elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    @contextmanager
+    def activate(self):
+        """Make ``phase`` time the code of this block with this timer."""
+        previous = getattr(_local, "timer", None)
+        _local.timer = self
+        try:
+            yield self
+        finally:
+            _local.timer = previous
+
+
+@contextmanager
+def phase(name):
+    """Time a block of code as a phase of the render in progress, if any."""
+    timer = getattr(_local, "timer", None)
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
+
+
+def get_bucket(seconds):
+    """Return the index of the histogram bucket of a time."""
+    return bisect_left(HISTOGRAM_BUCKETS, seconds)
+
+
+def empty_histogram():
+    return {name: [0] * (len(HISTOGRAM_BUCKETS) + 1) for name in PHASES + ("total",)}
@@ -9,11 +9,47 @@ from kuma.core.decorators import (
 )
 from kuma.core.utils import paginate
 
-from ..constants import DOCUMENTS_PER_PAGE
+from ..constants import DOCUMENTS_COUNT_CACHE_MIN, DOCUMENTS_PER_PAGE
 from ..decorators import prevent_indexing, process_document_path
 from ..models import Document, DocumentTag, LocalizationTag, ReviewTag, Revision
 
 
+def paginate_documents(request, docs, summaries=False):
+    """
+    Paginate a list of documents, with a cached count for the long lists.
+
+    The list templates only render the locale, slug and title of each
+    document, which filter_for_list fetches with only(), and maybe its
+    summary, for which what's missing is fetched for the whole page at once.
+    """
+    page = paginate(
+        request,
+        docs,
+        per_page=DOCUMENTS_PER_PAGE,
+        min_cached_count=DOCUMENTS_COUNT_CACHE_MIN,
+    )
+    page.object_list = list(page.object_list)
+    if summaries:
+        prefetch_summary_sources(page.object_list)
+    return page
+
+
+def prefetch_summary_sources(docs):
+    """
+    Fetch the HTML that get_summary_text() parses for the documents without
+    a summary_text, in one query, instead of two deferred fields each.
+    """
+    docs_by_pk = {doc.pk: doc for doc in docs if doc.summary_text is None}
+    if not docs_by_pk:
+        return
+    sources = Document.objects.filter(pk__in=docs_by_pk).values_list(
+        "pk", "rendered_html", "html"
+    )
+    for pk, rendered_html, html in sources:
+        docs_by_pk[pk].rendered_html = rendered_html
+        docs_by_pk[pk].html = html
+
+
 @ensure_wiki_domain
 @shared_cache_control
 @block_user_agents
@@ -33,7 +69,7 @@ def documents(request, tag=None):
                 tag_obj = matching_tag
                 break
     docs = Document.objects.filter_for_list(locale=request.LANGUAGE_CODE, tag=tag_obj)
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    paginated_docs = paginate_documents(request, docs, summaries=True)
     context = {
         "documents": paginated_docs,
         "tag": tag,
@@ -66,10 +102,10 @@ def needs_review(request, tag=None):
     """
     tag_obj = tag and get_object_or_404(ReviewTag, name=tag) or None
     docs = Document.objects.filter_for_review(locale=request.LANGUAGE_CODE, tag=tag_obj)
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    paginated_docs = paginate_documents(request, docs)
     context = {
         "documents": paginated_docs,
-        "count": docs.count(),
+        "count": paginated_docs.paginator.count,
         "tag": tag_obj,
         "tag_name": tag,
     }
@@ -89,10 +125,10 @@ def with_localization_tag(request, tag=None):
     docs = Document.objects.filter_with_localization_tag(
         locale=request.LANGUAGE_CODE, tag=tag_obj
     )
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    paginated_docs = paginate_documents(request, docs)
     context = {
         "documents": paginated_docs,
-        "count": docs.count(),
+        "count": paginated_docs.paginator.count,
         "tag": tag_obj,
         "tag_name": tag,
     }
@@ -109,7 +145,8 @@ def with_errors(request):
     Lists wiki documents with (KumaScript) errors
     """
     docs = Document.objects.filter_for_list(locale=request.LANGUAGE_CODE, errors=True)
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    # The list of errors doesn't have the summaries.
+    paginated_docs = paginate_documents(request, docs)
     context = {
         "documents": paginated_docs,
         "errors": True,
@@ -125,7 +162,7 @@ def with_errors(request):
 def without_parent(request):
     """Lists wiki documents without parent (no English source document)"""
     docs = Document.objects.filter_for_list(locale=request.LANGUAGE_CODE, noparent=True)
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    paginated_docs = paginate_documents(request, docs, summaries=True)
     context = {
         "documents": paginated_docs,
         "noparent": True,
@@ -141,7 +178,7 @@ def without_parent(request):
 def top_level(request):
     """Lists documents directly under /docs/"""
     docs = Document.objects.filter_for_list(locale=request.LANGUAGE_CODE, toplevel=True)
-    paginated_docs = paginate(request, docs, per_page=DOCUMENTS_PER_PAGE)
+    paginated_docs = paginate_documents(request, docs, summaries=True)
     context = {
         "documents": paginated_docs,
         "toplevel": True,
@@ -25,6 +25,7 @@ from kuma.core.decorators import (
     login_required,
     shared_cache_control,
 )
+from kuma.core.managers import set_tags
 from kuma.core.utils import smart_int
 
 from .utils import get_last_modified_header
@@ -198,7 +199,7 @@ def quick_review(request, document_slug, document_locale):
         data = {"summary": " ".join(messages), "comment": " ".join(messages)}
         new_rev = doc.revise(request.user, data=data)
         if new_tags:
-            new_rev.review_tags.set(*new_tags)
+            set_tags(new_rev.review_tags, *new_tags)
         else:
             new_rev.review_tags.clear()
     return redirect(doc)